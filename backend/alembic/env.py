@@ -20,8 +20,10 @@ print('Alembic sees tables at migration time:', list(Base.metadata.tables.keys()
 config = context.config
 
 # Interpret the config file for Python logging.
-# This line sets up loggers basically.
-fileConfig(config.config_file_name)
+# This line sets up loggers basically. Skipped when migrating from inside the app
+# (app.db.migrations), which has its logging configured already.
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -0,0 +1,41 @@
+"""payroll runs keep their job, and a period has one active run
+
+Revision ID: a7c3e9f1b5d2
+Revises: e2f6a8c4b9d1
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9f1b5d2'
+down_revision = 'e2f6a8c4b9d1'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('payroll_runs', sa.Column('job_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_payroll_runs_job_id', 'payroll_runs', 'jobs', ['job_id'], ['id'])
+    # Runs queued so far carry their id in the job payload
+    op.execute("""
+        UPDATE payroll_runs SET job_id = jobs.id
+        FROM jobs
+        WHERE jobs.kind = 'payroll_run' AND (jobs.payload->>'run_id')::int = payroll_runs.id
+    """)
+    # Runs that never got a job, and all but the newest active run of a period, can no longer run
+    op.execute("""
+        UPDATE payroll_runs SET status = 'failed', error = 'Superseded by another run of the period', finished_at = now()
+        WHERE status IN ('pending', 'running')
+          AND (job_id IS NULL OR EXISTS (
+              SELECT 1 FROM payroll_runs newer
+              WHERE newer.period = payroll_runs.period AND newer.id > payroll_runs.id
+                AND newer.status IN ('pending', 'running')))
+    """)
+    op.create_index('uq_payroll_runs_active_period', 'payroll_runs', ['period'], unique=True,
+                    postgresql_where=sa.text("status IN ('pending', 'running')"))
+
+def downgrade():
+    op.drop_index('uq_payroll_runs_active_period', table_name='payroll_runs')
+    op.drop_constraint('fk_payroll_runs_job_id', 'payroll_runs', type_='foreignkey')
+    op.drop_column('payroll_runs', 'job_id')
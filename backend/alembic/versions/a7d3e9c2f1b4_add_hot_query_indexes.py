@@ -0,0 +1,55 @@
+"""indexes for hot filter columns
+
+Revision ID: a7d3e9c2f1b4
+Revises: f4c2d8a1b7e3
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e9c2f1b4'
+down_revision = 'f4c2d8a1b7e3'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, partial predicate)
+INDEXES = [
+    # lock_inventory reads (product, warehouse) pairs in FEFO order
+    ('ix_inventory_product_warehouse_expiry', 'inventory', ['product_id', 'warehouse_id', 'expiry_date'], None),
+    ('ix_attendance_records_staff_date', 'attendance_records', ['staff_id', 'date'], None),
+    ('ix_attendance_records_date_id', 'attendance_records', ['date', 'id'], None),
+    # Date-range reports and the (date, id) keyset listing
+    ('ix_invoices_date_id', 'invoices', ['date', 'id'], None),
+    ('ix_invoices_customer_name', 'invoices', ['customer_name'], None),
+    ('ix_invoice_items_invoice_id', 'invoice_items', ['invoice_id'], None),
+    ('ix_user_activity_user_timestamp', 'user_activity', ['user_id', 'timestamp'], None),
+    ('ix_raw_material_stock_intake_raw_material_id', 'raw_material_stock_intake', ['raw_material_id'], None),
+    ('ix_production_requirements_product_id', 'production_requirements', ['product_id'], None),
+    ('ix_production_requirement_items_production_requirement_id', 'production_requirement_items', ['production_requirement_id'], None),
+    ('ix_payroll_staff_created_at', 'payroll', ['staff_id', 'created_at'], None),
+    # Matching galleries only ever load active templates
+    ('ix_fingerprint_templates_active', 'fingerprint_templates', ['staff_id'], 'is_active'),
+]
+
+
+def upgrade():
+    # CONCURRENTLY keeps the tables writable while the indexes build; it cannot run in a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False, if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+            )
+        # Superseded by ix_user_activity_user_timestamp
+        op.drop_index('ix_user_activity_user_id', table_name='user_activity', if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_user_activity_user_id', 'user_activity', ['user_id'], unique=False, if_not_exists=True,
+                        postgresql_concurrently=True)
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
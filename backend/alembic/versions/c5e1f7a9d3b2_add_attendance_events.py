@@ -0,0 +1,66 @@
+"""attendance events and one attendance record per staff and day
+
+Revision ID: c5e1f7a9d3b2
+Revises: a7d3e9c2f1b4
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c5e1f7a9d3b2'
+down_revision = 'a7d3e9c2f1b4'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Merge duplicate (staff, day) records into the oldest one before making the pair unique
+    op.execute("""
+        WITH merged AS (
+            SELECT staff_id, date, MIN(id) AS keep_id, MIN(time_in) AS time_in, MAX(time_out) AS time_out
+            FROM attendance_records
+            GROUP BY staff_id, date
+            HAVING COUNT(*) > 1
+        )
+        UPDATE attendance_records a
+        SET time_in = m.time_in,
+            time_out = m.time_out,
+            hours_worked = CASE WHEN m.time_out > m.time_in
+                                THEN EXTRACT(EPOCH FROM m.time_out - m.time_in) / 3600 END
+        FROM merged m
+        WHERE a.id = m.keep_id
+    """)
+    op.execute("""
+        DELETE FROM attendance_records a
+        USING attendance_records b
+        WHERE a.staff_id = b.staff_id AND a.date = b.date AND a.id > b.id
+    """)
+    op.create_unique_constraint('uq_attendance_records_staff_date', 'attendance_records', ['staff_id', 'date'])
+    # The constraint's index serves the same lookups
+    op.drop_index('ix_attendance_records_staff_date', table_name='attendance_records', if_exists=True)
+
+    op.create_table(
+        'attendance_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=128), nullable=False),
+        sa.Column('device_id', sa.String(), nullable=True),
+        sa.Column('staff_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('occurred_at', sa.DateTime(), nullable=False),
+        sa.Column('attendance_record_id', sa.Integer(), nullable=True),
+        sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['staff_id'], ['staff.id']),
+        sa.ForeignKeyConstraint(['attendance_record_id'], ['attendance_records.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key'),
+    )
+    op.create_index(op.f('ix_attendance_events_id'), 'attendance_events', ['id'], unique=False)
+    op.create_index(op.f('ix_attendance_events_staff_id'), 'attendance_events', ['staff_id'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_attendance_events_staff_id'), table_name='attendance_events')
+    op.drop_index(op.f('ix_attendance_events_id'), table_name='attendance_events')
+    op.drop_table('attendance_events')
+    op.create_index('ix_attendance_records_staff_date', 'attendance_records', ['staff_id', 'date'], unique=False)
+    op.drop_constraint('uq_attendance_records_staff_date', 'attendance_records', type_='unique')
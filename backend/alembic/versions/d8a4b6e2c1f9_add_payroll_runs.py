@@ -0,0 +1,56 @@
+"""payroll runs, and payroll rows keyed to staff
+
+Revision ID: d8a4b6e2c1f9
+Revises: c5e1f7a9d3b2
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd8a4b6e2c1f9'
+down_revision = 'c5e1f7a9d3b2'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('payroll_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('end_date', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('total_staff', sa.Integer(), nullable=True),
+    sa.Column('processed_staff', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('total_hours', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('total_salary', sa.Numeric(precision=14, scale=2), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_payroll_runs_id'), 'payroll_runs', ['id'], unique=False)
+
+    op.add_column('payroll', sa.Column('run_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('payroll_run_id_fkey', 'payroll', 'payroll_runs', ['run_id'], ['id'])
+    op.create_index(op.f('ix_payroll_run_id'), 'payroll', ['run_id'], unique=False)
+
+    # payroll.staff_id holds staff ids (hours worked and payroll runs read it that way) but
+    # referenced users. NOT VALID leaves rows written under the old key in place.
+    op.drop_constraint('payroll_staff_id_fkey', 'payroll', type_='foreignkey')
+    op.execute("ALTER TABLE payroll ADD CONSTRAINT payroll_staff_id_fkey "
+               "FOREIGN KEY (staff_id) REFERENCES staff (id) NOT VALID")
+
+def downgrade():
+    op.drop_constraint('payroll_staff_id_fkey', 'payroll', type_='foreignkey')
+    op.execute("ALTER TABLE payroll ADD CONSTRAINT payroll_staff_id_fkey "
+               "FOREIGN KEY (staff_id) REFERENCES users (id) NOT VALID")
+    op.drop_index(op.f('ix_payroll_run_id'), table_name='payroll')
+    op.drop_constraint('payroll_run_id_fkey', 'payroll', type_='foreignkey')
+    op.drop_column('payroll', 'run_id')
+    op.drop_index(op.f('ix_payroll_runs_id'), table_name='payroll_runs')
+    op.drop_table('payroll_runs')
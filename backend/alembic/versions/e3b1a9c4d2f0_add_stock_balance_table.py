@@ -0,0 +1,48 @@
+"""add stock_balance ledger table and returned product warehouse
+
+Revision ID: e3b1a9c4d2f0
+Revises: 58832cc34e67
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e3b1a9c4d2f0'
+down_revision = '58832cc34e67'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('stock_balance',
+    sa.Column('item_type', sa.String(), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('warehouse_id', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('quantity', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('item_type', 'item_id', 'warehouse_id')
+    )
+    op.add_column('returned_products', sa.Column('warehouse_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('returned_products_warehouse_id_fkey', 'returned_products', 'warehouses', ['warehouse_id'], ['id'])
+
+    # Seed the ledger from the existing history
+    op.execute("""
+        INSERT INTO stock_balance (item_type, item_id, warehouse_id, quantity)
+        SELECT 'product', product_id, COALESCE(warehouse_id, 0), COALESCE(SUM(quantity), 0)
+        FROM inventory
+        WHERE product_id IS NOT NULL
+        GROUP BY product_id, COALESCE(warehouse_id, 0)
+    """)
+    op.execute("""
+        INSERT INTO stock_balance (item_type, item_id, warehouse_id, quantity)
+        SELECT 'raw_material', rm.id, 0, COALESCE(rm.opening_stock, 0) + COALESCE(SUM(i.quantity), 0)
+        FROM raw_materials rm
+        LEFT JOIN raw_material_stock_intake i ON i.raw_material_id = rm.id
+        GROUP BY rm.id, rm.opening_stock
+    """)
+
+def downgrade():
+    op.drop_constraint('returned_products_warehouse_id_fkey', 'returned_products', type_='foreignkey')
+    op.drop_column('returned_products', 'warehouse_id')
+    op.drop_table('stock_balance')
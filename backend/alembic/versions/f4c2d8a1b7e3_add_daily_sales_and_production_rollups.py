@@ -0,0 +1,113 @@
+"""daily sales and production rollups
+
+Revision ID: f4c2d8a1b7e3
+Revises: e3b1a9c4d2f0
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f4c2d8a1b7e3'
+down_revision = 'e3b1a9c4d2f0'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Invoices reference the customer and warehouse they were issued for
+    op.add_column('invoices', sa.Column('customer_id', sa.Integer(), nullable=True))
+    op.add_column('invoices', sa.Column('warehouse_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('invoices_customer_id_fkey', 'invoices', 'customers', ['customer_id'], ['id'])
+    op.create_foreign_key('invoices_warehouse_id_fkey', 'invoices', 'warehouses', ['warehouse_id'], ['id'])
+    op.create_index(op.f('ix_invoices_customer_id'), 'invoices', ['customer_id'], unique=False)
+    op.execute("""
+        UPDATE invoices i
+        SET customer_id = (SELECT MIN(c.id) FROM customers c WHERE c.name = i.customer_name)
+        WHERE i.customer_id IS NULL
+    """)
+
+    # sales_summary becomes one row per (day, dimension, key)
+    op.execute("DELETE FROM sales_summary")
+    op.add_column('sales_summary', sa.Column('dimension', sa.String(), nullable=False, server_default='total'))
+    op.add_column('sales_summary', sa.Column('key_id', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('sales_summary', sa.Column('transactions', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('sales_summary', sa.Column('quantity', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('sales_summary', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+    op.create_unique_constraint('uq_sales_summary_day_dimension_key', 'sales_summary', ['start_date', 'dimension', 'key_id'])
+
+    # customer_performance keeps one running total per customer
+    op.execute("DELETE FROM customer_performance")
+    op.add_column('customer_performance', sa.Column('last_invoice_date', sa.Date(), nullable=True))
+    op.create_unique_constraint('customer_performance_customer_id_key', 'customer_performance', ['customer_id'])
+
+    # production_analysis becomes one row per (product, production date)
+    op.execute("DELETE FROM production_analysis")
+    op.add_column('production_analysis', sa.Column('product_id', sa.Integer(), nullable=True))
+    op.add_column('production_analysis', sa.Column('good_products', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('production_analysis', sa.Column('damaged_products', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('production_analysis', sa.Column('efficiency', sa.Float(), nullable=False, server_default='0'))
+    op.create_foreign_key('production_analysis_product_id_fkey', 'production_analysis', 'products', ['product_id'], ['id'])
+    op.create_unique_constraint('uq_production_analysis_product_date', 'production_analysis', ['product_id', 'production_date'])
+
+    # Backfill the rollups from existing history
+    op.execute("""
+        INSERT INTO sales_summary (start_date, end_date, dimension, key_id, total_sales, total_vat, transactions, quantity)
+        SELECT d, d, 'total', 0, SUM(total_amount), SUM(COALESCE(vat, 0)), COUNT(*), SUM(qty)
+        FROM (SELECT i.date::date AS d, i.total_amount, i.vat,
+                     (SELECT COALESCE(SUM(quantity), 0) FROM invoice_items WHERE invoice_id = i.id) AS qty
+              FROM invoices i) t
+        GROUP BY d
+    """)
+    op.execute("""
+        INSERT INTO sales_summary (start_date, end_date, dimension, key_id, total_sales, total_vat, transactions, quantity)
+        SELECT d, d, 'customer', customer_id, SUM(total_amount), SUM(COALESCE(vat, 0)), COUNT(*), SUM(qty)
+        FROM (SELECT i.date::date AS d, i.customer_id, i.total_amount, i.vat,
+                     (SELECT COALESCE(SUM(quantity), 0) FROM invoice_items WHERE invoice_id = i.id) AS qty
+              FROM invoices i WHERE i.customer_id IS NOT NULL) t
+        GROUP BY d, customer_id
+    """)
+    op.execute("""
+        INSERT INTO sales_summary (start_date, end_date, dimension, key_id, total_sales, total_vat, transactions, quantity)
+        SELECT i.date::date, i.date::date, 'product', ii.product_id, SUM(ii.quantity * ii.price), 0,
+               COUNT(DISTINCT i.id), SUM(ii.quantity)
+        FROM invoices i JOIN invoice_items ii ON ii.invoice_id = i.id
+        WHERE ii.product_id IS NOT NULL
+        GROUP BY i.date::date, ii.product_id
+    """)
+    op.execute("""
+        INSERT INTO customer_performance (customer_id, total_transactions, total_amount, last_invoice_date)
+        SELECT customer_id, COUNT(*), SUM(total_amount), MAX(date)::date
+        FROM invoices WHERE customer_id IS NOT NULL
+        GROUP BY customer_id
+    """)
+    op.execute("""
+        INSERT INTO production_analysis (product_id, product_name, production_date, quantity_produced,
+                                         good_products, damaged_products, efficiency)
+        SELECT po.product_id, p.name, po.production_date, SUM(po.good_products), SUM(po.good_products),
+               SUM(po.damaged_products),
+               COALESCE(SUM(po.good_products)::float * 100 / NULLIF(SUM(po.good_products + po.damaged_products), 0), 0)
+        FROM production_output po JOIN products p ON p.id = po.product_id
+        GROUP BY po.product_id, p.name, po.production_date
+    """)
+
+def downgrade():
+    op.drop_constraint('uq_production_analysis_product_date', 'production_analysis', type_='unique')
+    op.drop_constraint('production_analysis_product_id_fkey', 'production_analysis', type_='foreignkey')
+    op.drop_column('production_analysis', 'efficiency')
+    op.drop_column('production_analysis', 'damaged_products')
+    op.drop_column('production_analysis', 'good_products')
+    op.drop_column('production_analysis', 'product_id')
+    op.drop_constraint('customer_performance_customer_id_key', 'customer_performance', type_='unique')
+    op.drop_column('customer_performance', 'last_invoice_date')
+    op.drop_constraint('uq_sales_summary_day_dimension_key', 'sales_summary', type_='unique')
+    op.drop_column('sales_summary', 'updated_at')
+    op.drop_column('sales_summary', 'quantity')
+    op.drop_column('sales_summary', 'transactions')
+    op.drop_column('sales_summary', 'key_id')
+    op.drop_column('sales_summary', 'dimension')
+    op.drop_index(op.f('ix_invoices_customer_id'), table_name='invoices')
+    op.drop_constraint('invoices_warehouse_id_fkey', 'invoices', type_='foreignkey')
+    op.drop_constraint('invoices_customer_id_fkey', 'invoices', type_='foreignkey')
+    op.drop_column('invoices', 'warehouse_id')
+    op.drop_column('invoices', 'customer_id')
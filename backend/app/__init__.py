@@ -1,6 +1 @@
-from fastapi import FastAPI
-from .api.v1 import api_router
-
-app = FastAPI()
-
-app.include_router(api_router, prefix="/api/v1")
\ No newline at end of file
+# This file is intentionally left blank.
\ No newline at end of file
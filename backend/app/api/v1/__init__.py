@@ -19,6 +19,8 @@ from .endpoints.device_fault_report import router as device_fault_report_router
 from app.api.v1.endpoints.warehouse_transfer import router as warehouse_transfer_router
 from .endpoints import returned_products
 from .endpoints.fingerprint import router as fingerprint_router
+from .endpoints.access import router as access_router
+from .endpoints.jobs import router as jobs_router
 # Add other endpoint imports as needed
 
 api_router.include_router(health.router, prefix="/health", tags=["Health"])
@@ -44,6 +46,8 @@ api_router.include_router(reports.router, tags=["Reports"])
 api_router.include_router(devices_router, prefix="/devices", tags=["Devices"])
 api_router.include_router(device_maintenance_router, prefix="/device-maintenance", tags=["Device Maintenance"])
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
+api_router.include_router(access_router, prefix="/access", tags=["Access"])
+api_router.include_router(jobs_router, prefix="/jobs", tags=["Jobs"])
 api_router.include_router(production_console.router, prefix="/production-console", tags=["Production Console"])
 api_router.include_router(production_output.router, prefix="/production-output", tags=["Production Output"])
 api_router.include_router(hours_worked_router, tags=["Hours Worked"])
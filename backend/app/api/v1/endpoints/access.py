@@ -4,40 +4,61 @@ from app.db.session import get_db
 from app.db.models.user_access import UserWarehouseAccess, UserSectionAccess
 from app.db.models.user import User
 from app.db.models.warehouse import Warehouse
+from app.api.v1.endpoints.auth import get_current_user
+from app.services.access_control import load_grants, mask_warehouse_ids
+from app.services.auth_service import invalidate_principal
 
 router = APIRouter()
 
+
+def require_admin(current_user=Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+
+@router.get("/user/me")
+def get_my_access(current_user=Depends(get_current_user)):
+    # Served from the cached principal, no query
+    return {
+        "warehouses": sorted(current_user.warehouse_ids),
+        "sections": sorted(current_user.sections),
+    }
+
 @router.get("/user/{user_id}")
-def get_user_access(user_id: int, db: Session = Depends(get_db)):
-    warehouse_access = db.query(UserWarehouseAccess).filter_by(user_id=user_id).all()
-    section_access = db.query(UserSectionAccess).filter_by(user_id=user_id).all()
+def get_user_access(user_id: int, db: Session = Depends(get_db), admin=Depends(require_admin)):
+    mask, sections = load_grants(db, user_id)
     return {
-        "warehouses": [wa.warehouse_id for wa in warehouse_access],
-        "sections": [sa.section_name for sa in section_access]
+        "warehouses": sorted(mask_warehouse_ids(mask)),
+        "sections": sorted(sections)
     }
 
 @router.post("/warehouse")
-def grant_warehouse_access(user_id: int, warehouse_id: int, grant: bool, db: Session = Depends(get_db)):
+def grant_warehouse_access(user_id: int, warehouse_id: int, grant: bool, db: Session = Depends(get_db), admin=Depends(require_admin)):
     access = db.query(UserWarehouseAccess).filter_by(user_id=user_id, warehouse_id=warehouse_id).first()
     if grant and not access:
         db.add(UserWarehouseAccess(user_id=user_id, warehouse_id=warehouse_id))
         db.commit()
+        invalidate_principal(user_id)
         return {"detail": "Access granted"}
     elif not grant and access:
         db.delete(access)
         db.commit()
+        invalidate_principal(user_id)
         return {"detail": "Access revoked"}
     return {"detail": "No change"}
 
 @router.post("/section")
-def grant_section_access(user_id: int, section_name: str, grant: bool, db: Session = Depends(get_db)):
+def grant_section_access(user_id: int, section_name: str, grant: bool, db: Session = Depends(get_db), admin=Depends(require_admin)):
     access = db.query(UserSectionAccess).filter_by(user_id=user_id, section_name=section_name).first()
     if grant and not access:
         db.add(UserSectionAccess(user_id=user_id, section_name=section_name))
         db.commit()
+        invalidate_principal(user_id)
         return {"detail": "Access granted"}
     elif not grant and access:
         db.delete(access)
         db.commit()
+        invalidate_principal(user_id)
         return {"detail": "Access revoked"}
     return {"detail": "No change"}
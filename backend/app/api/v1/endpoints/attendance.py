@@ -1,39 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from datetime import datetime, date
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from app.db.models.attendance import AttendanceRecord
 from app.db.models.staff import Staff
 from app.db.models.user import User
-from app.schemas.attendance import AttendanceRecordCreate, AttendanceRecordOut
+from app.api.v1.endpoints.auth import get_current_user
+from app.schemas.attendance import AttendanceEventBatch, AttendanceEventBatchResult, AttendanceRecordCreate, AttendanceRecordOut
+from app.services.attendance_sync import ingest_events
+from app.utils.pagination import DateRange, PageParams, apply_date_range, date_range_params, keyset_page, page_params, set_next_cursor, split_page
+from typing import Optional
 
 router = APIRouter()
 
 @router.post("/attendance", response_model=AttendanceRecordOut)
-def record_attendance(data: AttendanceRecordCreate, db: Session = Depends(get_db)):
+async def record_attendance(data: AttendanceRecordCreate, db: AsyncSession = Depends(get_async_db)):
     staff = None
     if data.user_id:
         # Try to find staff by id
-        staff = db.query(Staff).filter(Staff.id == data.user_id).first()
+        staff = await db.get(Staff, data.user_id)
         if not staff:
             # Try to find user, then match staff by email
-            user = db.query(User).filter(User.id == data.user_id).first()
+            user = await db.get(User, data.user_id)
             if user and user.email:
-                staff = db.query(Staff).filter(Staff.email == user.email).first()
+                staff = (await db.execute(select(Staff).filter(Staff.email == user.email))).scalars().first()
         if not staff:
             raise HTTPException(status_code=404, detail="User/Staff not found")
     else:
         raise HTTPException(status_code=400, detail="No authentication data provided")
 
+    staff_id = staff.id
+    try:
+        record = await _clock(db, staff_id, data)
+        await db.commit()
+    except IntegrityError:
+        # A terminal batch created today's record first; apply the action to that record
+        await db.rollback()
+        record = await _clock(db, staff_id, data)
+        await db.commit()
+    await db.refresh(record)
+    return record
+
+
+async def _clock(db: AsyncSession, staff_id: int, data: AttendanceRecordCreate) -> AttendanceRecord:
+    """
+    Apply an IN or OUT to the staff member's record for today and flush, so a record a
+    concurrent batch inserted surfaces as IntegrityError; the caller commits.
+    """
     today = date.today()
     now = datetime.now()
-    record = db.query(AttendanceRecord).filter(AttendanceRecord.staff_id == staff.id, AttendanceRecord.date == today).first()
+    record = (await db.execute(
+        select(AttendanceRecord).filter(AttendanceRecord.staff_id == staff_id, AttendanceRecord.date == today)
+    )).scalars().first()
     if data.action == 'IN':
         if record and record.time_in:
             raise HTTPException(status_code=400, detail="Time-in already recorded for today")
         if not record:
             record = AttendanceRecord(
-                staff_id=staff.id, 
+                staff_id=staff_id,
                 date=today, 
                 time_in=now, 
                 action='IN',
@@ -65,15 +92,44 @@ def record_attendance(data: AttendanceRecordCreate, db: Session = Depends(get_db
             record.hours_worked = (record.time_out - record.time_in).total_seconds() / 3600.0
     else:
         raise HTTPException(status_code=400, detail="Invalid action")
-    db.commit()
-    db.refresh(record)
+    await db.flush()
     return record
 
 
+@router.post("/events/batch", response_model=AttendanceEventBatchResult)
+def ingest_attendance_events(batch: AttendanceEventBatch, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """
+    Replay IN/OUT events recorded by a terminal while it was offline; the terminal syncs
+    with its operator's token. Every event gets an outcome (accepted, duplicate or
+    rejected); sending the same batch again is harmless.
+    """
+    result = ingest_events(db, batch)
+    db.commit()
+    return result
+
+def attendance_with_names_query(page: PageParams, date_range: DateRange, staff_id: Optional[int] = None):
+    """One page of attendance records with their staff loaded alongside (no per-row staff lookups)."""
+    stmt = apply_date_range(
+        select(AttendanceRecord).options(selectinload(AttendanceRecord.staff)),
+        AttendanceRecord.date,
+        date_range
+    )
+    if staff_id is not None:
+        stmt = stmt.filter(AttendanceRecord.staff_id == staff_id)
+    return keyset_page(stmt, page, AttendanceRecord.id, AttendanceRecord.date)
+
 # New endpoint: Get all attendance records with staff names
 @router.get("/attendance-with-names", response_model=list[dict])
-def get_attendance_with_names(db: Session = Depends(get_db)):
-    records = db.query(AttendanceRecord).order_by(AttendanceRecord.date.desc()).all()
+async def get_attendance_with_names(
+    response: Response,
+    staff_id: Optional[int] = None,
+    page: PageParams = Depends(page_params),
+    date_range: DateRange = Depends(date_range_params),
+    db: AsyncSession = Depends(get_async_db)
+):
+    result = await db.execute(attendance_with_names_query(page, date_range, staff_id))
+    records, next_cursor = split_page(result.scalars().all(), page, sort_attr="date")
+    set_next_cursor(response, next_cursor)
     result = []
     for r in records:
         staff_name = r.staff.name if r.staff else None
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_db, get_async_db
 from app.schemas.auth import UserCreate, UserResponse, ProfileCreate  # Import the missing schema
 from app.services.auth_service import (
     create_user,
-    authenticate_user,
+    authenticate_user_async,
     create_user_profile,
-    get_current_user as service_get_current_user,
+    get_principal,
+    invalidate_principal,
+    Principal,
 )  # Import the missing function
 from app.services.simulation_auth import (
     simulate_authenticate_user,
@@ -15,8 +19,11 @@ from app.services.simulation_auth import (
     get_simulation_credentials
 )
 from app.core.security import create_access_token, get_password_hash
+from app.core.cache import reference_cache, WAREHOUSES
 from app.db.models.user import User
 from app.utils.pdf_utils import generate_credentials_pdf
+from app.utils.pagination import PageParams, page_params, paginate, set_next_cursor
+from typing import Optional
 import random
 import string
 import os
@@ -28,17 +35,11 @@ router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
 
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> Principal:
+    # The session only connects if the principal is not cached
     if not token:
-        print("[DEBUG] No token provided!")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing authentication token")
-    print(f"[DEBUG] Incoming token: {token}")
-    user = service_get_current_user(db, token)
-    if not user:
-        print("[DEBUG] No user found for token!")
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
-    print(f"[DEBUG] Authenticated user: {user.username if hasattr(user, 'username') else user}")
-    return user
+    return get_principal(db, token)
 
 
 @router.post("/register", response_model=UserResponse)
@@ -62,16 +63,16 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login")
-def login(user: UserCreate, db: Session = Depends(get_db)):
-    print(f"Login attempt: username={user.username}, password={user.password}, role={user.role}")
+async def login(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    print(f"Login attempt: username={user.username}, role={user.role}")
     
     # Check if we're in simulation mode
     if os.getenv("SKIP_DATABASE") == "true":
         print("[SIMULATION] Using simulation authentication")
-        db_user = simulate_authenticate_user(user.username, user.password, user.role)
+        db_user = await run_in_threadpool(simulate_authenticate_user, user.username, user.password, user.role)
     else:
         print("[DATABASE] Using database authentication")
-        db_user = authenticate_user(db, user.username, user.password, user.role)
+        db_user = await authenticate_user_async(db, user.username, user.password, user.role)
     
     if not db_user:
         print("Login failed: Invalid credentials or role")
@@ -107,18 +108,13 @@ def get_simulation_credentials_endpoint():
 
 
 @router.get("/user/me")
-def get_current_user_info(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_current_user_info(current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
     # Admins get all warehouses, others get only their assigned ones
-    warehouses = []
-    if current_user.role and current_user.role.lower() == 'admin':
+    if current_user.is_admin:
         from app.db.models.warehouse import Warehouse
-        warehouses = [w.id for w in db.query(Warehouse).all()]
+        warehouses = reference_cache.get_or_load(WAREHOUSES, lambda: [w.id for w in db.query(Warehouse.id).all()], "ids")
     else:
-        try:
-            from app.db.models.user_access import UserWarehouseAccess
-            warehouses = [wa.warehouse_id for wa in db.query(UserWarehouseAccess).filter_by(user_id=current_user.id).all()]
-        except Exception:
-            pass
+        warehouses = sorted(current_user.warehouse_ids)
     return {
         "id": current_user.id,
         "username": current_user.username,
@@ -172,6 +168,7 @@ def approve_user(user_id: int, db: Session = Depends(get_db)):
     user.hashed_password = get_password_hash(password)
     user.status = "active"
     db.commit()
+    invalidate_principal(user.id)
     # Generate PDF
     pdf_bytes = generate_credentials_pdf(username, password, user.role)
     return Response(
@@ -234,12 +231,25 @@ def reset_admin_user_api(db: Session = Depends(get_db)):
     user.hashed_password = get_password_hash(password)
     user.status = "active"
     db.commit()
+    invalidate_principal(user.id)
     return {"message": f"Admin user '{username}' password reset and status set to active."}
 
 
 @router.get("/list-users")
-def list_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
+def list_users(
+    response: Response,
+    user_status: Optional[str] = Query(None, alias="status"),
+    role: Optional[str] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    query = db.query(User)
+    if user_status:
+        query = query.filter(User.status == user_status)
+    if role:
+        query = query.filter(User.role == role)
+    users, next_cursor = paginate(query, page, User.id, descending=False)
+    set_next_cursor(response, next_cursor)
     return [
         {
             "id": u.id,
@@ -254,18 +264,13 @@ def list_users(db: Session = Depends(get_db)):
 
 
 @router.get("/user/me")
-def get_current_user_info(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_current_user_info(current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
     # Admins get all warehouses, others get only their assigned ones
-    warehouses = []
-    if current_user.role and current_user.role.lower() == 'admin':
+    if current_user.is_admin:
         from app.db.models.warehouse import Warehouse
-        warehouses = [w.id for w in db.query(Warehouse).all()]
+        warehouses = reference_cache.get_or_load(WAREHOUSES, lambda: [w.id for w in db.query(Warehouse.id).all()], "ids")
     else:
-        try:
-            from app.db.models.user_access import UserWarehouseAccess
-            warehouses = [wa.warehouse_id for wa in db.query(UserWarehouseAccess).filter_by(user_id=current_user.id).all()]
-        except Exception:
-            pass
+        warehouses = sorted(current_user.warehouse_ids)
     return {
         "id": current_user.id,
         "username": current_user.username,
@@ -2,41 +2,36 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.db.session import get_db
-from app.db.models.invoice import Invoice
 from app.db.models.customer import Customer
+from app.db.models.customer_performance import CustomerPerformance
 from typing import List
 
 router = APIRouter()
 
 @router.get("/", response_model=List[dict])
 def get_customer_performance(db: Session = Depends(get_db)):
-    # Get all customers
-    customers = db.query(Customer).all()
-    # Get invoice aggregates per customer name
-    invoice_agg = {
-        r.name: {
+    # Running totals are maintained per customer when invoices are created;
+    # customers without any invoice have no rollup row and report zero
+    rows = (
+        db.query(
+            Customer.id,
+            Customer.name,
+            func.coalesce(CustomerPerformance.total_transactions, 0).label('totalTransactions'),
+            func.coalesce(CustomerPerformance.total_amount, 0).label('totalAmount')
+        )
+        .outerjoin(CustomerPerformance, CustomerPerformance.customer_id == Customer.id)
+        .order_by(Customer.id)
+        .all()
+    )
+    return [
+        {
+            'id': r.id,
+            'name': r.name,
             'totalTransactions': r.totalTransactions,
             'totalAmount': float(r.totalAmount)
         }
-        for r in db.query(
-            Customer.name.label('name'),
-            func.count(Invoice.id).label('totalTransactions'),
-            func.coalesce(func.sum(Invoice.total_amount), 0).label('totalAmount')
-        ).join(Invoice, Invoice.customer_name == Customer.name, isouter=True)
-         .group_by(Customer.name)
-         .all()
-    }
-    # Build result for all customers, even those with no transactions
-    result = []
-    for c in customers:
-        agg = invoice_agg.get(c.name, {'totalTransactions': 0, 'totalAmount': 0.0})
-        result.append({
-            'id': c.id,
-            'name': c.name,
-            'totalTransactions': agg['totalTransactions'],
-            'totalAmount': agg['totalAmount']
-        })
-    return result
+        for r in rows
+    ]
 
 @router.get("", response_model=List[dict], include_in_schema=False)
 def get_customer_performance_no_slash(db: Session = Depends(get_db)):
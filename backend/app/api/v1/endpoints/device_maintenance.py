@@ -1,17 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db.models.device import DeviceMaintenanceLog as DeviceMaintenanceLogModel
 from app.db.models.device_fault_report import DeviceFaultReport
 from app.schemas.device import DeviceMaintenanceLog, DeviceMaintenanceLogCreate, DeviceFaultReport, DeviceFaultReportCreate
-from typing import List
+from app.utils.pagination import DateRange, PageParams, apply_date_range, date_range_params, page_params, paginate, set_next_cursor
+from typing import List, Optional
 
 router = APIRouter()
 
 # Maintenance Logs
 @router.get("/maintenance-logs", response_model=List[DeviceMaintenanceLog])
-def get_maintenance_logs(db: Session = Depends(get_db)):
-    return db.query(DeviceMaintenanceLog).all()
+def get_maintenance_logs(
+    response: Response,
+    device_id: Optional[int] = None,
+    page: PageParams = Depends(page_params),
+    date_range: DateRange = Depends(date_range_params),
+    db: Session = Depends(get_db)
+):
+    query = apply_date_range(db.query(DeviceMaintenanceLogModel), DeviceMaintenanceLogModel.maintenance_date, date_range)
+    if device_id is not None:
+        query = query.filter(DeviceMaintenanceLogModel.device_id == device_id)
+    # maintenance_date is nullable on older rows, so page by id (insertion order)
+    logs, next_cursor = paginate(query, page, DeviceMaintenanceLogModel.id)
+    set_next_cursor(response, next_cursor)
+    return logs
 
 @router.post("/maintenance-logs", response_model=DeviceMaintenanceLog)
 def create_maintenance_log(log: DeviceMaintenanceLogCreate, db: Session = Depends(get_db)):
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db.models.device import Device as DeviceModel
 from app.schemas.device import Device as DeviceSchema, DeviceCreate
-from typing import List
+from app.utils.pagination import PageParams, page_params, paginate, set_next_cursor
+from typing import List, Optional
 
 
 router = APIRouter()
@@ -11,8 +12,18 @@ router = APIRouter()
 # Support both /devices and /devices/ for GET and POST
 @router.get("", response_model=List[DeviceSchema], include_in_schema=False)
 @router.get("/", response_model=List[DeviceSchema])
-def get_devices(db: Session = Depends(get_db)):
-    return db.query(DeviceModel).all()
+def get_devices(
+    response: Response,
+    status: Optional[str] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    query = db.query(DeviceModel)
+    if status:
+        query = query.filter(DeviceModel.status == status)
+    devices, next_cursor = paginate(query, page, DeviceModel.id, descending=False)
+    set_next_cursor(response, next_cursor)
+    return devices
 
 @router.post("", response_model=DeviceSchema, include_in_schema=False)
 @router.post("/", response_model=DeviceSchema)
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from datetime import datetime, date
 import json
 import logging
 
-from app.db.session import get_db
+from app.db.session import get_db, get_async_db, get_db_sync
 from app.db.models.fingerprint import FingerprintTemplate
 from app.db.models.staff import Staff
 from app.db.models.attendance import AttendanceRecord
@@ -18,7 +21,7 @@ from app.schemas.fingerprint import (
     FingerprintStatusResponse
 )
 from app.schemas.attendance import AttendanceRecordOut
-from app.services.fingerprint_service import fingerprint_service
+from app.services.fingerprint_service import fingerprint_service, fingerprint_gallery, matching_executor
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -113,6 +116,7 @@ async def enroll_fingerprint(
         db.add(template)
         db.commit()
         db.refresh(template)
+        fingerprint_gallery.upsert(template)
         
         logger.info(f"Fingerprint enrolled for staff {request.staff_id}")
         
@@ -135,7 +139,7 @@ async def enroll_fingerprint(
 @router.post("/fingerprint/verify", response_model=FingerprintVerificationResponse)
 async def verify_fingerprint_attendance(
     request: FingerprintVerificationRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verify fingerprint and record attendance."""
     # Check if we're in simulation mode
@@ -158,10 +162,14 @@ async def verify_fingerprint_attendance(
     try:
         if request.staff_id:
             # Verification mode - verify specific staff member
-            template = db.query(FingerprintTemplate).filter(
-                FingerprintTemplate.staff_id == request.staff_id,
-                FingerprintTemplate.is_active == True
-            ).first()
+            template = (await db.execute(
+                select(FingerprintTemplate)
+                .options(selectinload(FingerprintTemplate.staff))
+                .filter(
+                    FingerprintTemplate.staff_id == request.staff_id,
+                    FingerprintTemplate.is_active == True
+                )
+            )).scalars().first()
             
             if not template:
                 return FingerprintVerificationResponse(
@@ -186,10 +194,11 @@ async def verify_fingerprint_attendance(
             staff = template.staff
             
         else:
-            # Identification mode - identify user by fingerprint
-            templates = db.query(FingerprintTemplate).filter(FingerprintTemplate.is_active == True).all()
+            # Identification mode - capture once and search the cached gallery
+            # The first load decodes every enrolled template; do it on a thread, not the event loop
+            await run_in_threadpool(_refresh_gallery)
             
-            if not templates:
+            if not len(fingerprint_gallery):
                 return FingerprintVerificationResponse(
                     success=False,
                     matched=False,
@@ -197,24 +206,31 @@ async def verify_fingerprint_attendance(
                     attendance_recorded=False
                 )
             
-            # Try to identify user
-            staff = None
-            verification_result = None
+            outcome = await fingerprint_service.identify_fingerprint(fingerprint_gallery, matching_executor)
+            match = outcome.match if outcome else None
+            template = None
+            if match:
+                template = (await db.execute(
+                    select(FingerprintTemplate)
+                    .options(selectinload(FingerprintTemplate.staff))
+                    .filter(FingerprintTemplate.id == match.template_id, FingerprintTemplate.is_active == True)
+                )).scalars().first()
             
-            for template in templates:
-                result = await fingerprint_service.verify_fingerprint(template.template_data, max_attempts=1)
-                if result["matched"]:
-                    staff = template.staff
-                    verification_result = result
-                    break
-            
-            if not staff:
+            if not template:
                 return FingerprintVerificationResponse(
                     success=True,
                     matched=False,
                     message="Fingerprint not recognized",
-                    attendance_recorded=False
+                    attendance_recorded=False,
+                    shard_latencies_ms=outcome.shard_latencies_ms if outcome else None
                 )
+            
+            staff = template.staff
+            verification_result = {
+                "matched": True,
+                "confidence": match.confidence,
+                "shard_latencies_ms": outcome.shard_latencies_ms,
+            }
         
         # Update last used timestamp
         template.last_used = datetime.now()
@@ -227,7 +243,7 @@ async def verify_fingerprint_attendance(
             db
         )
         
-        db.commit()
+        await db.commit()
         
         return FingerprintVerificationResponse(
             success=True,
@@ -237,7 +253,8 @@ async def verify_fingerprint_attendance(
             confidence=verification_result["confidence"],
             attendance_recorded=True,
             attendance_id=attendance_record.id,
-            message=f"Welcome {staff.name}! {request.action} recorded successfully."
+            message=f"Welcome {staff.name}! {request.action} recorded successfully.",
+            shard_latencies_ms=verification_result.get("shard_latencies_ms")
         )
         
     except Exception as e:
@@ -250,16 +267,26 @@ async def verify_fingerprint_attendance(
             attendance_recorded=False
         )
 
-async def _record_attendance(staff_id: int, action: str, confidence: int, db: Session) -> AttendanceRecord:
+def _refresh_gallery() -> int:
+    gallery_db = get_db_sync()
+    try:
+        return fingerprint_gallery.refresh(gallery_db)
+    finally:
+        gallery_db.close()
+
+
+async def _record_attendance(staff_id: int, action: str, confidence: int, db: AsyncSession) -> AttendanceRecord:
     """Record attendance with fingerprint verification data."""
     today = date.today()
     now = datetime.now()
     
     # Find or create attendance record for today
-    record = db.query(AttendanceRecord).filter(
-        AttendanceRecord.staff_id == staff_id,
-        AttendanceRecord.date == today
-    ).first()
+    record = (await db.execute(
+        select(AttendanceRecord).filter(
+            AttendanceRecord.staff_id == staff_id,
+            AttendanceRecord.date == today
+        )
+    )).scalars().first()
     
     device_info = {
         "type": "fingerprint_reader",
@@ -366,6 +393,7 @@ async def delete_fingerprint_template(staff_id: int, db: Session = Depends(get_d
     
     template.is_active = False
     db.commit()
+    fingerprint_gallery.remove(template.id)
     
     return {"message": "Fingerprint template deleted successfully"}
 
@@ -1,7 +1,13 @@
 from fastapi import APIRouter
+from app.core.cache import reference_cache
 
 router = APIRouter()
 
 @router.get("/health", tags=["Health"])
 def health_check():
     return {"status": "ok"}
+
+@router.get("/cache", tags=["Health"])
+def cache_stats():
+    """Hit/miss/eviction counters of the reference data cache, per entity."""
+    return reference_cache.stats()
@@ -2,16 +2,16 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from app.db.session import get_db
-from app.db.models.payroll import Payroll
 from app.db.models.staff import Staff
+from app.services.payroll_service import hours_worked
 
 router = APIRouter()
 
 @router.get("/hours-worked/{staff_id}")
 def get_hours_worked(staff_id: int, duration: str, db: Session = Depends(get_db)):
     """
-    Returns the total hours worked by a staff member over a given duration.
-    Duration format: 'YYYY-MM-DD:YYYY-MM-DD' (start:end)
+    Returns the total hours worked by a staff member over a given duration, summed from
+    attendance records in the database. Duration format: 'YYYY-MM-DD:YYYY-MM-DD' (start:end)
     """
     try:
         start_str, end_str = duration.split(":")
@@ -24,10 +24,4 @@ def get_hours_worked(staff_id: int, duration: str, db: Session = Depends(get_db)
     if not staff:
         raise HTTPException(status_code=404, detail="Staff not found")
 
-    payrolls = db.query(Payroll).filter(
-        Payroll.staff_id == staff_id,
-        Payroll.created_at >= start_date,
-        Payroll.created_at <= end_date
-    ).all()
-    total_hours = float(sum(p.hours_worked for p in payrolls)) if payrolls else 0.0
-    return {"hoursWorked": total_hours}
+    return {"hoursWorked": hours_worked(db, staff_id, start_date.date(), end_date.date())}
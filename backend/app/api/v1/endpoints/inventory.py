@@ -1,35 +1,32 @@
 from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.db import models, session
 from app.schemas import inventory as inventory_schemas
-from app.services import inventory_service
+from app.services import inventory_service, stock_ledger
 from app.services.inventory_service import get_all_products, get_all_raw_materials, get_stock_levels
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from typing import List
 from app.schemas import Product, RawMaterial, Warehouse
-from app.db.models.user_access import UserWarehouseAccess
 from app.api.v1.endpoints.auth import get_current_user
+from app.services.access_control import check_warehouse_access
+from app.core.cache import reference_cache, PRODUCTS, RAW_MATERIALS, WAREHOUSES
 
 router = APIRouter()
 
 @router.post("/intake", response_model=inventory_schemas.Inventory)
 def intake_product(product: inventory_schemas.InventoryCreate, db: Session = Depends(session.get_db), current_user=Depends(get_current_user)):
-    # Enforce warehouse access
-    access = db.query(UserWarehouseAccess).filter_by(user_id=current_user.id, warehouse_id=product.warehouse_id).first()
-    if not access:
-        raise HTTPException(status_code=403, detail="You do not have access to this warehouse.")
+    check_warehouse_access(current_user, product.warehouse_id)
     return inventory_service.create_product_intake(db=db, product=product)
 
-@router.get("/stock-levels", response_model=list[inventory_schemas.Inventory])
-def get_stock_levels(db: Session = Depends(session.get_db)):
-    return inventory_service.get_stock_levels(db=db)
+@router.get("/stock-levels", response_model=list)
+async def get_stock_levels(db: AsyncSession = Depends(get_async_db)):
+    """One row per (product, warehouse); id is "<product_id>:<warehouse_id>", product_id the product."""
+    return await inventory_service.get_stock_levels_async(db)
 
 @router.put("/update/{product_id}", response_model=inventory_schemas.Inventory)
 def update_product(product_id: int, product: inventory_schemas.InventoryUpdate, db: Session = Depends(session.get_db), current_user=Depends(get_current_user)):
-    # Enforce warehouse access
-    access = db.query(UserWarehouseAccess).filter_by(user_id=current_user.id, warehouse_id=product.warehouse_id).first()
-    if not access:
-        raise HTTPException(status_code=403, detail="You do not have access to this warehouse.")
+    check_warehouse_access(current_user, product.warehouse_id)
     db_product = inventory_service.get_product(db=db, product_id=product_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
@@ -41,32 +38,45 @@ def delete_product(product_id: int, db: Session = Depends(session.get_db), curre
     db_product = inventory_service.get_product(db=db, product_id=product_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
-    access = db.query(UserWarehouseAccess).filter_by(user_id=current_user.id, warehouse_id=db_product.warehouse_id).first()
-    if not access:
-        raise HTTPException(status_code=403, detail="You do not have access to this warehouse.")
+    check_warehouse_access(current_user, db_product.warehouse_id)
     inventory_service.delete_product(db=db, product_id=product_id)
     return {"detail": "Product deleted successfully"}
 
 @router.get("/products", response_model=List[Product])
 @router.get("/products/", response_model=List[Product])
 def fetch_all_products(db: Session = Depends(get_db)):
-    return get_all_products(db)
+    return reference_cache.get_or_load(
+        PRODUCTS, lambda: [Product.model_validate(p) for p in get_all_products(db)], "inventory"
+    )
 
 @router.get("/raw-materials", response_model=List[RawMaterial])
 @router.get("/raw-materials/", response_model=List[RawMaterial])
 def fetch_all_raw_materials(db: Session = Depends(get_db)):
-    return get_all_raw_materials(db)
+    return reference_cache.get_or_load(
+        RAW_MATERIALS, lambda: [RawMaterial.model_validate(rm) for rm in get_all_raw_materials(db)], "inventory"
+    )
 
 @router.get("/warehouses", response_model=List[Warehouse])
 def fetch_all_warehouses(db: Session = Depends(get_db)):
-    return db.query(models.Warehouse).all()
+    return reference_cache.get_or_load(
+        WAREHOUSES, lambda: [Warehouse.model_validate(w) for w in db.query(models.Warehouse).all()], "inventory"
+    )
 
 @router.get("/stock-level", response_model=list)
-def fetch_stock_levels(db: Session = Depends(get_db)):
+async def fetch_stock_levels(db: AsyncSession = Depends(get_async_db)):
+    """One row per (product, warehouse) with names; id is "<product_id>:<warehouse_id>", product_id the product."""
     try:
-        stock_levels = inventory_service.get_product_stock_levels(db)
+        stock_levels = await inventory_service.get_product_stock_levels_async(db)
         print("DEBUG: stock_levels=", stock_levels)
         return stock_levels
     except Exception as e:
         print("Error fetching stock levels:", e)
-        raise HTTPException(status_code=500, detail="Error fetching stock levels")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Error fetching stock levels")
+
+@router.post("/stock-balance/reconcile", response_model=dict)
+def reconcile_stock_balance(apply: bool = True, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """Rebuild the stock ledger from inventory and intake history and report any drift found."""
+    if not (current_user.role and current_user.role.lower() == 'admin'):
+        raise HTTPException(status_code=403, detail="Only admins can reconcile stock balances.")
+    drift = stock_ledger.reconcile_stock_balances(db, apply=apply)
+    return {"applied": apply, "drift_count": len(drift), "drift": drift}
@@ -1,52 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from app.core.config import settings
+from app.db.session import get_async_db, get_db, get_db_sync
 from app.db.models.invoice import Invoice
-from app.schemas.invoices import InvoiceOut, InvoiceCreate
-from typing import List
-from datetime import date
-from app.db.models.inventory import Inventory
-from app.db.models.product import Product
+from app.schemas.invoices import InvoiceOut, InvoiceCreate, InvoiceImportResult
+from typing import List, Optional
+from datetime import date, datetime
 from app.db.models.invoice import InvoiceItem
 from app.api.v1.endpoints.auth import get_current_user
-from app.db.models.user_access import UserWarehouseAccess
+from app.services.access_control import check_warehouse_access
+from app.services.invoice_import import FORMAT_CSV, FORMAT_NDJSON, ImportFormatError, import_invoices
+from app.db.models.customer import Customer
+from app.db.models.export_tracking import ExportTracking
+from app.services import invoice_pdf
+from app.services.rollup_service import record_invoice_sales_async
+from app.services.stock_service import InsufficientStockError, aggregate_demand, deduct_stock_async
+from app.utils.pagination import DateRange, PageParams, apply_date_range, date_range_params, keyset_page, page_params, set_next_cursor, split_page
 
 router = APIRouter()
 
 @router.get("/", response_model=List[InvoiceOut])
-def get_invoices(db: Session = Depends(get_db)):
-    invoices = db.query(Invoice).all()
-    return [InvoiceOut.model_validate(inv).model_dump() for inv in invoices]
+async def get_invoices(
+    response: Response,
+    status: Optional[str] = None,
+    page: PageParams = Depends(page_params),
+    date_range: DateRange = Depends(date_range_params),
+    db: AsyncSession = Depends(get_async_db)
+):
+    stmt = apply_date_range(select(Invoice).options(selectinload(Invoice.items)), Invoice.date, date_range)
+    if status:
+        stmt = stmt.filter(Invoice.status == status)
+    result = await db.execute(keyset_page(stmt, page, Invoice.id, Invoice.date))
+    invoices, next_cursor = split_page(result.scalars().all(), page, sort_attr="date")
+    set_next_cursor(response, next_cursor)
+    # Serializing a long list is CPU work; keep it off the event loop
+    return await run_in_threadpool(lambda: [InvoiceOut.model_validate(inv).model_dump() for inv in invoices])
 
 @router.post("/", response_model=InvoiceOut)
-def create_invoice(invoice: InvoiceCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    # Check user warehouse access
-    access = db.query(UserWarehouseAccess).filter_by(user_id=current_user.id, warehouse_id=invoice.warehouse_id).first()
-    if not access:
-        raise HTTPException(status_code=403, detail="You do not have access to this warehouse.")
-    # Check and deduct stock for each item from the selected warehouse only
-    for item in invoice.items:
-        inv = db.query(Inventory).filter(Inventory.product_id == item.product_id, Inventory.warehouse_id == invoice.warehouse_id).first()
-        if not inv or inv.quantity < item.quantity:
-            raise HTTPException(status_code=400, detail=f"Insufficient product in selected warehouse: Product ID {item.product_id}")
-        inv.quantity -= item.quantity
-        db.add(inv)
-    # After deduction, update product status for this warehouse
-    for item in invoice.items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
-        total_available = sum(inv.quantity for inv in db.query(Inventory).filter(Inventory.product_id == item.product_id))
-        if total_available > product.reorder_point:
-            status = "Green"
-        elif total_available == product.reorder_point:
-            status = "Amber"
-        else:
-            status = "Red"
-        product.status = status
-        db.add(product)
+async def create_invoice(invoice: InvoiceCreate, db: AsyncSession = Depends(get_async_db), current_user=Depends(get_current_user)):
+    check_warehouse_access(current_user, invoice.warehouse_id)
+    if any(item.quantity <= 0 for item in invoice.items):
+        raise HTTPException(status_code=400, detail="Item quantities must be greater than zero")
+    # Lock, check and deduct stock for every line from the selected warehouse in one pass
+    demand = aggregate_demand((item.product_id, invoice.warehouse_id, item.quantity) for item in invoice.items)
+    try:
+        await deduct_stock_async(db, demand)
+    except InsufficientStockError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Insufficient product in selected warehouse: Product ID {', '.join(map(str, e.product_ids))}")
     # Create invoice and items
+    customer_id = await db.scalar(
+        select(Customer.id).where(Customer.name == invoice.customer_name).order_by(Customer.id).limit(1)
+    )
     db_invoice = Invoice(
         invoice_number=invoice.invoice_number,
         customer_name=invoice.customer_name,
+        customer_id=customer_id,
+        warehouse_id=invoice.warehouse_id,
         date=invoice.date,
         total_amount=invoice.total_amount,
         status=invoice.status,
@@ -54,16 +68,102 @@ def create_invoice(invoice: InvoiceCreate, db: Session = Depends(get_db), curren
         pdf_url=getattr(invoice, 'pdf_url', None)
     )
     db.add(db_invoice)
+    await db.flush()
+    invoice_id = db_invoice.id
+    if invoice.items:
+        await db.execute(insert(InvoiceItem), [
+            {
+                "invoice_id": invoice_id,
+                "product_id": item.product_id,
+                "quantity": item.quantity,
+                "price": item.price,
+            }
+            for item in invoice.items
+        ])
+    await record_invoice_sales_async(
+        db, db_invoice.date, customer_id, invoice.warehouse_id, invoice.total_amount, db_invoice.vat,
+        [(item.product_id, item.quantity, item.price) for item in invoice.items]
+    )
+    await db.commit()
+    # The items were bulk inserted, so the invoice is read back with them
+    created = await db.scalar(
+        select(Invoice).options(selectinload(Invoice.items)).where(Invoice.id == invoice_id)
+        .execution_options(populate_existing=True)
+    )
+    return InvoiceOut.model_validate(created).model_dump()
+
+async def _read_upload(request: Request, max_bytes: int) -> bytes:
+    """The request body, refused with 413 as soon as it exceeds max_bytes."""
+    too_large = HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes; split it into smaller batches")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_bytes:
+        raise too_large
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+@router.post("/import", response_model=InvoiceImportResult)
+async def import_invoice_batch(
+    request: Request,
+    import_format: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$", description="Defaults from Content-Type"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    Load offline or historical invoices. The body is NDJSON (one InvoiceCreate object per line)
+    or CSV (one row per item: invoice_number, customer_name, date, warehouse_id, product_id,
+    quantity, price, optional status and total_amount). Invoices whose invoice_number already
+    exists are skipped, so an upload can be retried safely.
+    """
+    if import_format is None:
+        import_format = FORMAT_CSV if "csv" in request.headers.get("content-type", "") else FORMAT_NDJSON
+    try:
+        content = (await _read_upload(request, settings.INVOICE_IMPORT_MAX_BYTES)).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Upload must be UTF-8 text")
+    try:
+        # Parsing and validation are CPU work; keep them off the event loop
+        report = await run_in_threadpool(import_invoices, db, content, import_format, current_user)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return report.as_dict()
+
+@router.get("/pdf/export")
+def export_invoice_pdfs(
+    date_range: DateRange = Depends(date_range_params),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """Stream a ZIP of the PDFs of every invoice in a date range, rendering missing ones in parallel."""
+    if not (date_range.date_from and date_range.date_to):
+        raise HTTPException(status_code=400, detail="date_from and date_to are required")
+    db.add(ExportTracking(user_id=current_user.id, export_type="invoice_pdfs_zip", timestamp=datetime.utcnow()))
     db.commit()
-    db.refresh(db_invoice)
-    # Add invoice items
-    for item in invoice.items:
-        db_item = InvoiceItem(
-            invoice_id=db_invoice.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price=item.price
-        )
-        db.add(db_item)
-    db.commit()
-    return InvoiceOut.model_validate(db_invoice).model_dump()
+
+    def generate():
+        # The stream outlives the request session, so it reads on its own connection
+        export_db = get_db_sync()
+        try:
+            yield from invoice_pdf.stream_zip(export_db, date_range)
+        finally:
+            export_db.close()
+
+    filename = f"invoices_{date_range.date_from}_{date_range.date_to}.zip"
+    return StreamingResponse(
+        generate(),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/{invoice_id}/pdf")
+def get_invoice_pdf(invoice_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """The invoice as a PDF, rendered on first request and again whenever its content changes."""
+    doc = invoice_pdf.get_document(db, invoice_id)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    path = invoice_pdf.invoice_pdf_renderer.render(doc)
+    return FileResponse(path, media_type="application/pdf", filename=doc.filename)
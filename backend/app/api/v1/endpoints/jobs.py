@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.db.session import get_db
+from app.api.v1.endpoints.auth import get_current_user
+from app.schemas.job import JobCreate, JobResponse
+from app.services import job_queue
+import app.services.job_handlers  # noqa: F401  registers the job kinds
+
+router = APIRouter()
+
+@router.post("/", response_model=JobResponse, status_code=202)
+def submit_job(job: JobCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """Queue a report or maintenance job to run on a worker; poll GET /jobs/{job_id} for its result."""
+    handler = job_queue.HANDLERS.get(job.kind)
+    if handler is None or not handler.submittable:
+        kinds = sorted(kind for kind, h in job_queue.HANDLERS.items() if h.submittable)
+        raise HTTPException(status_code=400, detail=f"Unknown job kind '{job.kind}'. Available: {', '.join(kinds)}")
+    if handler.admin_only and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only admins can submit this job.")
+    try:
+        payload = job_queue.validate_payload(handler, job.payload)
+    except job_queue.InvalidJobPayload as e:
+        raise HTTPException(status_code=400, detail=f"Invalid payload for '{job.kind}': {e}")
+    return job_queue.enqueue(db, job.kind, payload, priority=job.priority, user_id=current_user.id)
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(job_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """Status, progress and, once it has succeeded, the result of a job."""
+    job = job_queue.get_job(db, job_id)
+    if not job or not (current_user.is_admin or job.created_by in (None, current_user.id)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
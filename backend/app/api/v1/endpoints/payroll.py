@@ -1,25 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from app.db import models, session
 from app.schemas import payroll as payroll_schemas
 from app.services import payroll_service
+from app.utils.pagination import PageParams, page_params, set_next_cursor
+from typing import Optional
 
 router = APIRouter()
 
-@router.post("/payroll/generate", response_model=payroll_schemas.PayrollResponse)
-def generate_payroll(payroll_data: payroll_schemas.PayrollCreate, db: Session = Depends(session.get_db)):
-    return payroll_service.generate_payroll(payroll_data, db)
+@router.post("/payroll/generate", response_model=payroll_schemas.PayrollRunResponse, status_code=202)
+def generate_payroll(
+    run_data: payroll_schemas.PayrollRunCreate,
+    db: Session = Depends(session.get_db)
+):
+    """Start a payroll run for every staff member in the period; poll /payroll/runs/{run_id} for progress."""
+    try:
+        return payroll_service.generate_payroll(run_data, db)
+    except payroll_service.PayrollRunInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
-@router.get("/payroll/{staff_id}", response_model=payroll_schemas.PayrollResponse)
+@router.get("/payroll/runs/{run_id}", response_model=payroll_schemas.PayrollRunResponse)
+def get_payroll_run(run_id: int, db: Session = Depends(session.get_db)):
+    run = payroll_service.get_run(db, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Payroll run not found")
+    if run.status in (payroll_service.PENDING, payroll_service.RUNNING) and payroll_service.fail_abandoned_runs(db, run_id=run_id):
+        db.refresh(run)
+    return run
+
+@router.get("/payroll/{staff_id}", response_model=payroll_schemas.PayrollEntry)
 def get_payroll(staff_id: int, db: Session = Depends(session.get_db)):
     payroll = payroll_service.get_payroll_by_staff_id(staff_id, db)
     if not payroll:
         raise HTTPException(status_code=404, detail="Payroll not found")
     return payroll
 
-@router.get("/payroll", response_model=list[payroll_schemas.PayrollResponse])
-def list_payrolls(db: Session = Depends(session.get_db)):
-    return payroll_service.list_payrolls(db)
+@router.get("/payroll", response_model=list[payroll_schemas.PayrollEntry])
+def list_payrolls(
+    response: Response,
+    staff_id: Optional[int] = None,
+    period: Optional[str] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(session.get_db)
+):
+    payrolls, next_cursor = payroll_service.list_payrolls(db, page, staff_id=staff_id, period=period)
+    set_next_cursor(response, next_cursor)
+    return payrolls
 
 @router.delete("/payroll/{payroll_id}", response_model=dict)
 def delete_payroll(payroll_id: int, db: Session = Depends(session.get_db)):
@@ -1,64 +1,89 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.db.models.production_requirement import ProductionRequirement, ProductionRequirementItem
-from app.db.models.raw_material import RawMaterial
-from app.db.models.inventory import Inventory
-from app.db.models.product import Product
+from app.services.production_planning import PlanLine, ProductionPlanError, approve_plan, plan_production
+from app.core.cache import reference_cache, RAW_MATERIALS
 from app.schemas.inventory import (
     ProductionCalculationRequest, ProductionCalculationResponse, ProductionMaterialRequirement,
-    ProductionApprovalRequest, ProductionApprovalResponse
+    ProductionApprovalRequest, ProductionApprovalResponse,
+    ProductionPlanRequest, ProductionPlanMaterial, ProductionPlanResponse
 )
 
 router = APIRouter()
 
+def _material_requirements(plan, product_id: int):
+    return [
+        ProductionMaterialRequirement(
+            raw_material_id=raw_material_id,
+            raw_material_name=plan.materials[raw_material_id].raw_material_name,
+            quantity_needed=quantity,
+        )
+        for raw_material_id, quantity in plan.product_materials.get(product_id, [])
+    ]
+
+def _plan_response(plan) -> ProductionPlanResponse:
+    quantities = {}
+    for line in plan.lines:
+        quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+    return ProductionPlanResponse(
+        feasible=plan.feasible,
+        products=[
+            ProductionCalculationResponse(
+                product_id=product_id, quantity=quantity, materials=_material_requirements(plan, product_id)
+            )
+            for product_id, quantity in quantities.items()
+        ],
+        materials=[
+            ProductionPlanMaterial(
+                raw_material_id=need.raw_material_id,
+                raw_material_name=need.raw_material_name,
+                quantity_needed=need.quantity_needed,
+                available=need.available,
+                shortage=need.shortage,
+            )
+            for need in plan.materials.values()
+        ],
+        missing_requirements=plan.missing_requirements,
+    )
+
+def _approve(db: Session, lines):
+    try:
+        plan = approve_plan(db, lines)
+    except ProductionPlanError as e:
+        db.rollback()
+        if e.plan.missing_requirements:
+            raise HTTPException(status_code=404, detail="Production requirement not found for product")
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    reference_cache.invalidate(RAW_MATERIALS)
+    return plan
+
 @router.post("/calculate-materials", response_model=ProductionCalculationResponse)
 def calculate_materials(data: ProductionCalculationRequest, db: Session = Depends(get_db)):
-    pr = db.query(ProductionRequirement).filter(ProductionRequirement.product_id == data.product_id).first()
-    if not pr:
+    plan = plan_production(db, [PlanLine(data.product_id, data.quantity)])
+    if plan.missing_requirements:
         raise HTTPException(status_code=404, detail="Production requirement not found for product")
-    items = db.query(ProductionRequirementItem).filter(ProductionRequirementItem.production_requirement_id == pr.id).all()
-    materials = []
-    for item in items:
-        raw_mat = db.query(RawMaterial).filter(RawMaterial.id == item.raw_material_id).first()
-        if not raw_mat:
-            continue
-        materials.append(ProductionMaterialRequirement(
-            raw_material_id=raw_mat.id,
-            raw_material_name=raw_mat.name,
-            quantity_needed=item.quantity * data.quantity
-        ))
     return ProductionCalculationResponse(
         product_id=data.product_id,
         quantity=data.quantity,
-        materials=materials
+        materials=_material_requirements(plan, data.product_id)
     )
 
 @router.post("/approve-production", response_model=ProductionApprovalResponse)
 def approve_production(data: ProductionApprovalRequest, db: Session = Depends(get_db)):
-    pr = db.query(ProductionRequirement).filter(ProductionRequirement.product_id == data.product_id).first()
-    if not pr:
-        raise HTTPException(status_code=404, detail="Production requirement not found for product")
-    items = db.query(ProductionRequirementItem).filter(ProductionRequirementItem.production_requirement_id == pr.id).all()
-    updated_materials = []
-    for item in items:
-        raw_mat = db.query(RawMaterial).filter(RawMaterial.id == item.raw_material_id).first()
-        if not raw_mat:
-            continue
-        deduction = item.quantity * data.quantity
-        # Deduct from opening_stock (or inventory if you use that)
-        if raw_mat.opening_stock < deduction:
-            raise HTTPException(status_code=400, detail=f"Insufficient stock for {raw_mat.name}")
-        raw_mat.opening_stock -= deduction
-        db.add(raw_mat)
-        updated_materials.append(ProductionMaterialRequirement(
-            raw_material_id=raw_mat.id,
-            raw_material_name=raw_mat.name,
-            quantity_needed=deduction
-        ))
-    db.commit()
+    plan = _approve(db, [PlanLine(data.product_id, data.quantity)])
     return ProductionApprovalResponse(
         success=True,
         message="Production approved and raw material stock updated.",
-        updated_materials=updated_materials
+        updated_materials=_material_requirements(plan, data.product_id)
     )
+
+@router.post("/plan", response_model=ProductionPlanResponse)
+def plan_materials(data: ProductionPlanRequest, db: Session = Depends(get_db)):
+    """Raw material demand and shortages of a whole production plan; nothing is deducted."""
+    return _plan_response(plan_production(db, [PlanLine(l.product_id, l.quantity) for l in data.lines]))
+
+@router.post("/approve-plan", response_model=ProductionPlanResponse)
+def approve_production_plan(data: ProductionPlanRequest, db: Session = Depends(get_db)):
+    """Deduct the raw materials of every line in one transaction; all lines or none."""
+    return _plan_response(_approve(db, [PlanLine(l.product_id, l.quantity) for l in data.lines]))
@@ -4,6 +4,7 @@ from datetime import date
 from app.db.session import get_db
 from app.db.models.production_output import ProductionOutput
 from app.db.models.product import Product
+from app.services.rollup_service import refresh_production_analysis
 from typing import List
 
 from pydantic import BaseModel
@@ -49,6 +50,8 @@ def create_production_output(data: ProductionOutputRequest, db: Session = Depend
         production_date=prod_date
     )
     db.add(prod_output)
+    db.flush()
+    refresh_production_analysis(db, [(prod_output.product_id, prod_output.production_date)])
     db.commit()
     db.refresh(prod_output)
     return ProductionOutputResponse(
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from app.db.session import get_db
 from app.db.models.production_requirement import ProductionRequirement  # Use the model from db/models
 from app.db.models.production_requirement import ProductionRequirementItem  # If you have this in db/models
@@ -66,14 +66,13 @@ def get_production_requirement(req_id: int, db: Session = Depends(get_db)):
 
 @router.get("/", response_model=List[ProductionRequirementResponseSchema])
 def list_production_requirements(db: Session = Depends(get_db)):
-    prs = db.query(ProductionRequirement).all()
+    prs = db.query(ProductionRequirement).options(selectinload(ProductionRequirement.items)).all()
     result = []
     for pr in prs:
-        items = db.query(ProductionRequirementItem).filter(ProductionRequirementItem.production_requirement_id == pr.id).all()
         result.append(ProductionRequirementResponseSchema(
             id=pr.id,
             productId=pr.product_id,
-            requirements=[ProductionRequirementItemSchema(rawMaterialId=i.raw_material_id, quantity=i.quantity) for i in items]
+            requirements=[ProductionRequirementItemSchema(rawMaterialId=i.raw_material_id, quantity=i.quantity) for i in pr.items]
         ))
     return result
 
@@ -2,14 +2,19 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db.models.inventory import Product
+from app.core.cache import reference_cache, PRODUCTS
 
 router = APIRouter()
 
 @router.get("/")
 def get_products(db: Session = Depends(get_db)):
-    products = db.query(Product).all()
+    products = reference_cache.get_or_load(PRODUCTS, lambda: _product_rows(db), "list")
     if not products:
         raise HTTPException(status_code=404, detail="No products found")
+    return products
+
+def _product_rows(db: Session):
+    products = db.query(Product).all()
     return [
         {
             "id": p.id,
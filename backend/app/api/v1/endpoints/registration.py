@@ -3,6 +3,9 @@ from sqlalchemy.orm import Session
 from app.db import models
 from app.db.session import get_db
 from app.services.auth_service import create_user
+from app.services import stock_ledger
+from app.services.rollup_service import link_customer_invoices
+from app.core.cache import reference_cache, PRODUCTS, RAW_MATERIALS, CUSTOMERS, WAREHOUSES, SUPPLIERS, STAFF
 from app.schemas import registration as schemas
 from app.core.security import get_password_hash
 from datetime import datetime
@@ -58,6 +61,7 @@ def register_product(product: schemas.ProductCreate, db: Session = Depends(get_d
         db.add(new_product)
         db.commit()
         db.refresh(new_product)
+        reference_cache.invalidate(PRODUCTS)
         print("DEBUG: Product registered successfully:", new_product)
         return new_product
     except Exception as e:
@@ -74,8 +78,11 @@ def register_raw_material(raw_material: schemas.RawMaterialCreate, db: Session =
             raise HTTPException(status_code=400, detail="Raw material already registered")
         new_raw_material = models.RawMaterial(**raw_material.dict())
         db.add(new_raw_material)
+        db.flush()
+        stock_ledger.apply_stock_deltas(db, stock_ledger.RAW_MATERIAL, {(new_raw_material.id, stock_ledger.NO_WAREHOUSE): new_raw_material.opening_stock or 0})
         db.commit()
         db.refresh(new_raw_material)
+        reference_cache.invalidate(RAW_MATERIALS)
         print("DEBUG: New raw material created:", new_raw_material)
         return new_raw_material
     except Exception as e:
@@ -96,8 +103,12 @@ def register_customer(customer: schemas.CustomerCreate, db: Session = Depends(ge
             customer_data["customer_id"] = str(uuid.uuid4())
         new_customer = models.Customer(**customer_data)
         db.add(new_customer)
+        db.flush()
+        # Invoices already issued under this name join the customer's rollups
+        link_customer_invoices(db, new_customer.id, new_customer.name)
         db.commit()
         db.refresh(new_customer)
+        reference_cache.invalidate(CUSTOMERS)
         print("DEBUG: New customer created:", new_customer)
         return new_customer
     except Exception as e:
@@ -117,6 +128,7 @@ def register_warehouse(warehouse: schemas.WarehouseCreate, db: Session = Depends
         db.add(new_warehouse)
         db.commit()
         db.refresh(new_warehouse)
+        reference_cache.invalidate(WAREHOUSES)
         print("DEBUG: New warehouse created:", new_warehouse)
         return new_warehouse
     except Exception as e:
@@ -139,6 +151,7 @@ def register_supplier(supplier: schemas.SupplierCreate, db: Session = Depends(ge
         db.add(new_supplier)
         db.commit()
         db.refresh(new_supplier)
+        reference_cache.invalidate(SUPPLIERS)
         print("DEBUG: New supplier created:", new_supplier)
         return new_supplier
     except Exception as e:
@@ -209,6 +222,7 @@ def register_staff_profile(staff: schemas.StaffRegistration, db: Session = Depen
         db.add(new_staff)
         db.commit()
         db.refresh(new_staff)
+        reference_cache.invalidate(STAFF)
         return staff
     except Exception as e:
         print("Staff registration error:", e)
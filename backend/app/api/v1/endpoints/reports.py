@@ -1,15 +1,77 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.schemas.reports import SalesReport, ProductionReport, StaffPerformanceReport, SalaryReportResponse
+from app.db.session import get_async_db, get_db, get_db_sync
+from app.db.models.export_tracking import ExportTracking
+from app.api.v1.endpoints.auth import get_current_user
+from app.schemas.reports import SalesReport, SalesRollupRow, ProductionReport, StaffPerformanceReport, SalaryReportResponse
 from app.services.reports_service import ReportsService
+from app.services.rollup_service import rebuild_rollups
 from app.schemas.user_activity_report import UserActivityReport
 
 router = APIRouter()
 
 @router.get("/sales", response_model=SalesReport)
-def get_sales_report(start_date: str, end_date: str, db: Session = Depends(get_db)):
-    return ReportsService.get_sales_report(db, start_date, end_date)
+async def get_sales_report(start_date: str, end_date: str, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(ReportsService.sales_report_query(start_date, end_date))
+    invoices = result.scalars().all()
+    # Building the report from many invoices is CPU work; keep it off the event loop
+    return await run_in_threadpool(ReportsService.build_sales_report, invoices, start_date, end_date)
+
+@router.get("/sales/daily", response_model=list[SalesRollupRow])
+def get_daily_sales(
+    start_date: str,
+    end_date: str,
+    dimension: str = Query("total", pattern="^(total|customer|product|warehouse)$"),
+    key_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Daily sales aggregates from the rollup table, for dashboards."""
+    return ReportsService.get_daily_sales(db, start_date, end_date, dimension, key_id)
+
+@router.post("/rollups/rebuild", response_model=dict)
+def rebuild_report_rollups(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """Recompute the daily sales, customer and production rollups from the source tables."""
+    if not (current_user.role and current_user.role.lower() == 'admin'):
+        raise HTTPException(status_code=403, detail="Only admins can rebuild report rollups.")
+    rebuild_rollups(db)
+    return {"detail": "Report rollups rebuilt"}
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+@router.get("/sales/export")
+def export_sales_report(
+    start_date: date,
+    end_date: date,
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """Stream the sales report as CSV or NDJSON instead of building it in memory."""
+    # Validated before anything is written: once streaming starts the status is already 200
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    db.add(ExportTracking(user_id=current_user.id, export_type=f"sales_{export_format}", timestamp=datetime.utcnow()))
+    db.commit()
+
+    def generate():
+        # The stream outlives the request session, so it reads on its own connection
+        export_db = get_db_sync()
+        try:
+            yield from ReportsService.stream_sales_export(export_db, start_date.isoformat(), end_date.isoformat(), export_format)
+        finally:
+            export_db.close()
+
+    filename = f"sales_{start_date}_{end_date}.{export_format}"
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @router.get("/production", response_model=ProductionReport)
 def get_production_report(start_date: str, end_date: str, db: Session = Depends(get_db)):
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.schemas.returned_product import ReturnedProduct, ReturnedProductCreate
 from app.db.models.returned_product import ReturnedProduct as ReturnedProductModel
 from app.api.v1.endpoints.auth import get_current_user
 from app.db.session import get_db
+from app.db.models.inventory import Inventory
+from app.services import stock_ledger
+from app.utils.pagination import DateRange, PageParams, apply_date_range, date_range_params, page_params, paginate, set_next_cursor
 
 router = APIRouter()
 
@@ -16,13 +19,37 @@ def create_returned_product(
 ):
     db_returned_product = ReturnedProductModel(**returned_product.dict())
     db.add(db_returned_product)
+    if returned_product.warehouse_id:
+        # Restock the returned batch into the receiving warehouse
+        db.add(Inventory(
+            product_id=returned_product.product_id,
+            quantity=returned_product.quantity,
+            warehouse_id=returned_product.warehouse_id,
+            batch_no=returned_product.batch_no,
+            expiry_date=returned_product.expiry_date
+        ))
+        stock_ledger.apply_stock_deltas(db, stock_ledger.PRODUCT, {
+            (returned_product.product_id, returned_product.warehouse_id): returned_product.quantity
+        })
     db.commit()
     db.refresh(db_returned_product)
     return db_returned_product
 
 @router.get("/", response_model=List[ReturnedProduct])
 def get_returned_products(
+    response: Response,
+    warehouse_id: Optional[int] = None,
+    staff_id: Optional[int] = None,
+    page: PageParams = Depends(page_params),
+    date_range: DateRange = Depends(date_range_params),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    return db.query(ReturnedProductModel).all()
+    query = apply_date_range(db.query(ReturnedProductModel), ReturnedProductModel.date_of_return, date_range)
+    if warehouse_id is not None:
+        query = query.filter(ReturnedProductModel.warehouse_id == warehouse_id)
+    if staff_id is not None:
+        query = query.filter(ReturnedProductModel.receiving_staff_id == staff_id)
+    returns, next_cursor = paginate(query, page, ReturnedProductModel.id, ReturnedProductModel.date_of_return)
+    set_next_cursor(response, next_cursor)
+    return returns
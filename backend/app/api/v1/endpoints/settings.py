@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db.models.settings import Settings
+from app.core.cache import reference_cache, SETTINGS
 
 router = APIRouter()
 
@@ -12,7 +13,9 @@ from fastapi import Body
 @router.get("", response_model=list[SettingsOut], include_in_schema=False)
 @router.get("/", response_model=list[SettingsOut])
 def get_settings(db: Session = Depends(get_db)):
-    settings = db.query(Settings).all()
+    settings = reference_cache.get_or_load(
+        SETTINGS, lambda: [SettingsOut.model_validate(s) for s in db.query(Settings).all()], "list"
+    )
     if not settings:
         raise HTTPException(status_code=404, detail="No settings found")
     return settings
@@ -35,4 +38,5 @@ def create_or_update_settings(settings: SettingsCreate = Body(...), db: Session
         db.add(db_settings)
     db.commit()
     db.refresh(db_settings)
+    reference_cache.invalidate(SETTINGS)
     return db_settings
@@ -4,6 +4,7 @@ from app.db.session import get_db
 from app.db.models.staff import Staff
 from app.schemas.registration import StaffOut, StaffRegistration
 from sqlalchemy.exc import IntegrityError
+from app.core.cache import reference_cache, STAFF
 
 router = APIRouter()
 
@@ -12,10 +13,12 @@ router = APIRouter()
 @router.get("/", response_model=list[StaffOut])
 def get_staff(db: Session = Depends(get_db)):
     try:
-        staff_members = db.query(Staff).all()
+        staff_members = reference_cache.get_or_load(
+            STAFF, lambda: [StaffOut.model_validate(staff).model_dump() for staff in db.query(Staff).all()], "list"
+        )
         if not staff_members:
             raise HTTPException(status_code=404, detail="No staff members found")
-        return [StaffOut.model_validate(staff).model_dump() for staff in staff_members]
+        return staff_members
     except Exception as e:
         print("Staff endpoint error:", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -49,6 +52,7 @@ def register_staff(staff: StaffRegistration, db: Session = Depends(get_db)):
         db.add(new_staff)
         db.commit()
         db.refresh(new_staff)
+        reference_cache.invalidate(STAFF)
         return StaffOut.model_validate(new_staff)
     except IntegrityError as e:
         db.rollback()
@@ -2,25 +2,19 @@ from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db.models.supplier import Supplier
+from app.core.cache import reference_cache, SUPPLIERS
 
 router = APIRouter()
 
 @router.get("/")
 def get_suppliers(db: Session = Depends(get_db)):
-    suppliers = db.query(Supplier).all()
-    return [
-        {
-            "id": s.id,
-            "name": s.name,
-            "supplier_id": s.supplier_id,
-            "phone": s.phone_number,  # Use 'phone' for consistency
-            "address": s.address
-        }
-        for s in suppliers
-    ]
+    return reference_cache.get_or_load(SUPPLIERS, lambda: _supplier_rows(db), "list")
 
 @router.get("", include_in_schema=False)
 def get_suppliers_no_slash(db: Session = Depends(get_db)):
+    return get_suppliers(db)
+
+def _supplier_rows(db: Session):
     suppliers = db.query(Supplier).all()
     return [
         {
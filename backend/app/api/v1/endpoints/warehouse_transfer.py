@@ -1,17 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.db.models.inventory import Inventory
-from app.db.models.user_access import UserWarehouseAccess
+from typing import List
 from app.api.v1.endpoints.auth import get_current_user
+from app.services.access_control import check_warehouse_access, require_warehouse_access
 from app.db.models.warehouse_transfer import WarehouseTransfer
-from app.db.models.warehouse import Warehouse
-from app.db.models.product import Product
-from app.schemas.warehouse_transfer import WarehouseTransferCreate, WarehouseTransferResponse
-from fastapi import status
+from app.schemas.warehouse_transfer import TransferOrderCreate, WarehouseTransferCreate, WarehouseTransferResponse
+from app.services.stock_service import InsufficientStockError
+from app.services.transfer_service import TransferLine, missing_references, transfer_stock
 
 router = APIRouter()
 
+def _run_transfer(db: Session, lines: List[TransferLine]) -> List[int]:
+    if any(line.quantity <= 0 for line in lines):
+        raise HTTPException(status_code=400, detail="Transfer quantities must be greater than zero")
+    if any(line.from_warehouse_id == line.to_warehouse_id for line in lines):
+        raise HTTPException(status_code=400, detail="Source and destination warehouses must be different")
+    unknown_products, unknown_warehouses = missing_references(db, lines)
+    if unknown_products or unknown_warehouses:
+        raise HTTPException(status_code=404, detail="Warehouse or product not found")
+    try:
+        ids = transfer_stock(db, lines)
+    except InsufficientStockError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Insufficient stock in source warehouse: Product ID {', '.join(map(str, e.product_ids))}")
+    db.commit()
+    return ids
+
 @router.post("/transfer")
 def transfer_product(
     product_id: int,
@@ -19,29 +34,9 @@ def transfer_product(
     source_warehouse_id: int,
     dest_warehouse_id: int,
     db: Session = Depends(get_db),
-    current_user=Depends(get_current_user)
+    current_user=Depends(require_warehouse_access("source_warehouse_id", "dest_warehouse_id"))
 ):
-    # Access control
-    src_access = db.query(UserWarehouseAccess).filter_by(user_id=current_user.id, warehouse_id=source_warehouse_id).first()
-    dst_access = db.query(UserWarehouseAccess).filter_by(user_id=current_user.id, warehouse_id=dest_warehouse_id).first()
-    if not src_access or not dst_access:
-        raise HTTPException(status_code=403, detail="You do not have access to both warehouses.")
-    # Deduct from source
-    src_inv = db.query(Inventory).filter_by(product_id=product_id, warehouse_id=source_warehouse_id).first()
-    if not src_inv or src_inv.quantity < quantity:
-        raise HTTPException(status_code=400, detail="Insufficient stock in source warehouse.")
-    src_inv.quantity -= quantity
-    db.add(src_inv)
-    # Add to destination
-    dst_inv = db.query(Inventory).filter_by(product_id=product_id, warehouse_id=dest_warehouse_id).first()
-    if dst_inv:
-        dst_inv.quantity += quantity
-    else:
-        from app.db.models.inventory import Inventory
-        dst_inv = Inventory(product_id=product_id, warehouse_id=dest_warehouse_id, quantity=quantity)
-        db.add(dst_inv)
-    db.commit()
-    # Optionally, log the transfer in a new table
+    _run_transfer(db, [TransferLine(product_id, source_warehouse_id, dest_warehouse_id, quantity)])
     return {"detail": "Transfer successful"}
 
 @router.post("/warehouse-transfer", response_model=WarehouseTransferResponse)
@@ -50,31 +45,18 @@ def transfer_product_api(
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    # Check warehouses and product exist
-    from_wh = db.query(Warehouse).filter(Warehouse.id == transfer.from_warehouse_id).first()
-    to_wh = db.query(Warehouse).filter(Warehouse.id == transfer.to_warehouse_id).first()
-    product = db.query(Product).filter(Product.id == transfer.product_id).first()
-    if not from_wh or not to_wh or not product:
-        raise HTTPException(status_code=404, detail="Warehouse or product not found")
-    if transfer.from_warehouse_id == transfer.to_warehouse_id:
-        raise HTTPException(status_code=400, detail="Source and destination warehouses must be different")
-    # Check stock in from_warehouse (assuming Inventory model)
-    from app.db.models.inventory import Inventory
-    src_inv = db.query(Inventory).filter_by(product_id=transfer.product_id, warehouse_id=transfer.from_warehouse_id).first()
-    if not src_inv or src_inv.quantity < transfer.quantity:
-        raise HTTPException(status_code=400, detail="Insufficient stock in source warehouse")
-    src_inv.quantity -= transfer.quantity
-    db.add(src_inv)
-    # Add to destination
-    dst_inv = db.query(Inventory).filter_by(product_id=transfer.product_id, warehouse_id=transfer.to_warehouse_id).first()
-    if dst_inv:
-        dst_inv.quantity += transfer.quantity
-    else:
-        dst_inv = Inventory(product_id=transfer.product_id, warehouse_id=transfer.to_warehouse_id, quantity=transfer.quantity)
-        db.add(dst_inv)
-    # Log the transfer
-    transfer_obj = WarehouseTransfer(**transfer.dict())
-    db.add(transfer_obj)
-    db.commit()
-    db.refresh(transfer_obj)
-    return transfer_obj
+    ids = _run_transfer(db, [TransferLine(transfer.product_id, transfer.from_warehouse_id, transfer.to_warehouse_id, transfer.quantity)])
+    return db.get(WarehouseTransfer, ids[0])
+
+@router.post("/warehouse-transfer/order", response_model=List[WarehouseTransferResponse])
+def create_transfer_order(
+    order: TransferOrderCreate,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """Move many product lines between warehouses in one transaction; all lines succeed or none."""
+    lines = [TransferLine(l.product_id, l.from_warehouse_id, l.to_warehouse_id, l.quantity) for l in order.lines]
+    check_warehouse_access(current_user, *{wh for l in lines for wh in (l.from_warehouse_id, l.to_warehouse_id)})
+    ids = _run_transfer(db, lines)
+    transfers = {t.id: t for t in db.query(WarehouseTransfer).filter(WarehouseTransfer.id.in_(ids))}
+    return [transfers[i] for i in ids]
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db.models.warehouse import Warehouse
 from app.db.models.user import User
+from app.core.cache import reference_cache, WAREHOUSES
 
 router = APIRouter()
 
@@ -11,16 +12,19 @@ router = APIRouter()
 # Admin can access all warehouses, others only their assigned or registered ones
 @router.get("/")
 def get_warehouses(db: Session = Depends(get_db), user_id: int = None):
+    # The warehouse list is small; cache it whole and filter per caller
+    all_warehouses = reference_cache.get_or_load(WAREHOUSES, lambda: _warehouse_rows(db), "list")
     if user_id is not None:
         user = db.query(User).filter(User.id == user_id).first()
         if user and user.role and user.role.lower() == 'admin':
-            warehouses = db.query(Warehouse).all()
+            return all_warehouses
         elif user:
-            warehouses = db.query(Warehouse).filter(Warehouse.manager == user.full_name).all()
+            return [w for w in all_warehouses if w["manager"] == user.full_name]
         else:
-            warehouses = []
-    else:
-        warehouses = db.query(Warehouse).filter((Warehouse.manager == None) | (Warehouse.manager == '')).all()
+            return []
+    return [w for w in all_warehouses if not w["manager"]]
+
+def _warehouse_rows(db: Session):
     return [
         {
             "id": w.id,
@@ -29,7 +33,7 @@ def get_warehouses(db: Session = Depends(get_db), user_id: int = None):
             "manager": w.manager,
             "manager_phone": w.manager_phone
         }
-        for w in warehouses
+        for w in db.query(Warehouse).order_by(Warehouse.id).all()
     ]
 
 @router.get("", include_in_schema=False)
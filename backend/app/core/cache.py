@@ -0,0 +1,129 @@
+"""
+Reference Data Cache
+In-process TTL cache with LRU eviction for small, rarely written reference tables
+(products, warehouses, raw materials, suppliers, customers, settings, staff).
+Entries are keyed by (entity, *parts) and dropped per entity by the endpoints that write them.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from app.core.config import settings
+
+PRODUCTS = "products"
+RAW_MATERIALS = "raw_materials"
+WAREHOUSES = "warehouses"
+SUPPLIERS = "suppliers"
+CUSTOMERS = "customers"
+SETTINGS = "settings"
+STAFF = "staff"
+PRINCIPALS = "principals"
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a per-entity TTL."""
+
+    def __init__(self, max_entries: int, ttls: Dict[str, int], default_ttl: int, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttls = dict(ttls)
+        self.default_ttl = default_ttl
+        self.enabled = enabled
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _entity_stats(self, entity: str) -> Dict[str, int]:
+        return self._stats.setdefault(entity, {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0})
+
+    def get(self, entity: str, *parts: Hashable) -> Tuple[bool, Any]:
+        """Return (hit, value); expired entries count as misses and are dropped."""
+        key = (entity, *parts)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._entity_stats(entity)["hits"] += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self._entity_stats(entity)["misses"] += 1
+            return False, None
+
+    def set(self, entity: str, *parts: Hashable, value: Any) -> None:
+        key = (entity, *parts)
+        expires_at = time.monotonic() + self.ttls.get(entity, self.default_ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._entity_stats(evicted_key[0])["evictions"] += 1
+
+    def get_or_load(self, entity: str, loader: Callable[[], Any], *parts: Hashable) -> Any:
+        """
+        Return the cached value or call loader() and cache its result.
+        Loaders must return plain data (dicts or pydantic models), never session-bound ORM objects.
+        """
+        if not self.enabled:
+            return loader()
+        hit, value = self.get(entity, *parts)
+        if hit:
+            return value
+        value = loader()
+        self.set(entity, *parts, value=value)
+        return value
+
+    def invalidate(self, *entities: str) -> None:
+        """Drop every entry of the given entities; call after the write has been committed."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] in entities]:
+                del self._entries[key]
+            for entity in entities:
+                self._entity_stats(entity)["invalidations"] += 1
+
+    def discard(self, entity: str, *parts: Hashable) -> None:
+        """Drop a single entry, e.g. one user's principal."""
+        with self._lock:
+            if self._entries.pop((entity, *parts), None) is not None:
+                self._entity_stats(entity)["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entities = {}
+            for entity, counters in sorted(self._stats.items()):
+                lookups = counters["hits"] + counters["misses"]
+                entities[entity] = {
+                    **counters,
+                    "entries": sum(1 for k in self._entries if k[0] == entity),
+                    "hit_ratio": round(counters["hits"] / lookups, 4) if lookups else None,
+                    "ttl_seconds": self.ttls.get(entity, self.default_ttl),
+                }
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "entities": entities,
+            }
+
+
+reference_cache = TTLCache(
+    max_entries=settings.REFERENCE_CACHE_MAX_ENTRIES,
+    ttls=settings.REFERENCE_CACHE_TTLS,
+    default_ttl=settings.REFERENCE_CACHE_DEFAULT_TTL,
+    enabled=settings.REFERENCE_CACHE_ENABLED,
+)
+
+# Authenticated principals, keyed by user id; kept apart so reference data cannot evict them
+principal_cache = TTLCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttls={PRINCIPALS: settings.PRINCIPAL_CACHE_TTL},
+    default_ttl=settings.PRINCIPAL_CACHE_TTL,
+    enabled=settings.PRINCIPAL_CACHE_ENABLED,
+)
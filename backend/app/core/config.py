@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 import os
@@ -15,6 +15,16 @@ class Settings(BaseSettings):
         env="DATABASE_URL",
         description="PostgreSQL database connection string"
     )
+    # Each web worker process holds a sync and an async pool; together they may open
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW connections
+    # (64 by default), which times the worker count must stay under the database's limit.
+    # The hot paths (invoicing, stock levels, sales report, attendance, login) run on the async
+    # pool, where hundreds of in-flight requests share these connections and queue for one for
+    # up to pool_timeout; the sync pool only backs the threadpool endpoints and the job worker.
+    DB_POOL_SIZE: int = Field(default=8, env="DB_POOL_SIZE", description="Sync engine pool (threadpool endpoints, jobs)")
+    DB_MAX_OVERFLOW: int = Field(default=6, env="DB_MAX_OVERFLOW")
+    DB_ASYNC_POOL_SIZE: int = Field(default=20, env="DB_ASYNC_POOL_SIZE", description="Async engine pool (invoicing, stock levels, reports, attendance, login)")
+    DB_ASYNC_MAX_OVERFLOW: int = Field(default=30, env="DB_ASYNC_MAX_OVERFLOW")
     SECRET_KEY: str = Field(
         default="development-secret-key-change-in-production",
         env="SECRET_KEY",
@@ -22,6 +32,16 @@ class Settings(BaseSettings):
     )
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    BCRYPT_ROUNDS: int = Field(
+        default=12,
+        env="BCRYPT_ROUNDS",
+        description="bcrypt cost factor; stored hashes with another cost are upgraded at login"
+    )
+    PASSWORD_HASH_WORKERS: int = Field(
+        default=max(1, (os.cpu_count() or 2) // 2),
+        env="PASSWORD_HASH_WORKERS",
+        description="Threads reserved for bcrypt; bounds the CPU a login burst can take"
+    )
     
     # CORS Configuration
     ALLOWED_ORIGINS: List[str] = Field(
@@ -45,6 +65,149 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = Field(default="development", env="ENVIRONMENT")
     DEBUG: bool = Field(default=True, env="DEBUG")
 
+    # Reference data cache (products, warehouses, settings, staff, ...)
+    REFERENCE_CACHE_ENABLED: bool = Field(default=True, env="REFERENCE_CACHE_ENABLED")
+    REFERENCE_CACHE_MAX_ENTRIES: int = Field(
+        default=256,
+        env="REFERENCE_CACHE_MAX_ENTRIES",
+        description="Maximum cached entries before least recently used ones are evicted"
+    )
+    REFERENCE_CACHE_TTLS: Dict[str, int] = Field(
+        default={
+            "products": 300,
+            "raw_materials": 300,
+            "warehouses": 600,
+            "suppliers": 600,
+            "customers": 300,
+            "settings": 900,
+            "staff": 120,
+        },
+        env="REFERENCE_CACHE_TTLS",
+        description="Time to live in seconds per cached entity (JSON object)"
+    )
+    REFERENCE_CACHE_DEFAULT_TTL: int = Field(default=300, env="REFERENCE_CACHE_DEFAULT_TTL")
+
+    # Authenticated principal cache (user id -> role, status, warehouse grants)
+    PRINCIPAL_CACHE_ENABLED: bool = Field(default=True, env="PRINCIPAL_CACHE_ENABLED")
+    PRINCIPAL_CACHE_TTL: int = Field(
+        default=60,
+        env="PRINCIPAL_CACHE_TTL",
+        description="Seconds a resolved principal is reused before the user row is read again"
+    )
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = Field(default=1024, env="PRINCIPAL_CACHE_MAX_ENTRIES")
+
+    # Fingerprint identification (1:N matching)
+    FINGERPRINT_MATCH_THRESHOLD: int = Field(
+        default=70,
+        env="FINGERPRINT_MATCH_THRESHOLD",
+        description="Minimum confidence (0-100) for a template to count as a match"
+    )
+    FINGERPRINT_ACCEPT_CONFIDENCE: int = Field(
+        default=90,
+        env="FINGERPRINT_ACCEPT_CONFIDENCE",
+        description="Confidence at which the search stops without scoring the remaining shards"
+    )
+    FINGERPRINT_MATCH_POOL: str = Field(
+        default="auto",
+        env="FINGERPRINT_MATCH_POOL",
+        description="auto or process: a process pool when the matcher can be pickled, else threads; thread: always threads"
+    )
+    FINGERPRINT_MATCH_WORKERS: int = Field(default=min(4, os.cpu_count() or 1), env="FINGERPRINT_MATCH_WORKERS")
+    FINGERPRINT_MATCH_SHARD_SIZE: int = Field(
+        default=250,
+        env="FINGERPRINT_MATCH_SHARD_SIZE",
+        description="Minimum templates per shard; smaller galleries are searched in one shard"
+    )
+
+    # Request and SQL instrumentation, exposed on /metrics
+    METRICS_ENABLED: bool = Field(default=True, env="METRICS_ENABLED")
+    SLOW_REQUEST_MS: int = Field(
+        default=1000,
+        env="SLOW_REQUEST_MS",
+        description="Requests slower than this are logged with their slowest SQL statements"
+    )
+    SLOW_REQUEST_SQL_SAMPLES: int = Field(
+        default=5,
+        env="SLOW_REQUEST_SQL_SAMPLES",
+        description="Number of slowest statements kept per request for the slow-request log"
+    )
+
+    # Invoice import (POST /invoices/import)
+    INVOICE_IMPORT_MAX_BYTES: int = Field(
+        default=20 * 1024 * 1024,
+        env="INVOICE_IMPORT_MAX_BYTES",
+        description="Largest accepted upload; bigger batches must be split"
+    )
+
+    # Offline terminal attendance sync (POST /attendance/events/batch)
+    ATTENDANCE_REPLAY_WINDOW_HOURS: int = Field(
+        default=72,
+        env="ATTENDANCE_REPLAY_WINDOW_HOURS",
+        description="Events recorded longer ago than this are rejected; they would rewrite hours payroll has paid"
+    )
+
+    # Payroll runs
+    PAYROLL_RUN_BATCH_SIZE: int = Field(
+        default=500,
+        env="PAYROLL_RUN_BATCH_SIZE",
+        description="Staff members written per INSERT ... SELECT; progress is reported after each batch"
+    )
+
+    # Background jobs (python -m app.worker)
+    JOB_WORKERS: int = Field(default=2, env="JOB_WORKERS", description="Worker processes started by app.worker")
+    JOB_POLL_INTERVAL: float = Field(
+        default=1.0,
+        env="JOB_POLL_INTERVAL",
+        description="Seconds an idle worker waits before looking for due jobs again"
+    )
+    JOB_LEASE_SECONDS: int = Field(
+        default=900,
+        env="JOB_LEASE_SECONDS",
+        description="A running job not heard from for this long is assumed dead and requeued"
+    )
+    JOB_HEARTBEAT_SECONDS: float = Field(
+        default=60,
+        env="JOB_HEARTBEAT_SECONDS",
+        description="How often a worker renews the lease of the job it is running; well under JOB_LEASE_SECONDS"
+    )
+    JOB_RETRY_BACKOFF_SECONDS: int = Field(
+        default=30,
+        env="JOB_RETRY_BACKOFF_SECONDS",
+        description="Delay before the first retry of a failed job; doubles with every attempt"
+    )
+    JOB_MAX_ATTEMPTS: int = Field(default=3, env="JOB_MAX_ATTEMPTS")
+
+    # Invoice PDFs
+    INVOICE_PDF_DIR: str = Field(
+        default=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "storage", "invoice_pdfs"),
+        env="INVOICE_PDF_DIR",
+        description="Rendered invoice PDFs, named by a hash of their content"
+    )
+    INVOICE_PDF_WORKERS: int = Field(default=min(4, os.cpu_count() or 1), env="INVOICE_PDF_WORKERS")
+    INVOICE_PDF_BATCH_SIZE: int = Field(
+        default=200,
+        env="INVOICE_PDF_BATCH_SIZE",
+        description="Invoices loaded and rendered together when exporting a date range"
+    )
+    INVOICE_COMPANY_NAME: str = Field(default="AstroBSM-Oracle IVANSTAMAS", env="INVOICE_COMPANY_NAME")
+    INVOICE_COMPANY_ADDRESS: str = Field(default="", env="INVOICE_COMPANY_ADDRESS")
+    INVOICE_LOGO_URL: Optional[str] = Field(
+        default=None,
+        env="INVOICE_LOGO_URL",
+        description="Letterhead logo used when an invoice has no logo_url: a data: URI or a file under app/static"
+    )
+
+    # Startup
+    STARTUP_MIGRATIONS: str = Field(
+        default="check",
+        env="STARTUP_MIGRATIONS",
+        description=(
+            "What app startup does about the schema: 'check' only logs a mismatch and leaves migrating to "
+            "the release step (python -m app.release), 'upgrade' migrates (under the advisory lock) only when "
+            "alembic_version is behind the bundled head, 'off' skips the check"
+        )
+    )
+
 settings = Settings()
 
 # Patch: Convert postgres:// to postgresql:// for SQLAlchemy compatibility
@@ -0,0 +1,310 @@
+"""
+Metrics
+Per-route request latency, in-flight requests, SQL statement count and time per request
+and connection pool checkout waits, rendered in the Prometheus text format on /metrics.
+Metrics are plain in-process counters (one set per worker process), so no client library
+is needed. SQL timings come from SQLAlchemy engine events and are attributed to the
+request that issued them through a context variable; requests slower than
+SLOW_REQUEST_MS are logged with their slowest statements.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.slow_requests")
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+MAX_SQL_LENGTH = 500
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in items]
+
+
+class Gauge(Counter):
+    """Counter that can go down; collect, when given, supplies the values at render time."""
+    kind = "gauge"
+
+    def __init__(self, *args, collect: Optional[Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._collect = collect
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def samples(self) -> List[str]:
+        if self._collect is not None:
+            with self._lock:
+                self._values = dict(self._collect())
+        return super().samples()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labels -> [per-bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._values.get(labels)
+        return int(series[-1]) if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._values.items())
+        lines = []
+        for labels, series in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {int(series[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+_pools: Dict[str, object] = {}
+
+
+def _pool_stats() -> Iterable[Tuple[Tuple[str, ...], float]]:
+    for name, pool in sorted(_pools.items()):
+        if hasattr(pool, "checkedout"):
+            yield (name, "checked_out"), pool.checkedout()
+        if hasattr(pool, "checkedin"):
+            yield (name, "idle"), pool.checkedin()
+        if hasattr(pool, "overflow"):
+            yield (name, "overflow"), max(pool.overflow(), 0)
+
+
+REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+REQUEST_SECONDS = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")))
+IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled", ("method",)))
+REQUEST_STATEMENTS = registry.register(Histogram(
+    "http_request_sql_statements", "SQL statements executed per request", ("method", "route"), buckets=COUNT_BUCKETS))
+REQUEST_SQL_SECONDS = registry.register(Histogram(
+    "http_request_sql_duration_seconds", "Time spent in SQL per request", ("method", "route")))
+SQL_SECONDS = registry.register(Histogram(
+    "db_statement_duration_seconds", "SQL statement execution time by engine", ("engine",)))
+POOL_CHECKOUT_SECONDS = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("engine",)))
+POOL_CONNECTIONS = registry.register(Gauge(
+    "db_pool_connections", "Pooled connections by state", ("engine", "state"), collect=_pool_stats))
+STARTUP_SECONDS = registry.register(Gauge(
+    "app_startup_phase_seconds", "Time this worker process spent in each startup phase", ("phase",)))
+
+
+# --- per-request SQL attribution -----------------------------------------------
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    sql_seconds: float = 0.0
+    pool_wait_seconds: float = 0.0
+    # min-heap of (seconds, statement) holding the slowest statements
+    slowest: List[Tuple[float, str]] = field(default_factory=list)
+
+    def record(self, seconds: float, statement: str) -> None:
+        self.statements += 1
+        self.sql_seconds += seconds
+        sample = (seconds, statement[:MAX_SQL_LENGTH])
+        if len(self.slowest) < settings.SLOW_REQUEST_SQL_SAMPLES:
+            heapq.heappush(self.slowest, sample)
+        elif self.slowest and seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, sample)
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _timed_after_cursor_execute(engine_name: str):
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("metrics_started")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        SQL_SECONDS.observe(elapsed, engine_name)
+        stats = _current.get()
+        if stats is not None:
+            stats.record(elapsed, statement)
+    return after_cursor_execute
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get("metrics_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def _instrument_pool(pool, engine_name: str) -> None:
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            waited = time.perf_counter() - started
+            POOL_CHECKOUT_SECONDS.observe(waited, engine_name)
+            stats = _current.get()
+            if stats is not None:
+                stats.pool_wait_seconds += waited
+
+    pool.connect = timed_connect
+    _pools[engine_name] = pool
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Time every statement and pool checkout of an Engine or AsyncEngine; no-op for mock engines."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if sync_engine is None or not hasattr(sync_engine, "dispatch") or name in _pools:
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _timed_after_cursor_execute(name))
+    event.listen(sync_engine, "handle_error", _handle_error)
+    _instrument_pool(sync_engine.pool, name)
+
+
+# --- request middleware ----------------------------------------------------------
+
+def _route_template(request) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _log_slow_request(method: str, path: str, status: int, seconds: float, stats: RequestStats) -> None:
+    lines = [
+        f"Slow request: {method} {path} -> {status} in {seconds * 1000:.0f} ms; "
+        f"{stats.statements} SQL statements, {stats.sql_seconds * 1000:.0f} ms in SQL, "
+        f"{stats.pool_wait_seconds * 1000:.0f} ms waiting for a connection"
+    ]
+    for statement_seconds, statement in sorted(stats.slowest, reverse=True):
+        lines.append(f"  {statement_seconds * 1000:.1f} ms  {' '.join(statement.split())}")
+    logger.warning("\n".join(lines))
+
+
+async def observe_request(request, call_next):
+    """HTTP middleware body: times the request and the SQL it runs."""
+    method = request.method
+    stats = RequestStats()
+    token = _current.set(stats)
+    IN_FLIGHT.inc(method)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        IN_FLIGHT.dec(method)
+        _current.reset(token)
+        route = _route_template(request)
+        REQUESTS.inc(method, route, str(status))
+        REQUEST_SECONDS.observe(elapsed, method, route)
+        REQUEST_STATEMENTS.observe(stats.statements, method, route)
+        REQUEST_SQL_SECONDS.observe(stats.sql_seconds, method, route)
+        if elapsed * 1000 >= settings.SLOW_REQUEST_MS:
+            _log_slow_request(method, request.url.path, status, elapsed, stats)
+
+
+def render() -> str:
+    return registry.render()
@@ -0,0 +1,99 @@
+"""
+Schema Migrations
+Startup checks the database's alembic_version against the head revision bundled with
+the code in a single query and leaves the schema alone when they match, instead of
+running Alembic on every boot of every worker. Migrations themselves run once per
+deploy as a release step (python -m app.release), holding a PostgreSQL advisory lock
+so that replicas started together never migrate concurrently.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ALEMBIC_INI = os.path.join(BACKEND_DIR, "alembic.ini")
+
+# pg_advisory_lock key shared by every process that may run migrations
+MIGRATION_LOCK_KEY = 727_145_001
+
+
+def alembic_config():
+    from alembic.config import Config
+    config = Config(ALEMBIC_INI)
+    # Resolve the scripts next to alembic.ini rather than the current directory
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    # Leave the application's logging alone when migrating in-process
+    config.attributes["configure_logger"] = False
+    return config
+
+
+@lru_cache(maxsize=1)
+def bundled_heads() -> FrozenSet[str]:
+    """Head revision(s) of the migration scripts shipped with this build."""
+    from alembic.script import ScriptDirectory
+    return frozenset(ScriptDirectory.from_config(alembic_config()).get_heads())
+
+
+def database_revisions(connection: Connection) -> FrozenSet[str]:
+    """Revision(s) recorded in alembic_version; empty for a database never migrated."""
+    try:
+        return frozenset(connection.execute(text("SELECT version_num FROM alembic_version")).scalars())
+    except DBAPIError:
+        # No alembic_version table yet
+        return frozenset()
+    finally:
+        connection.rollback()
+
+
+@dataclass(frozen=True)
+class SchemaStatus:
+    current: FrozenSet[str]
+    heads: FrozenSet[str]
+
+    @property
+    def up_to_date(self) -> bool:
+        return self.current == self.heads
+
+    def describe(self) -> str:
+        current = ", ".join(sorted(self.current)) or "none"
+        return f"database at {current}, code at {', '.join(sorted(self.heads))}"
+
+
+def check_schema(engine: Engine) -> SchemaStatus:
+    heads = bundled_heads()
+    with engine.connect() as connection:
+        return SchemaStatus(database_revisions(connection), heads)
+
+
+def upgrade(engine: Engine) -> SchemaStatus:
+    """
+    Migrate to head under the migration advisory lock. Whoever gets the lock first
+    migrates; the others wait for it, see the schema is current and return. Returns the
+    status found once the lock was held.
+    """
+    from alembic import command
+
+    with engine.connect() as lock:
+        # A session-level lock: it survives the commits of migrations that run outside a transaction
+        lock.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        lock.commit()
+        try:
+            status = SchemaStatus(database_revisions(lock), bundled_heads())
+            if status.up_to_date:
+                logger.info("Schema is current (%s); nothing to migrate", status.describe())
+            else:
+                logger.info("Migrating: %s", status.describe())
+                command.upgrade(alembic_config(), "head")
+            return status
+        finally:
+            lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            lock.commit()
@@ -1,6 +1,6 @@
 from .user import User
 from .inventory import Product, Inventory
-from .payroll import Payroll, PayrollRecord
+from .payroll import Payroll, PayrollRecord, PayrollRun
 from .warehouse import Warehouse
 from .supplier import Supplier
 from .distributor import Distributor
@@ -21,7 +21,9 @@ from .product_stock_intake import ProductStockIntake
 from .production_analysis import ProductionAnalysis
 from .user_access import UserWarehouseAccess, UserSectionAccess
 from .returned_product import ReturnedProduct
+from .stock_balance import StockBalance
+from .job import Job
 
 __all__ = [
-    "User", "Product", "RawMaterial", "RawMaterialStockIntake", "Inventory", "Payroll", "PayrollRecord", "Warehouse", "Supplier", "Distributor", "Staff", "Customer", "CustomerPerformance", "Marketer", "Settings", "ProductionRequirement", "ProductionRequirementItem", "ProductionOutput", "ProductionConsoleOutput", "DeviceIntake", "ExportTracking", "Invoice", "InvoiceItem", "SalesSummary", "ProductStockIntake", "ProductionAnalysis", "UserWarehouseAccess", "UserSectionAccess", "ReturnedProduct"
+    "User", "Product", "RawMaterial", "RawMaterialStockIntake", "Inventory", "Payroll", "PayrollRecord", "PayrollRun", "Warehouse", "Supplier", "Distributor", "Staff", "Customer", "CustomerPerformance", "Marketer", "Settings", "ProductionRequirement", "ProductionRequirementItem", "ProductionOutput", "ProductionConsoleOutput", "DeviceIntake", "ExportTracking", "Invoice", "InvoiceItem", "SalesSummary", "ProductStockIntake", "ProductionAnalysis", "UserWarehouseAccess", "UserSectionAccess", "ReturnedProduct", "StockBalance", "Job"
 ]
\ No newline at end of file
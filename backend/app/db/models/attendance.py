@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, String, Float, Boolean, Text
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, String, Float, Boolean, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
 
 class AttendanceRecord(Base):
     __tablename__ = 'attendance_records'
+    __table_args__ = (
+        # One record per staff member and day; clock events are merged into it
+        UniqueConstraint('staff_id', 'date', name='uq_attendance_records_staff_date'),
+        Index('ix_attendance_records_date_id', 'date', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     staff_id = Column(Integer, ForeignKey('staff.id'), nullable=False)
@@ -25,3 +30,17 @@ class AttendanceRecord(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     staff = relationship('Staff', backref='attendance_records')
+
+
+class AttendanceEvent(Base):
+    """A clock event as received from a terminal; idempotency_key makes replays harmless."""
+    __tablename__ = 'attendance_events'
+
+    id = Column(Integer, primary_key=True, index=True)
+    idempotency_key = Column(String(128), nullable=False, unique=True)
+    device_id = Column(String, nullable=True)
+    staff_id = Column(Integer, ForeignKey('staff.id'), nullable=False, index=True)
+    action = Column(String, nullable=False)  # 'IN' or 'OUT'
+    occurred_at = Column(DateTime, nullable=False)
+    attendance_record_id = Column(Integer, ForeignKey('attendance_records.id'), nullable=True)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -6,8 +6,9 @@ class CustomerPerformance(Base):
     __tablename__ = 'customer_performance'
 
     id = Column(Integer, primary_key=True, index=True)
-    customer_id = Column(Integer, ForeignKey('customers.id'))
+    customer_id = Column(Integer, ForeignKey('customers.id'), unique=True)
     total_transactions = Column(Integer, nullable=False)
     total_amount = Column(Float, nullable=False)
+    last_invoice_date = Column(Date, nullable=True)
 
-    customer = relationship("Customer", back_populates="performance")
\ No newline at end of file
+    customer = relationship("Customer", back_populates="performance")
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
 
 class FingerprintTemplate(Base):
     __tablename__ = 'fingerprint_templates'
+    __table_args__ = (
+        # Matching galleries only ever load active templates
+        Index('ix_fingerprint_templates_active', 'staff_id', postgresql_where=text('is_active')),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     staff_id = Column(Integer, ForeignKey('staff.id'), nullable=False, unique=True)
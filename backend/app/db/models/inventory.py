@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from app.db.models.product import Product  # Import the unified Product model
 
 class Inventory(Base):
     __tablename__ = 'inventory'
+    __table_args__ = (
+        # lock_inventory: (product, warehouse) pairs in FEFO order
+        Index('ix_inventory_product_warehouse_expiry', 'product_id', 'warehouse_id', 'expiry_date'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey('products.id'))
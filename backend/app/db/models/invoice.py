@@ -1,14 +1,21 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from datetime import datetime
 
 class Invoice(Base):
     __tablename__ = 'invoices'
+    __table_args__ = (
+        # Date-range reports and the (date, id) keyset listing
+        Index('ix_invoices_date_id', 'date', 'id'),
+        Index('ix_invoices_customer_name', 'customer_name'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     invoice_number = Column(String, nullable=False, unique=True)
     customer_name = Column(String, nullable=False)
+    customer_id = Column(Integer, ForeignKey('customers.id'), nullable=True, index=True)
+    warehouse_id = Column(Integer, ForeignKey('warehouses.id'), nullable=True)
     total_amount = Column(Float, nullable=False)
     vat = Column(Float, default=7.5)
     status = Column(String, default='unpaid')
@@ -23,7 +30,7 @@ class InvoiceItem(Base):
     __tablename__ = 'invoice_items'
 
     id = Column(Integer, primary_key=True, index=True)
-    invoice_id = Column(Integer, ForeignKey('invoices.id'))
+    invoice_id = Column(Integer, ForeignKey('invoices.id'), index=True)
     product_id = Column(Integer, ForeignKey('products.id'))
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)
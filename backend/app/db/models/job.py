@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Index, text
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class Job(Base):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Workers claim the next due job in this order; only queued jobs are indexed
+        Index('ix_jobs_queue', text('priority DESC'), 'run_at', 'id', postgresql_where=text("status = 'queued'")),
+        Index('ix_jobs_running_locked_at', 'locked_at', postgresql_where=text("status = 'running'")),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default='queued')  # queued, running, succeeded, failed
+    priority = Column(Integer, nullable=False, default=0)  # higher runs first
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_by = Column(String, nullable=True)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    progress_current = Column(Integer, nullable=True)
+    progress_total = Column(Integer, nullable=True)
+    progress_message = Column(String, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_by = Column(Integer, ForeignKey('users.id'), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
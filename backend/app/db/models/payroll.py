@@ -1,18 +1,49 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Date, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Date, Float, Index, Text, func, text
 from sqlalchemy.orm import relationship
 from app.db.base import Base  # adjust import path as needed
 
 class Payroll(Base):
     __tablename__ = 'payroll'
+    __table_args__ = (Index('ix_payroll_staff_created_at', 'staff_id', 'created_at'),)
 
     id = Column(Integer, primary_key=True, index=True)
-    staff_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    staff_id = Column(Integer, ForeignKey('staff.id'), nullable=False)
     period = Column(String, nullable=False)
     hours_worked = Column(Numeric(10, 2), nullable=False)
     salary = Column(Numeric(10, 2), nullable=False)
     created_at = Column(DateTime, nullable=False)
+    run_id = Column(Integer, ForeignKey('payroll_runs.id'), nullable=True, index=True)
 
-    staff = relationship("User", back_populates="payrolls")
+    staff = relationship("Staff")
+    run = relationship("PayrollRun", back_populates="payrolls")
+
+class PayrollRun(Base):
+    """One payroll generation for a period; status and progress are polled while it runs."""
+    __tablename__ = 'payroll_runs'
+    __table_args__ = (
+        # At most one queued or running run per period: two would both replace its rows
+        Index('uq_payroll_runs_active_period', 'period', unique=True,
+              postgresql_where=text("status IN ('pending', 'running')"),
+              sqlite_where=text("status IN ('pending', 'running')")),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    period = Column(String, nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    status = Column(String, nullable=False, default='pending')  # pending, running, completed, failed
+    total_staff = Column(Integer, nullable=True)
+    processed_staff = Column(Integer, nullable=False, default=0)
+    total_hours = Column(Numeric(12, 2), nullable=True)
+    total_salary = Column(Numeric(14, 2), nullable=True)
+    error = Column(Text, nullable=True)
+    created_by = Column(Integer, ForeignKey('users.id'), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    job_id = Column(Integer, ForeignKey('jobs.id'), nullable=True)  # the payroll_run job executing it
+
+    payrolls = relationship("Payroll", back_populates="run")
 
 class PayrollRecord(Base):
     __tablename__ = "payroll_records"
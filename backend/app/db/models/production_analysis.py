@@ -1,11 +1,19 @@
-from sqlalchemy import Column, Integer, String, Date, Float
+from sqlalchemy import Column, Integer, String, Date, Float, ForeignKey, UniqueConstraint
 from app.db.base import Base
 
 class ProductionAnalysis(Base):
+    """Daily production rollup of production_output: one row per (product, production date)."""
     __tablename__ = "production_analysis"
+    __table_args__ = (
+        UniqueConstraint('product_id', 'production_date', name='uq_production_analysis_product_date'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=True)
     product_name = Column(String, index=True, nullable=False)
     production_date = Column(Date, nullable=False)
     quantity_produced = Column(Float, nullable=False)
-    remarks = Column(String, nullable=True)
\ No newline at end of file
+    good_products = Column(Integer, nullable=False, default=0)
+    damaged_products = Column(Integer, nullable=False, default=0)
+    efficiency = Column(Float, nullable=False, default=0)
+    remarks = Column(String, nullable=True)
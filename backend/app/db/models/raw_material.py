@@ -22,7 +22,7 @@ class RawMaterialStockIntake(Base):
     __tablename__ = 'raw_material_stock_intake'
 
     id = Column(Integer, primary_key=True, index=True)
-    raw_material_id = Column(Integer, ForeignKey('raw_materials.id'), nullable=False)
+    raw_material_id = Column(Integer, ForeignKey('raw_materials.id'), nullable=False, index=True)
     quantity = Column(Integer, nullable=False)
     supplier_id = Column(Integer, ForeignKey('suppliers.id'), nullable=False)
     expiry_date = Column(Date, nullable=False)
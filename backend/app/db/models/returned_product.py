@@ -15,6 +15,7 @@ class ReturnedProduct(Base):
     reason = Column(String, nullable=False)
     customer_id = Column(Integer, ForeignKey('customers.id'), nullable=False)
     receiving_staff_id = Column(Integer, ForeignKey('staff.id'), nullable=False)
+    warehouse_id = Column(Integer, ForeignKey('warehouses.id'), nullable=True)  # Restock target, if any
 
     product = relationship('Product')
     customer = relationship('Customer')
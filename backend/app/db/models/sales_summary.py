@@ -1,11 +1,27 @@
-from sqlalchemy import Column, Integer, Float, Date
+from sqlalchemy import Column, Integer, Float, Date, DateTime, String, UniqueConstraint
+from sqlalchemy.sql import func
 from app.db.base import Base
 
+# Rollup dimensions; key_id is the customer, product or warehouse id (0 for the daily total)
+DIMENSION_TOTAL = "total"
+DIMENSION_CUSTOMER = "customer"
+DIMENSION_PRODUCT = "product"
+DIMENSION_WAREHOUSE = "warehouse"
+
 class SalesSummary(Base):
+    """Daily sales rollup: one row per (day, dimension, key). Daily rows have start_date == end_date."""
     __tablename__ = 'sales_summary'
+    __table_args__ = (
+        UniqueConstraint('start_date', 'dimension', 'key_id', name='uq_sales_summary_day_dimension_key'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     total_sales = Column(Float, nullable=False)
     total_vat = Column(Float, nullable=False)
     start_date = Column(Date, nullable=False)
-    end_date = Column(Date, nullable=False)
\ No newline at end of file
+    end_date = Column(Date, nullable=False)
+    dimension = Column(String, nullable=False, default=DIMENSION_TOTAL)
+    key_id = Column(Integer, nullable=False, default=0)
+    transactions = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
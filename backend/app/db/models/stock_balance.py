@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class StockBalance(Base):
+    __tablename__ = 'stock_balance'
+
+    # One row per (item, warehouse); maintained incrementally by every stock write
+    item_type = Column(String, primary_key=True)  # 'product' or 'raw_material'
+    item_id = Column(Integer, primary_key=True)
+    warehouse_id = Column(Integer, primary_key=True, default=0)  # 0 = not warehouse-scoped (raw materials)
+    quantity = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -19,7 +19,6 @@ class User(Base):
 
     # Correct the reverse relationship
     payroll_records = relationship("PayrollRecord", back_populates="user")
-    payrolls = relationship("Payroll", back_populates="staff")
     activities = relationship("UserActivity", back_populates="user")
 
     def __repr__(self):
@@ -1,10 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from datetime import datetime
 
 class UserActivity(Base):
     __tablename__ = 'user_activity'
+    __table_args__ = (Index('ix_user_activity_user_timestamp', 'user_id', 'timestamp'),)
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     activity_type = Column(String, nullable=False)  # e.g., 'login', 'attendance', 'invoice'
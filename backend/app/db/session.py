@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from app.db.base import Base
@@ -31,12 +32,27 @@ class MockSession:
     def refresh(self, *args, **kwargs):
         pass
 
+    def execute(self, *args, **kwargs):
+        return MockResult()
+
 class MockQuery:
     def filter(self, *args, **kwargs):
         return self
     
     def filter_by(self, *args, **kwargs):
         return self
+
+    def join(self, *args, **kwargs):
+        return self
+
+    def outerjoin(self, *args, **kwargs):
+        return self
+
+    def order_by(self, *args, **kwargs):
+        return self
+
+    def limit(self, *args, **kwargs):
+        return self
     
     def first(self, *args, **kwargs):
         return None
@@ -47,9 +63,106 @@ class MockQuery:
     def count(self, *args, **kwargs):
         return 0
 
+class MockResult:
+    def __iter__(self):
+        return iter([])
+
+    def scalars(self):
+        return self
+
+    def unique(self):
+        return self
+
+    def all(self):
+        return []
+
+    def first(self):
+        return None
+
+    def scalar(self):
+        return None
+
+    def scalar_one_or_none(self):
+        return None
+
+class MockAsyncSession:
+    """Async counterpart of MockSession for endpoints using get_async_db."""
+    async def execute(self, *args, **kwargs):
+        return MockResult()
+
+    async def scalar(self, *args, **kwargs):
+        return None
+
+    async def get(self, *args, **kwargs):
+        return None
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(MockSession(), *args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        pass
+
+    async def flush(self, *args, **kwargs):
+        pass
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+    async def refresh(self, *args, **kwargs):
+        pass
+
+    async def close(self):
+        pass
+
+def _async_engine_args(url: str):
+    """
+    Build the asyncpg URL and connect args for a PostgreSQL URL.
+    asyncpg does not understand libpq's sslmode query parameter, so it is mapped to ssl.
+    """
+    async_url = make_url(url).set(drivername="postgresql+asyncpg")
+    query = dict(async_url.query)
+    sslmode = query.pop("sslmode", None)
+    async_url = async_url.set(query=query)
+    connect_args = {
+        "timeout": 20,
+        "server_settings": {
+            "application_name": "AstroBSM-Production-Async",
+            "statement_timeout": "30000",
+        },
+    }
+    if 'ondigitalocean.com' in url:
+        connect_args["server_settings"]["jit"] = "off"
+    if sslmode and sslmode != "disable":
+        connect_args["ssl"] = sslmode
+    elif 'ondigitalocean.com' in url:
+        connect_args["ssl"] = "require"
+    return async_url, connect_args
+
+def _create_async_session_maker(url: str):
+    async_url, connect_args = _async_engine_args(url)
+    async_engine = create_async_engine(
+        async_url,
+        connect_args=connect_args,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        pool_timeout=60,
+        pool_size=settings.DB_ASYNC_POOL_SIZE,
+        max_overflow=settings.DB_ASYNC_MAX_OVERFLOW,
+        echo=settings.DEBUG
+    )
+    return async_engine, async_sessionmaker(
+        bind=async_engine,
+        expire_on_commit=False,
+        class_=AsyncSession
+    )
+
 # Initialize session makers - always create them for imports even if not used
 engine = None
 SessionLocal = None
+async_engine = None
 async_session_maker = None
 
 if not SKIP_DATABASE and DATABASE_URL:
@@ -64,28 +177,14 @@ if not SKIP_DATABASE and DATABASE_URL:
                 pool_pre_ping=True,
                 pool_recycle=1800,
                 pool_timeout=60,
-                pool_size=10,
-                max_overflow=20,
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
                 echo=settings.DEBUG
             )
             SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
             
             # Async engine
-            async_engine = create_async_engine(
-                DATABASE_URL,
-                connect_args={"server_settings": {"jit": "off"}} if 'ondigitalocean.com' in DATABASE_URL else {},
-                pool_pre_ping=True,
-                pool_recycle=1800,
-                pool_timeout=60,
-                pool_size=10,
-                max_overflow=20,
-                echo=settings.DEBUG
-            )
-            async_session_maker = async_sessionmaker(
-                bind=async_engine,
-                expire_on_commit=False,
-                class_=AsyncSession
-            )
+            async_engine, async_session_maker = _create_async_session_maker(DATABASE_URL)
         else:
             # Synchronous database configuration
             connect_args = {
@@ -99,11 +198,17 @@ if not SKIP_DATABASE and DATABASE_URL:
                 pool_pre_ping=True,
                 pool_recycle=1800,
                 pool_timeout=60,
-                pool_size=10,
-                max_overflow=20,
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
                 echo=settings.DEBUG
             )
             SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+            # Async engine on the same database for endpoints using get_async_db
+            try:
+                async_engine, async_session_maker = _create_async_session_maker(DATABASE_URL)
+            except Exception as e:
+                print(f"[WARNING] Async database engine setup failed: {e}")
     except Exception as e:
         print(f"[WARNING] Database connection setup failed: {e}")
         print("[WARNING] Falling back to mock session")
@@ -142,6 +247,18 @@ def get_db():
         if hasattr(db, 'close'):
             db.close()
 
+async def get_async_db():
+    """
+    Async database session dependency.
+    Endpoints using it await the database instead of holding a threadpool worker while they wait.
+    """
+    if SKIP_DATABASE or async_session_maker is None:
+        yield MockAsyncSession()
+        return
+
+    async with async_session_maker() as db:
+        yield db
+
 def get_db_sync():
     """Synchronous database session getter."""
     if SKIP_DATABASE:
@@ -157,4 +274,4 @@ def get_db_async():
     if async_session_maker:
         return async_session_maker()
     else:
-        return MockSession()
+        return MockAsyncSession()
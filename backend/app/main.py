@@ -1,15 +1,19 @@
+import time
+_import_started = time.perf_counter()  # startup phase "import": loading the app and its routers
+
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from app.api.v1 import api_router
 from app.core.config import settings
+from app.core import metrics
 from app.services.auth_service import create_user
 from app.db.models.user import User
 from app.db.session import SessionLocal, async_session_maker
 from pydantic import BaseModel
 from app.api.v1.production_analysis import router as production_analysis_router
 from app.api.v1.endpoints import auth
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse
 from fastapi.requests import Request
 from fastapi.exception_handlers import RequestValidationError
 from fastapi.exceptions import HTTPException
@@ -70,14 +74,26 @@ app.add_middleware(
     max_age=600,
 )
 
-# Log all incoming requests for debugging
+# Request latency and SQL metrics (/metrics); slow requests are logged with their SQL
+if settings.METRICS_ENABLED:
+    from app.db import session as db_session
+    metrics.instrument_engine(db_session.engine, "sync")
+    metrics.instrument_engine(db_session.async_engine, "async")
+
 @app.middleware("http")
 async def log_requests(request, call_next):
-    logger.info(f"Request: {request.method} {request.url}")
-    response = await call_next(request)
-    logger.info(f"Response status: {response.status_code}")
+    logger.debug(f"Request: {request.method} {request.url}")
+    if settings.METRICS_ENABLED:
+        response = await metrics.observe_request(request, call_next)
+    else:
+        response = await call_next(request)
+    logger.debug(f"Response status: {response.status_code}")
     return response
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 app.include_router(production_analysis_router, prefix="/api/v1", tags=["Production Analysis"])
@@ -111,6 +127,7 @@ except Exception as e:
 import sqlalchemy
 from sqlalchemy.future import select
 import asyncio
+from contextlib import contextmanager
 async def create_default_admin():
     admin_username = "blakvelvet"
     admin_password = "chibuike_douglas"
@@ -128,31 +145,67 @@ async def create_default_admin():
         print("[WARNING] Could not create/check admin user. Table may not exist yet.")
         print(e)
 
-# Add FastAPI startup event to run migrations and create default admin
+@contextmanager
+def _startup_phase(timings: dict, name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - started
+        metrics.STARTUP_SECONDS.inc(name, amount=timings[name])
+
+
+async def check_schema_version(timings: dict):
+    """Compare alembic_version with the bundled head; migrate only when behind (STARTUP_MIGRATIONS)."""
+    from sqlalchemy.engine import Engine
+    from app.db.migrations import check_schema, upgrade
+    from app.db.session import engine
+
+    mode = settings.STARTUP_MIGRATIONS.lower()
+    # Without a usable DATABASE_URL session.py hands out a mock engine
+    if mode == "off" or not isinstance(engine, Engine):
+        return
+    with _startup_phase(timings, "schema_check"):
+        schema = await asyncio.to_thread(check_schema, engine)
+    if schema.up_to_date:
+        logger.info(f"✅ Schema is current ({schema.describe()}); skipping migrations")
+    elif mode == "upgrade":
+        logger.info(f"🔄 Schema differs ({schema.describe()}); running database migrations...")
+        with _startup_phase(timings, "migrations"):
+            await asyncio.to_thread(upgrade, engine)
+        logger.info("✅ Database migrations completed successfully")
+    else:
+        logger.error(f"❌ Schema does not match this build ({schema.describe()}); run python -m app.release")
+
+
+# Add FastAPI startup event to check the schema version and create default admin
 @app.on_event("startup")
 async def startup_event():
+    timings = {"import": time.perf_counter() - _import_started}
+    metrics.STARTUP_SECONDS.inc("import", amount=timings["import"])
+    try:
+        await _startup(timings)
+    finally:
+        total = time.perf_counter() - _import_started
+        phases = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items())
+        logger.info(f"⏱️ Startup took {total * 1000:.0f} ms ({phases})")
+
+
+async def _startup(timings: dict):
+    from app.services.fingerprint_service import fingerprint_gallery, matching_executor
+    with _startup_phase(timings, "fingerprint_warmup"):
+        matching_executor.warm_up(fingerprint_gallery.matcher)
+
     # Skip database operations if SKIP_DATABASE is set
     if os.environ.get("SKIP_DATABASE") == "true":
         logger.info("⚠️ SKIP_DATABASE is set - skipping database operations")
         logger.info("🔐 Fingerprint service will run in simulation mode")
         return
-    
-    logger.info("🔄 Running database migrations...")
+
     try:
-        import subprocess
-        import sys
-        # Set Alembic migration path to /app/app/alembic for container deployment
-        migration_path = "/app/app/alembic"
-        logger.info(f"🔧 Attempting migration in: {migration_path}")
-        result = subprocess.run([
-            sys.executable, "-m", "alembic", "upgrade", "head"
-        ], capture_output=True, text=True, cwd=migration_path)
-        if result.returncode == 0:
-            logger.info("✅ Database migrations completed successfully")
-        else:
-            logger.error(f"❌ Migration failed: {result.stderr}")
+        await check_schema_version(timings)
     except Exception as e:
-        logger.error(f"❌ Migration error: {e}")
+        logger.error(f"❌ Schema version check or migration failed: {e}")
 
     # Robust async_session_maker initialization
     try:
@@ -160,10 +213,18 @@ async def startup_event():
         global async_session_maker
         if async_session_maker is None or not callable(async_session_maker):
             async_session_maker = imported_async_session_maker
-        await create_default_admin()
+        with _startup_phase(timings, "default_admin"):
+            await create_default_admin()
     except Exception as e:
         logger.error(f"❌ async_session_maker initialization or admin creation failed: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    from app.services.fingerprint_service import matching_executor
+    from app.services.invoice_pdf import invoice_pdf_renderer
+    matching_executor.shutdown()
+    invoice_pdf_renderer.shutdown()
+
 async def get_db():
     if async_session_maker is None:
         from app.db.session import async_session_maker as imported_async_session_maker
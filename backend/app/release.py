@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Release Step
+Brings the database schema up to the migrations bundled with this build. Run it once
+per deploy, before the new web and worker processes start:
+
+    python -m app.release             (migrate to head)
+    python -m app.release --check     (exit 1 unless the schema is current; never migrates)
+
+Migrations run under a PostgreSQL advisory lock, so a release step started on several
+replicas at once migrates exactly once; the others wait and then find nothing to do.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger("app.release")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Migrate the database to the bundled head revision")
+    parser.add_argument("--check", action="store_true", help="only report whether the schema is current")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if os.getenv("SKIP_DATABASE", "false").lower() == "true":
+        logger.error("SKIP_DATABASE is set; there is no database to migrate")
+        return 2
+    from sqlalchemy.engine import Engine
+    from app.db.migrations import check_schema, upgrade
+    from app.db.session import engine
+    # session.py falls back to a mock engine when DATABASE_URL cannot be used
+    if not isinstance(engine, Engine):
+        logger.error("Could not set up a database engine from DATABASE_URL")
+        return 2
+
+    started = time.perf_counter()
+    if args.check:
+        status = check_schema(engine)
+        logger.info("Schema %s: %s", "is current" if status.up_to_date else "does not match this build", status.describe())
+        return 0 if status.up_to_date else 1
+    upgrade(engine)
+    logger.info("Schema at %s (%.1f s)", check_schema(engine).describe(), time.perf_counter() - started)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import date, datetime
 
 class AttendanceRecordCreate(BaseModel):
@@ -25,3 +25,36 @@ class AttendanceRecordOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+# Offline terminal sync: timestamped clock events replayed in batches. Without an
+# idempotency_key one is derived from device, staff, action and time, so a replayed
+# event is still recognised.
+
+class AttendanceEventIn(BaseModel):
+    idempotency_key: Optional[str] = Field(default=None, max_length=128)
+    device_id: Optional[str] = None
+    staff_id: Optional[int] = None
+    user_id: Optional[int] = None           # resolved like AttendanceRecordCreate.user_id
+    action: str  # 'IN' or 'OUT'
+    occurred_at: datetime
+    fingerprint_verified: Optional[bool] = False
+    verification_confidence: Optional[int] = None
+    auth_method: Optional[str] = 'fingerprint'
+
+class AttendanceEventBatch(BaseModel):
+    device_id: Optional[str] = None         # default for events without their own
+    events: List[AttendanceEventIn] = Field(min_length=1, max_length=5000)
+
+class AttendanceEventOutcome(BaseModel):
+    index: int
+    idempotency_key: str
+    status: str  # 'accepted', 'duplicate' or 'rejected'
+    staff_id: Optional[int] = None
+    attendance_record_id: Optional[int] = None
+    error: Optional[str] = None
+
+class AttendanceEventBatchResult(BaseModel):
+    accepted: int
+    duplicates: int
+    rejected: int
+    outcomes: List[AttendanceEventOutcome]
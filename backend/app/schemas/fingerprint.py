@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class FingerprintEnrollmentRequest(BaseModel):
@@ -28,6 +28,7 @@ class FingerprintVerificationResponse(BaseModel):
     attendance_id: Optional[int] = None
     message: str
     error: Optional[str] = None
+    shard_latencies_ms: Optional[List[float]] = None  # identification mode only
 
 class FingerprintTemplateOut(BaseModel):
     id: int
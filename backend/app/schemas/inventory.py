@@ -1,4 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field
+from datetime import date
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
 from typing import List, Optional
 
 class ProductBase(BaseModel):
@@ -164,4 +165,59 @@ class ProductionApprovalRequest(BaseModel):
 class ProductionApprovalResponse(BaseModel):
     success: bool
     message: str
-    updated_materials: list[ProductionMaterialRequirement]
\ No newline at end of file
+    updated_materials: list[ProductionMaterialRequirement]
+
+class ProductionPlanRequest(BaseModel):
+    lines: list[ProductionCalculationRequest] = Field(min_length=1, max_length=1000)
+
+class ProductionPlanMaterial(ProductionMaterialRequirement):
+    available: int
+    shortage: int
+
+class ProductionPlanResponse(BaseModel):
+    feasible: bool
+    products: list[ProductionCalculationResponse]
+    materials: list[ProductionPlanMaterial]
+    missing_requirements: list[int]
+# Batch stock intake (goods received notes). Lines use the same keys as the single-line
+# intake payloads and are validated one by one so errors can be reported per line.
+
+def _blank_to_none(value):
+    return None if value == "" else value
+
+class ProductIntakeLine(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    product_id: int = Field(alias="productId")
+    quantity: int = Field(gt=0)
+    intake_date: date = Field(alias="intakeDate")
+    expiry_date: Optional[date] = Field(default=None, alias="expiryDate")
+    staff_id: int = Field(alias="staffId")
+    warehouse_id: int = Field(alias="warehouseId")
+
+    _blank_expiry = field_validator("expiry_date", mode="before")(_blank_to_none)
+
+class RawMaterialIntakeLine(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    raw_material_id: int = Field(alias="rawMaterialId")
+    quantity: int = Field(gt=0)
+    supplier_id: int = Field(alias="supplier")
+    expiry_date: date = Field(alias="expiryDate")
+    date_of_intake: date = Field(alias="dateOfIntake")
+    intake_staff_id: int = Field(alias="intakeStaff")
+
+class IntakeBatch(BaseModel):
+    lines: List[dict] = Field(min_length=1)
+    atomic: bool = False  # reject the whole batch if any line is invalid
+
+class IntakeLineError(BaseModel):
+    line: int  # zero-based index into lines
+    errors: List[str]
+
+class IntakeBatchResult(BaseModel):
+    committed: bool
+    accepted: int
+    rejected: int
+    ids: List[Optional[int]]  # intake id per line, None for rejected lines
+    errors: List[IntakeLineError]
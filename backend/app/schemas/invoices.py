@@ -36,3 +36,17 @@ class InvoiceOut(InvoiceBase):
     items: list[InvoiceItemOut] = []
     class Config:
         from_attributes = True
+
+class InvoiceImportError(BaseModel):
+    invoice_number: Optional[str] = None
+    line: int  # line of the invoice (its first row for CSV) in the upload
+    errors: List[str]
+
+class InvoiceImportResult(BaseModel):
+    received: int
+    imported: int
+    duplicates: int  # invoice_number already present; skipped
+    rejected: int
+    errors: List[InvoiceImportError]
+    elapsed_seconds: float
+    invoices_per_second: float
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+class JobCreate(BaseModel):
+    kind: str = Field(..., description="Registered job kind, e.g. sales_report")
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    priority: int = Field(0, ge=-100, le=100, description="Higher runs first")
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    run_at: Optional[datetime] = None
+    progress_current: Optional[int] = None
+    progress_total: Optional[int] = None
+    progress_message: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
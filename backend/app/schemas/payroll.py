@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, List
 from decimal import Decimal
+from datetime import date, datetime
 
 class PayrollBase(BaseModel):
     employee_id: int
@@ -25,4 +26,46 @@ class PayrollResponse(BaseModel):
     deductions: Optional[List[str]] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class PayrollEntry(BaseModel):
+    id: int
+    staff_id: int
+    period: str
+    hours_worked: Decimal
+    salary: Decimal
+    created_at: datetime
+    run_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+class PayrollRunCreate(BaseModel):
+    period: str = Field(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="Pay period as YYYY-MM")
+    start_date: Optional[date] = Field(None, description="Defaults to the first day of the period")
+    end_date: Optional[date] = Field(None, description="Defaults to the last day of the period")
+
+    @model_validator(mode="after")
+    def check_dates(self):
+        if self.start_date and self.end_date and self.start_date > self.end_date:
+            raise ValueError("start_date must not be after end_date")
+        return self
+
+class PayrollRunResponse(BaseModel):
+    id: int
+    period: str
+    start_date: date
+    end_date: date
+    status: str
+    total_staff: Optional[int] = None
+    processed_staff: int = 0
+    total_hours: Optional[Decimal] = None
+    total_salary: Optional[Decimal] = None
+    error: Optional[str] = None
+    job_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
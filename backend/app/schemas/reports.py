@@ -13,6 +13,15 @@ class SalesReport(BaseModel):
     end_date: date
     transactions: List[InvoiceOut]
 
+class SalesRollupRow(BaseModel):
+    day: date
+    dimension: str
+    key_id: int
+    transactions: int
+    quantity: int
+    total_sales: float
+    total_vat: float
+
 class ProductionReport(BaseModel):
     # Define fields for production report
     pass
@@ -12,6 +12,7 @@ class ReturnedProductBase(BaseModel):
     reason: str
     customer_id: int
     receiving_staff_id: int
+    warehouse_id: Optional[int] = None
 
 class ReturnedProductCreate(ReturnedProductBase):
     pass
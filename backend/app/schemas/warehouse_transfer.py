@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 
 class WarehouseTransferBase(BaseModel):
@@ -11,6 +11,9 @@ class WarehouseTransferBase(BaseModel):
 class WarehouseTransferCreate(WarehouseTransferBase):
     pass
 
+class TransferOrderCreate(BaseModel):
+    lines: List[WarehouseTransferBase] = Field(min_length=1, max_length=1000)
+
 class WarehouseTransferResponse(WarehouseTransferBase):
     id: int
     timestamp: datetime
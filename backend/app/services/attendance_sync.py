@@ -0,0 +1,198 @@
+"""
+Attendance Sync Service
+Ingests clock events that gate terminals replay after losing connectivity. A batch of any
+size costs a fixed number of statements: one query resolves every staff member, one
+checks the idempotency keys, one INSERT ... ON CONFLICT (staff_id, date) merges the
+events into attendance records and one INSERT records the events. The merge keeps the
+earliest IN and the latest OUT of each day, so the result does not depend on the order
+events arrive in or on how often they are replayed. Events older than the replay window
+(ATTENDANCE_REPLAY_WINDOW_HOURS) are rejected, so a replay cannot rewrite old hours.
+"""
+
+import json
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, extract, func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.attendance import AttendanceEvent, AttendanceRecord
+from app.db.models.staff import Staff
+from app.db.models.user import User
+from app.schemas.attendance import (
+    AttendanceEventBatch,
+    AttendanceEventBatchResult,
+    AttendanceEventIn,
+    AttendanceEventOutcome,
+)
+
+ACTIONS = ("IN", "OUT")
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+ACCEPTED = "accepted"
+DUPLICATE = "duplicate"
+REJECTED = "rejected"
+
+
+def event_key(event: AttendanceEventIn, device_id: Optional[str]) -> str:
+    """The event's idempotency key, or one derived from what identifies a clock event."""
+    if event.idempotency_key:
+        return event.idempotency_key
+    who = f"s{event.staff_id}" if event.staff_id is not None else f"u{event.user_id}"
+    return f"{device_id or '-'}:{who}:{event.action}:{event.occurred_at.isoformat()}"[:128]
+
+
+def _local(moment: datetime) -> datetime:
+    """Attendance times are stored as naive local time, like datetime.now() in record_attendance."""
+    return moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
+
+
+def resolve_staff(db: Session, staff_ids, user_ids) -> Tuple[Dict[int, int], Dict[int, int]]:
+    """
+    ({staff id: staff id}, {user id: staff id}) in one query. A user id resolves like in
+    record_attendance: a staff member with that id first, else the staff member sharing
+    the user's email.
+    """
+    staff_ids, user_ids = set(staff_ids), set(user_ids)
+    if not staff_ids and not user_ids:
+        return {}, {}
+    direct = select(literal("staff").label("kind"), Staff.id.label("key"), Staff.id.label("staff_id")) \
+        .where(Staff.id.in_(staff_ids | user_ids))
+    by_email = select(literal("email").label("kind"), User.id.label("key"), Staff.id.label("staff_id")) \
+        .join(Staff, Staff.email == User.email) \
+        .where(User.id.in_(user_ids), User.email.isnot(None))
+    by_staff: Dict[int, int] = {}
+    by_email_match: Dict[int, int] = {}
+    for kind, key, staff_id in db.execute(union_all(direct, by_email)).all():
+        if kind == "staff":
+            by_staff[key] = staff_id
+        elif key not in by_email_match or staff_id < by_email_match[key]:
+            by_email_match[key] = staff_id
+    by_user = {user_id: by_staff.get(user_id, by_email_match.get(user_id)) for user_id in user_ids}
+    return by_staff, {user_id: staff_id for user_id, staff_id in by_user.items() if staff_id is not None}
+
+
+def _merge_records(db: Session, events: List[Tuple[int, str, AttendanceEventIn, str, datetime]]) -> Dict[Tuple[int, date], int]:
+    """Upsert one attendance record per (staff, day) touched by the events; returns their ids."""
+    days: Dict[Tuple[int, date], dict] = {}
+    for _, _, event, device_id, moment in sorted(events, key=lambda e: e[4]):
+        key = (event.staff_id, moment.date())
+        row = days.setdefault(key, {"staff_id": key[0], "date": key[1], "time_in": None, "time_out": None})
+        if event.action == "IN":
+            row["time_in"] = moment if row["time_in"] is None else min(row["time_in"], moment)
+        else:
+            row["time_out"] = moment if row["time_out"] is None else max(row["time_out"], moment)
+        # The latest event of the day describes how the record was last verified
+        row.update(
+            fingerprint_verified=bool(event.fingerprint_verified),
+            verification_confidence=event.verification_confidence,
+            auth_method=event.auth_method or "fingerprint",
+            device_info=json.dumps({"type": "terminal_sync", "device_id": device_id}),
+        )
+    rows = []
+    for key in sorted(days):
+        row = days[key]
+        time_in, time_out = row["time_in"], row["time_out"]
+        row["action"] = "OUT" if time_out else "IN"
+        row["hours_worked"] = (time_out - time_in).total_seconds() / 3600.0 \
+            if time_in and time_out and time_out > time_in else None
+        rows.append(row)
+
+    stmt = pg_insert(AttendanceRecord).values(rows)
+    time_in = func.least(AttendanceRecord.time_in, stmt.excluded.time_in)
+    time_out = func.greatest(AttendanceRecord.time_out, stmt.excluded.time_out)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AttendanceRecord.staff_id, AttendanceRecord.date],
+        set_={
+            "time_in": time_in,
+            "time_out": time_out,
+            "hours_worked": case((time_out > time_in, extract("epoch", time_out - time_in) / 3600.0), else_=None),
+            "action": case((time_out.isnot(None), "OUT"), else_="IN"),
+            "fingerprint_verified": stmt.excluded.fingerprint_verified,
+            "verification_confidence": stmt.excluded.verification_confidence,
+            "auth_method": stmt.excluded.auth_method,
+            "device_info": stmt.excluded.device_info,
+            "updated_at": func.now(),
+        },
+    ).returning(AttendanceRecord.id, AttendanceRecord.staff_id, AttendanceRecord.date)
+    return {(staff_id, day): record_id for record_id, staff_id, day in db.execute(stmt)}
+
+
+def ingest_events(db: Session, batch: AttendanceEventBatch) -> AttendanceEventBatchResult:
+    """Merge a batch of clock events into attendance records; the caller commits."""
+    now = datetime.now()
+    oldest = now - timedelta(hours=settings.ATTENDANCE_REPLAY_WINDOW_HOURS)
+    outcomes: List[AttendanceEventOutcome] = []
+    by_staff, by_user = resolve_staff(
+        db,
+        (e.staff_id for e in batch.events if e.staff_id is not None),
+        (e.user_id for e in batch.events if e.staff_id is None and e.user_id is not None),
+    )
+
+    seen = set()
+    candidates = []  # (index, key, event with resolved staff_id, device id, local time)
+    for index, event in enumerate(batch.events):
+        device_id = event.device_id or batch.device_id
+        key = event_key(event, device_id)
+        outcome = AttendanceEventOutcome(index=index, idempotency_key=key, status=REJECTED)
+        outcomes.append(outcome)
+        if key in seen:
+            outcome.status = DUPLICATE
+            continue
+        seen.add(key)
+        moment = _local(event.occurred_at)
+        staff_id = by_staff.get(event.staff_id) if event.staff_id is not None else by_user.get(event.user_id)
+        if event.action not in ACTIONS:
+            outcome.error = "Invalid action"
+        elif event.staff_id is None and event.user_id is None:
+            outcome.error = "No authentication data provided"
+        elif staff_id is None:
+            outcome.error = "User/Staff not found"
+        elif moment > now + MAX_CLOCK_SKEW:
+            outcome.error = "Event time is in the future"
+        elif moment < oldest:
+            outcome.error = "Event is older than the replay window"
+        else:
+            outcome.staff_id = staff_id
+            candidates.append((index, key, event.model_copy(update={"staff_id": staff_id}), device_id, moment))
+
+    if candidates:
+        keys = [key for _, key, _, _, _ in candidates]
+        known = set(db.execute(
+            select(AttendanceEvent.idempotency_key).where(AttendanceEvent.idempotency_key.in_(keys))
+        ).scalars())
+        fresh = [c for c in candidates if c[1] not in known]
+        for index, key, _, _, _ in candidates:
+            if key in known:
+                outcomes[index].status = DUPLICATE
+        if fresh:
+            record_ids = _merge_records(db, fresh)
+            inserted = set(db.execute(
+                pg_insert(AttendanceEvent).values([
+                    {
+                        "idempotency_key": key,
+                        "device_id": device_id,
+                        "staff_id": event.staff_id,
+                        "action": event.action,
+                        "occurred_at": moment,
+                        "attendance_record_id": record_ids.get((event.staff_id, moment.date())),
+                    }
+                    for _, key, event, device_id, moment in fresh
+                ])
+                .on_conflict_do_nothing(index_elements=[AttendanceEvent.idempotency_key])
+                .returning(AttendanceEvent.idempotency_key)
+            ).scalars())
+            for index, key, event, _, moment in fresh:
+                outcome = outcomes[index]
+                outcome.attendance_record_id = record_ids.get((event.staff_id, moment.date()))
+                # Lost the race to a concurrent replay; merging twice changed nothing
+                outcome.status = ACCEPTED if key in inserted else DUPLICATE
+
+    return AttendanceEventBatchResult(
+        accepted=sum(o.status == ACCEPTED for o in outcomes),
+        duplicates=sum(o.status == DUPLICATE for o in outcomes),
+        rejected=sum(o.status == REJECTED for o in outcomes),
+        outcomes=outcomes,
+    )
@@ -1,22 +1,25 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Optional
-from passlib.context import CryptContext
+from typing import FrozenSet, Optional
 from jose import JWTError, jwt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
 from app.db.models.user import User
-from app.schemas.auth import TokenData
+from app.core.cache import PRINCIPALS, principal_cache
 from app.core.config import settings
+from app.services.access_control import load_grants, mask_warehouse_ids, warehouse_mask
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+from app.services.password_service import (
+    pwd_context,
+    hash_password as get_password_hash,
+    verify_password,
+    verify_and_update,
+    verify_and_update_async,
+)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -28,7 +31,47 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def get_current_user(db: Session, token: str) -> Optional[User]:
+@dataclass(frozen=True)
+class Principal:
+    """What request handlers need to know about the caller; cached instead of the User row."""
+    id: int
+    username: str
+    role: str
+    status: Optional[str]
+    warehouse_mask: int = 0
+    sections: FrozenSet[str] = frozenset()
+
+    @property
+    def is_admin(self) -> bool:
+        return bool(self.role) and self.role.lower() == "admin"
+
+    @property
+    def warehouse_ids(self) -> FrozenSet[int]:
+        return mask_warehouse_ids(self.warehouse_mask)
+
+    def has_warehouses(self, *warehouse_ids: int) -> bool:
+        if any(warehouse_id is None or int(warehouse_id) < 0 for warehouse_id in warehouse_ids):
+            return False  # no grant can cover an id that is not a warehouse
+        required = warehouse_mask(warehouse_ids)
+        return self.warehouse_mask & required == required
+
+    def has_section(self, section_name: str) -> bool:
+        return self.is_admin or section_name in self.sections
+
+
+def load_principal(db: Session, user_id: int) -> Optional[Principal]:
+    user = db.query(User.id, User.username, User.role, User.status).filter(User.id == user_id).first()
+    if user is None:
+        return None
+    mask, sections = load_grants(db, user_id)
+    return Principal(user.id, user.username, user.role, user.status, mask, sections)
+
+
+def get_principal(db: Session, token: str) -> Principal:
+    """
+    Verify the token and resolve its principal from the cache by the user_id claim; the
+    database is only read on a cache miss. Tokens issued without user_id fall back to the username.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -36,16 +79,28 @@ def get_current_user(db: Session, token: str) -> Optional[User]:
     )
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.username == token_data.username).first()
-    if user is None:
+    user_id = payload.get("user_id")
+    if user_id is None:
+        username = payload.get("sub")
+        if username is None:
+            raise credentials_exception
+        user_id = db.query(User.id).filter(User.username == username).scalar()
+        if user_id is None:
+            raise credentials_exception
+    principal = principal_cache.get_or_load(PRINCIPALS, lambda: load_principal(db, user_id), user_id)
+    if principal is None:
+        principal_cache.discard(PRINCIPALS, user_id)
         raise credentials_exception
-    return user
+    return principal
+
+
+def invalidate_principal(*user_ids: int) -> None:
+    """Call after committing a change to a user's credentials, status, role or grants."""
+    for user_id in user_ids:
+        principal_cache.discard(PRINCIPALS, user_id)
+
 
 def create_user(db: Session, username: str, password: str, role: str = "user") -> User:
     """
@@ -76,7 +131,32 @@ def authenticate_user(db: Session, username: str, password: str, role: str = Non
 
     print(f"User found: username={user.username}, role={user.role}, status={user.status}")
 
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = verify_and_update(password, user.hashed_password)
+    if not verified:
+        print(f"Password verification failed for user: username={username}")
+        return None
+
+    if role and user.role != role:
+        print(f"Role mismatch for user: username={username}. Expected role={role}, Found role={user.role}")
+        return None
+
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+
+    print(f"Authentication successful for user: username={username}, role={user.role}")
+    return user
+
+async def authenticate_user_async(db: AsyncSession, username: str, password: str, role: str = None) -> Optional[User]:
+    """authenticate_user for async handlers: bcrypt runs on the password pool, not the event loop."""
+    print(f"Authenticating user: username={username}, role={role}")
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+    if not user:
+        print(f"User not found in database: username={username}")
+        return None
+
+    verified, new_hash = await verify_and_update_async(password, user.hashed_password)
+    if not verified:
         print(f"Password verification failed for user: username={username}")
         return None
 
@@ -84,6 +164,11 @@ def authenticate_user(db: Session, username: str, password: str, role: str = Non
         print(f"Role mismatch for user: username={username}. Expected role={role}, Found role={user.role}")
         return None
 
+    if new_hash:
+        # Cost factor changed since this hash was made; store one with the current cost
+        user.hashed_password = new_hash
+        await db.commit()
+
     print(f"Authentication successful for user: username={username}, role={user.role}")
     return user
 
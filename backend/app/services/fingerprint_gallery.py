@@ -0,0 +1,151 @@
+"""
+Fingerprint Template Gallery
+In-memory 1:N identification gallery. Active templates are decoded from base64 once and
+kept per process, and a pluggable matcher scores sample/template pairs. The gallery
+follows enrolments and deactivations incrementally instead of reloading the table.
+Neither the SDK nor the simulation exposes a coarse template class, so every search
+scores the whole gallery; parallel shards (fingerprint_matching) keep that fast. Every
+change bumps the gallery's version, which tells matching processes to reload it.
+"""
+
+import base64
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.db.models.fingerprint import FingerprintTemplate
+from app.utils.fingerprint_matchers import TemplateMatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MATCH_THRESHOLD = 70
+# Re-read rows changed slightly before the watermark so transactions that committed late are not missed
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+@dataclass(frozen=True)
+class GalleryEntry:
+    template_id: int
+    staff_id: int
+    finger_position: int
+    quality_score: int
+    data: bytes
+
+
+@dataclass(frozen=True)
+class GalleryMatch:
+    template_id: int
+    staff_id: int
+    confidence: int
+    candidates: int
+
+
+def decode_template(template_data: str) -> Optional[bytes]:
+    try:
+        return base64.b64decode(template_data)
+    except Exception as e:
+        logger.warning(f"Skipping undecodable fingerprint template: {e}")
+        return None
+
+
+class FingerprintGallery:
+    def __init__(self, matcher: TemplateMatcher):
+        self.matcher = matcher
+        self._entries: Dict[int, GalleryEntry] = {}
+        self._version = 0
+        self._watermark: Optional[datetime] = None
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    # --- maintenance -------------------------------------------------------
+
+    def upsert(self, template: FingerprintTemplate) -> None:
+        """Add or replace one template; inactive templates are removed."""
+        if not template.is_active:
+            self.remove(template.id)
+            return
+        data = decode_template(template.template_data)
+        if data is None:
+            self.remove(template.id)
+            return
+        entry = GalleryEntry(
+            template_id=template.id,
+            staff_id=template.staff_id,
+            finger_position=template.finger_position or 1,
+            quality_score=template.quality_score or 0,
+            data=data,
+        )
+        with self._lock:
+            # Refreshes re-read recently changed rows; an unchanged one must not bump the version
+            if self._entries.get(entry.template_id) != entry:
+                self._entries[entry.template_id] = entry
+                self._version += 1
+
+    def remove(self, template_id: int) -> None:
+        with self._lock:
+            if self._entries.pop(template_id, None) is not None:
+                self._version += 1
+
+    def refresh(self, db: Session) -> int:
+        """
+        Load the gallery on first use, afterwards apply only templates created or changed since
+        the last refresh. Returns the number of rows applied.
+        """
+        changed_at = func.coalesce(FingerprintTemplate.updated_at, FingerprintTemplate.created_at)
+        query = db.query(FingerprintTemplate, changed_at.label("changed_at"))
+        with self._lock:
+            if not self._loaded:
+                query = query.filter(FingerprintTemplate.is_active == True)
+            elif self._watermark is not None:
+                since = self._watermark - REFRESH_OVERLAP
+                query = query.filter(or_(changed_at >= since, changed_at.is_(None)))
+            rows = query.all()
+            for template, template_changed_at in rows:
+                self.upsert(template)
+                if template_changed_at is not None and (self._watermark is None or template_changed_at > self._watermark):
+                    self._watermark = template_changed_at
+            self._loaded = True
+        return len(rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._version += 1
+            self._watermark = None
+            self._loaded = False
+
+    # --- search ------------------------------------------------------------
+
+    def entries(self) -> List[GalleryEntry]:
+        """Every active template, in id order."""
+        return self.snapshot()[1]
+
+    def snapshot(self) -> Tuple[int, List[GalleryEntry]]:
+        """The version and every active template in id order, read together."""
+        with self._lock:
+            return self._version, [self._entries[i] for i in sorted(self._entries)]
+
+    def identify(self, sample: bytes, threshold: int = DEFAULT_MATCH_THRESHOLD) -> Optional[GalleryMatch]:
+        """Best-scoring template at or above threshold, or None."""
+        candidates = self.entries()
+        best = None
+        for entry in candidates:
+            confidence = self.matcher.score(sample, entry.data)
+            if confidence >= threshold and (best is None or confidence > best[1]):
+                best = (entry, confidence)
+        if best is None:
+            return None
+        entry, confidence = best
+        return GalleryMatch(entry.template_id, entry.staff_id, confidence, len(candidates))
@@ -0,0 +1,228 @@
+"""
+Parallel Fingerprint Matching
+Splits a gallery search into shards and scores them concurrently on a worker pool, off the
+event loop. Matchers that can be pickled run in a process pool so scoring is not serialised
+by the GIL; the workers keep the gallery resident (see app.utils.fingerprint_matchers) and
+each search sends them only the sample. Matchers bound to in-process resources (SDK/COM
+objects) run in a thread pool whose threads the matcher initialises itself.
+The search stops as soon as one shard finds a match at or above the accept confidence, and
+every search reports how long each shard took.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import List, Optional, Sequence, Tuple
+
+from app.services.fingerprint_gallery import FingerprintGallery, GalleryMatch
+from app.utils.fingerprint_matchers import (
+    Entry,
+    ShardResult,
+    TemplateMatcher,
+    init_process,
+    ping,
+    score_resident_shard,
+    score_shard,
+    write_snapshot,
+)
+
+logger = logging.getLogger(__name__)
+
+POOL_AUTO = "auto"
+POOL_PROCESS = "process"
+POOL_THREAD = "thread"
+
+
+@dataclass(frozen=True)
+class MatchOutcome:
+    match: Optional[GalleryMatch]
+    shards: Tuple[ShardResult, ...]
+    elapsed_ms: float
+    early_exit: bool
+
+    @property
+    def shard_latencies_ms(self) -> List[float]:
+        return [shard.elapsed_ms for shard in self.shards]
+
+
+@dataclass(frozen=True)
+class PublishedGallery:
+    version: int
+    path: str
+    shards: int
+    candidates: int
+
+
+class MatchingExecutor:
+    """
+    Worker pools for gallery searches. Each pool is set up for the first matcher it runs
+    (its initializer), so one executor serves one matcher.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        shard_size: int,
+        pool: str = POOL_AUTO,
+        threshold: int = 70,
+        accept_confidence: int = 90,
+    ):
+        if pool not in (POOL_AUTO, POOL_PROCESS, POOL_THREAD):
+            raise ValueError(f"Unknown fingerprint matching pool: {pool}")
+        self.workers = max(1, workers)
+        self.shard_size = max(1, shard_size)
+        self.pool = pool
+        self.threshold = threshold
+        self.accept_confidence = max(accept_confidence, threshold)
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._snapshot_dir: Optional[str] = None
+        self._published: Optional[PublishedGallery] = None
+        self._lock = threading.Lock()
+
+    def uses_processes(self, matcher: TemplateMatcher) -> bool:
+        if self.pool == POOL_THREAD or self.workers == 1 or not matcher.process_safe:
+            return False
+        return True
+
+    def thread_workers(self, matcher: TemplateMatcher) -> int:
+        return min(self.workers, matcher.max_workers or self.workers)
+
+    def _executor(self, processes: bool, matcher: TemplateMatcher) -> Executor:
+        with self._lock:
+            if processes:
+                if self._process_pool is None:
+                    # spawn: forking a server that holds DB connections and threads is unsafe
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                        initializer=init_process, initargs=(matcher,),
+                    )
+                return self._process_pool
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self.thread_workers(matcher), thread_name_prefix="fp-match",
+                    initializer=matcher.init_worker,
+                )
+            return self._thread_pool
+
+    def warm_up(self, matcher: TemplateMatcher) -> None:
+        """
+        Start the worker processes in the background; spawning them takes long enough that it
+        must not land on the first clock-in of a shift.
+        """
+        if self.uses_processes(matcher):
+            executor = self._executor(True, matcher)
+            for _ in range(self.workers):
+                executor.submit(ping)
+
+    def shard(self, entries: Sequence[Entry], workers: Optional[int] = None) -> List[Sequence[Entry]]:
+        """At most one shard per worker, and no shard smaller than shard_size unless it is the only one."""
+        count = max(1, min(workers or self.workers, len(entries) // self.shard_size))
+        size = -(-len(entries) // count) if entries else 0
+        return [entries[i:i + size] for i in range(0, len(entries), size)] if entries else []
+
+    def publish(self, version: int, entries: Sequence[Entry]) -> PublishedGallery:
+        """
+        Write the gallery's shards for the process workers once per gallery version. The
+        previous snapshot is kept for searches still running against it.
+        """
+        with self._lock:
+            published = self._published
+            if published is not None and published.version == version:
+                return published
+            if self._snapshot_dir is None:
+                self._snapshot_dir = tempfile.mkdtemp(prefix="fp-gallery-")
+            shards = self.shard(entries)
+            path = os.path.join(self._snapshot_dir, f"gallery-{version}.pkl")
+            write_snapshot(path + ".tmp", shards)
+            os.replace(path + ".tmp", path)
+            keep = {path, published.path if published else None}
+            for name in os.listdir(self._snapshot_dir):
+                if os.path.join(self._snapshot_dir, name) not in keep:
+                    os.remove(os.path.join(self._snapshot_dir, name))
+            self._published = PublishedGallery(version, path, len(shards), len(entries))
+            return self._published
+
+    async def identify(
+        self, gallery: FingerprintGallery, sample: bytes, threshold: Optional[int] = None
+    ) -> MatchOutcome:
+        """Search the gallery for sample; returns the match (if any) with per-shard timings."""
+        threshold = self.threshold if threshold is None else threshold
+        accept_confidence = max(self.accept_confidence, threshold)
+        started = time.perf_counter()
+        matcher = gallery.matcher
+        version, candidates = gallery.snapshot()
+        entries = [(entry.template_id, entry.staff_id, entry.data) for entry in candidates]
+
+        # A gallery that fits in one shard is scored in-process
+        processes = self.uses_processes(matcher) and len(self.shard(entries)) > 1
+        loop = asyncio.get_running_loop()
+        executor = self._executor(processes, matcher)
+        stop = None
+        if processes:
+            published = self.publish(version, entries)
+            futures = [
+                loop.run_in_executor(
+                    executor,
+                    partial(score_resident_shard, published.path, number, sample, threshold, accept_confidence),
+                )
+                for number in range(published.shards)
+            ]
+        else:
+            stop = threading.Event()
+            futures = [
+                loop.run_in_executor(
+                    executor,
+                    partial(score_shard, matcher, sample, number, shard, threshold, accept_confidence, stop),
+                )
+                for number, shard in enumerate(self.shard(entries, self.thread_workers(matcher)))
+            ]
+
+        results: List[ShardResult] = []
+        early_exit = False
+        try:
+            for next_done in asyncio.as_completed(futures):
+                result = await next_done
+                results.append(result)
+                if result.confidence >= accept_confidence:
+                    early_exit = True
+                    break
+        finally:
+            if stop is not None:
+                stop.set()
+            for future in futures:
+                future.cancel()
+
+        best = max((r for r in results if r.template_id is not None), key=lambda r: r.confidence, default=None)
+        match = GalleryMatch(best.template_id, best.staff_id, best.confidence, len(candidates)) if best else None
+        outcome = MatchOutcome(
+            match=match,
+            shards=tuple(sorted(results, key=lambda r: r.shard)),
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 3),
+            early_exit=early_exit,
+        )
+        logger.info(
+            f"Fingerprint search: {len(candidates)} candidates in {len(futures)} shard(s) "
+            f"({'process' if processes else 'thread'} pool), {outcome.elapsed_ms} ms, "
+            f"shard ms {outcome.shard_latencies_ms}, early exit {early_exit}, "
+            f"matched {match.template_id if match else None}"
+        )
+        return outcome
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for pool in (self._process_pool, self._thread_pool):
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = self._thread_pool = None
+            if self._snapshot_dir is not None:
+                shutil.rmtree(self._snapshot_dir, ignore_errors=True)
+            self._snapshot_dir = self._published = None
@@ -26,6 +26,10 @@ from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db.models.staff import Staff
 from app.db.models.fingerprint import FingerprintTemplate
+from app.core.config import settings
+from app.services.fingerprint_gallery import FingerprintGallery
+from app.services.fingerprint_matching import MatchingExecutor, MatchOutcome
+from app.utils.fingerprint_matchers import DigitalPersonaMatcher, SimulationMatcher, TemplateMatcher
 
 logger = logging.getLogger(__name__)
 
@@ -255,6 +259,34 @@ class DigitalPersonaService:
             logger.error(f"Error comparing fingerprint: {e}")
             return False
     
+    def create_matcher(self) -> TemplateMatcher:
+        if self.sdk_available and self._initialized:
+            # Not self.verification: that COM object belongs to this thread's apartment
+            return DigitalPersonaMatcher()
+        return SimulationMatcher()
+
+    async def identify_fingerprint(
+        self,
+        gallery: FingerprintGallery,
+        executor: MatchingExecutor,
+        max_attempts: int = 3,
+        threshold: Optional[int] = None,
+    ) -> Optional[MatchOutcome]:
+        """
+        Capture one sample per attempt and search the whole gallery with it in parallel shards,
+        instead of capturing once per enrolled template. Returns the last attempt's outcome.
+        """
+        outcome = None
+        for attempt in range(max_attempts):
+            logger.info(f"Identification attempt {attempt + 1}/{max_attempts}")
+            sample = await self.capture_fingerprint(timeout=15)
+            if not sample:
+                continue
+            outcome = await executor.identify(gallery, base64.b64decode(sample), threshold)
+            if outcome.match:
+                return outcome
+        return outcome
+
     def cleanup(self):
         """Clean up SDK resources."""
         if self.sdk_available and self._initialized:
@@ -266,3 +298,11 @@ class DigitalPersonaService:
 
 # Global service instance
 fingerprint_service = DigitalPersonaService()
+fingerprint_gallery = FingerprintGallery(fingerprint_service.create_matcher())
+matching_executor = MatchingExecutor(
+    workers=settings.FINGERPRINT_MATCH_WORKERS,
+    shard_size=settings.FINGERPRINT_MATCH_SHARD_SIZE,
+    pool=settings.FINGERPRINT_MATCH_POOL,
+    threshold=settings.FINGERPRINT_MATCH_THRESHOLD,
+    accept_confidence=settings.FINGERPRINT_ACCEPT_CONFIDENCE,
+)
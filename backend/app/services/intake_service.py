@@ -0,0 +1,156 @@
+"""
+Stock Intake Service
+Records goods-received lines for products and raw materials in batches. Every referenced
+id is checked with one IN query per table, valid lines are inserted with a single
+multi-row INSERT per table, the stock ledger gets one aggregated upsert, and the batch
+commits once. Problems are reported per line instead of failing the whole request,
+unless the caller asks for an atomic batch.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.db.models.inventory import Inventory
+from app.db.models.product import Product
+from app.db.models.product_stock_intake import ProductStockIntake
+from app.db.models.raw_material import RawMaterial, RawMaterialStockIntake
+from app.db.models.staff import Staff
+from app.db.models.supplier import Supplier
+from app.db.models.warehouse import Warehouse
+from app.schemas.inventory import (
+    IntakeBatchResult,
+    IntakeLineError,
+    ProductIntakeLine,
+    RawMaterialIntakeLine,
+)
+from app.services import stock_ledger
+
+MAX_INTAKE_LINES = 2000
+
+
+def _existing_ids(db: Session, id_column, ids: Iterable[int]) -> Set[int]:
+    ids = set(ids)
+    if not ids:
+        return set()
+    return set(db.execute(select(id_column).where(id_column.in_(ids))).scalars())
+
+
+def _parse_lines(model, lines: List[dict], errors: Dict[int, List[str]]) -> Dict[int, object]:
+    parsed = {}
+    for index, raw in enumerate(lines):
+        try:
+            parsed[index] = model.model_validate(raw)
+        except ValidationError as e:
+            errors[index].extend(
+                f"{'.'.join(str(p) for p in err['loc']) or 'line'}: {err['msg']}" for err in e.errors()
+            )
+    return parsed
+
+
+def _insert_returning_ids(db: Session, model, rows: List[dict]) -> List[int]:
+    """Batched multi-row INSERT; ids come back in the order of rows."""
+    if not rows:
+        return []
+    result = db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return list(result.scalars())
+
+
+def _finish(db: Session, total: int, errors: Dict[int, List[str]], atomic: bool, write) -> IntakeBatchResult:
+    """Shared tail: run write(valid_indexes) -> ids unless the batch is rejected, commit once."""
+    valid = [i for i in range(total) if not errors.get(i)]
+    error_list = [IntakeLineError(line=i, errors=msgs) for i, msgs in sorted(errors.items()) if msgs]
+    ids: List[Optional[int]] = [None] * total
+    if not valid or (atomic and error_list):
+        return IntakeBatchResult(committed=False, accepted=0, rejected=total, ids=ids, errors=error_list)
+    try:
+        for index, new_id in zip(valid, write(valid)):
+            ids[index] = new_id
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return IntakeBatchResult(
+        committed=True, accepted=len(valid), rejected=total - len(valid), ids=ids, errors=error_list
+    )
+
+
+def record_product_intake(db: Session, lines: List[dict], principal=None, atomic: bool = False) -> IntakeBatchResult:
+    """
+    Insert product intake lines plus their inventory rows and ledger deltas. When a principal
+    is given, lines for warehouses it may not use are rejected.
+    """
+    errors: Dict[int, List[str]] = defaultdict(list)
+    parsed = _parse_lines(ProductIntakeLine, lines, errors)
+    products = _existing_ids(db, Product.id, (line.product_id for line in parsed.values()))
+    staff = _existing_ids(db, Staff.id, (line.staff_id for line in parsed.values()))
+    warehouses = _existing_ids(db, Warehouse.id, (line.warehouse_id for line in parsed.values()))
+    for index, line in parsed.items():
+        if line.product_id not in products:
+            errors[index].append("Product not found")
+        if line.staff_id not in staff:
+            errors[index].append("Staff not found")
+        if line.warehouse_id not in warehouses:
+            errors[index].append("Warehouse not found")
+        elif principal is not None and not principal.is_admin and not principal.has_warehouses(line.warehouse_id):
+            errors[index].append("You do not have access to this warehouse.")
+
+    def write(valid: List[int]) -> List[int]:
+        accepted = [parsed[i] for i in valid]
+        ids = _insert_returning_ids(db, ProductStockIntake, [
+            {
+                "product_id": line.product_id,
+                "quantity": line.quantity,
+                "date_of_intake": line.intake_date,
+                "expiry_date": line.expiry_date,
+                "intake_staff_id": line.staff_id,
+            }
+            for line in accepted
+        ])
+        db.execute(insert(Inventory), [
+            {
+                "product_id": line.product_id,
+                "quantity": line.quantity,
+                "warehouse_id": line.warehouse_id,
+                "batch_no": None,
+                "expiry_date": line.expiry_date,
+            }
+            for line in accepted
+        ])
+        deltas: Dict[Tuple[int, int], int] = defaultdict(int)
+        for line in accepted:
+            deltas[(line.product_id, line.warehouse_id)] += line.quantity
+        stock_ledger.apply_stock_deltas(db, stock_ledger.PRODUCT, deltas)
+        return ids
+
+    return _finish(db, len(lines), errors, atomic, write)
+
+
+def record_raw_material_intake(db: Session, lines: List[dict], atomic: bool = False) -> IntakeBatchResult:
+    """Insert raw material intake lines and their ledger deltas."""
+    errors: Dict[int, List[str]] = defaultdict(list)
+    parsed = _parse_lines(RawMaterialIntakeLine, lines, errors)
+    raw_materials = _existing_ids(db, RawMaterial.id, (line.raw_material_id for line in parsed.values()))
+    suppliers = _existing_ids(db, Supplier.id, (line.supplier_id for line in parsed.values()))
+    staff = _existing_ids(db, Staff.id, (line.intake_staff_id for line in parsed.values()))
+    for index, line in parsed.items():
+        if line.raw_material_id not in raw_materials:
+            errors[index].append("Raw material not found")
+        if line.supplier_id not in suppliers:
+            errors[index].append("Supplier not found")
+        if line.intake_staff_id not in staff:
+            errors[index].append("Staff not found")
+
+    def write(valid: List[int]) -> List[int]:
+        accepted = [parsed[i] for i in valid]
+        ids = _insert_returning_ids(db, RawMaterialStockIntake, [line.model_dump() for line in accepted])
+        deltas: Dict[Tuple[int, int], int] = defaultdict(int)
+        for line in accepted:
+            deltas[(line.raw_material_id, stock_ledger.NO_WAREHOUSE)] += line.quantity
+        stock_ledger.apply_stock_deltas(db, stock_ledger.RAW_MATERIAL, deltas)
+        return ids
+
+    return _finish(db, len(lines), errors, atomic, write)
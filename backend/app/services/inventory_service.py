@@ -1,11 +1,15 @@
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models.inventory import Inventory, Product
 from app.db.models.raw_material import RawMaterial
 from app.schemas import inventory as schemas
 from app.schemas.inventory import InventoryCreate, InventoryUpdate
 from app.schemas.registration import CustomerCreate, WarehouseCreate, SupplierCreate, DistributorCreate
 from app.db import models
+from app.services import stock_ledger
+from app.services.rollup_service import link_customer_invoices
+from app.core.cache import reference_cache, CUSTOMERS, WAREHOUSES, SUPPLIERS
 
 class InventoryService:
     def __init__(self, db: Session):
@@ -43,8 +47,11 @@ class InventoryService:
 def create_customer(db: Session, customer: CustomerCreate):
     new_customer = models.Customer(**customer.dict())
     db.add(new_customer)
+    db.flush()
+    link_customer_invoices(db, new_customer.id, new_customer.name)
     db.commit()
     db.refresh(new_customer)
+    reference_cache.invalidate(CUSTOMERS)
     return new_customer
 
 def create_warehouse(db: Session, warehouse: schemas.WarehouseCreate):
@@ -52,6 +59,7 @@ def create_warehouse(db: Session, warehouse: schemas.WarehouseCreate):
     db.add(new_warehouse)
     db.commit()
     db.refresh(new_warehouse)
+    reference_cache.invalidate(WAREHOUSES)
     return new_warehouse
 
 def create_supplier(db: Session, supplier: schemas.SupplierCreate):
@@ -59,6 +67,7 @@ def create_supplier(db: Session, supplier: schemas.SupplierCreate):
     db.add(new_supplier)
     db.commit()
     db.refresh(new_supplier)
+    reference_cache.invalidate(SUPPLIERS)
     return new_supplier
 
 def create_distributor(db: Session, distributor: schemas.DistributorCreate):
@@ -81,55 +90,30 @@ def get_all_products(db: Session):
 def get_all_raw_materials(db: Session):
     return db.query(RawMaterial).all()
 
-def get_stock_levels(db: Session):
-    # Join Inventory and Product to get product name and reorder point
-    results = (
-        db.query(
-            models.Inventory.id,
-            models.Product.name.label('productName'),
-            models.Inventory.quantity.label('available_quantity'),
-            models.Product.reorder_point
-        )
-        .join(models.Product, models.Inventory.product_id == models.Product.id)
-        .all()
-    )
-    # Convert to list of dicts for frontend
+def stock_level_id(product_id: int, warehouse_id: int) -> str:
+    # A product has one row per warehouse, so the row id names both
+    return f"{product_id}:{warehouse_id}"
+
+def stock_level_rows(results):
+    # Convert ledger balances to list of dicts for frontend
     return [
         {
-            'id': row.id,
-            'productName': row.productName,
+            'id': stock_level_id(row.product_id, row.warehouse_id),
+            'product_id': row.product_id,
+            'productName': row.name,
             'available_quantity': row.available_quantity,
-            'reorder_point': row.reorder_point
+            'reorder_point': row.reorder_point,
+            'warehouse_id': row.warehouse_id
         }
         for row in results
     ]
 
-def get_product_stock_levels(db: Session):
-    # Join Inventory, Product, and Warehouse, group by product and warehouse, sum quantities
-    results = (
-        db.query(
-            models.Inventory.product_id,
-            models.Product.name,
-            models.Product.reorder_point,
-            models.Inventory.warehouse_id,
-            models.Warehouse.name.label('warehouse_name'),
-            func.sum(models.Inventory.quantity).label('available_quantity')
-        )
-        .join(models.Product, models.Inventory.product_id == models.Product.id)
-        .join(models.Warehouse, models.Inventory.warehouse_id == models.Warehouse.id)
-        .group_by(
-            models.Inventory.product_id,
-            models.Product.name,
-            models.Product.reorder_point,
-            models.Inventory.warehouse_id,
-            models.Warehouse.name
-        )
-        .all()
-    )
+def product_stock_level_rows(results):
     # Return as list of dicts for frontend
     return [
         {
-            'id': row.product_id,
+            'id': stock_level_id(row.product_id, row.warehouse_id),
+            'product_id': row.product_id,
             'name': row.name,
             'available_quantity': row.available_quantity,
             'reorder_point': row.reorder_point,
@@ -137,4 +121,18 @@ def get_product_stock_levels(db: Session):
             'warehouse_name': row.warehouse_name
         }
         for row in results
-    ]
\ No newline at end of file
+    ]
+
+def get_stock_levels(db: Session):
+    # Read per (product, warehouse) balances straight from the stock ledger
+    return stock_level_rows(stock_ledger.product_balances(db))
+
+def get_product_stock_levels(db: Session):
+    # Primary-key ordered read of the stock ledger instead of aggregating inventory history
+    return product_stock_level_rows(stock_ledger.product_balances(db))
+
+async def get_stock_levels_async(db: AsyncSession):
+    return stock_level_rows((await db.execute(stock_ledger.product_balances_query())).all())
+
+async def get_product_stock_levels_async(db: AsyncSession):
+    return product_stock_level_rows((await db.execute(stock_ledger.product_balances_query())).all())
@@ -0,0 +1,305 @@
+"""
+Invoice Import Service
+Loads batches of invoices taken offline (depot sales, historical data) from CSV or NDJSON.
+Invoices are validated against cached product, warehouse and customer data, then each
+chunk is written set-based: one locking read of the affected inventory, one UPDATE for
+all stock deductions, one multi-row INSERT for invoices and one for their items, one
+rollup upsert, one commit. invoice_number makes the import idempotent: invoices that
+already exist are skipped, so a failed or repeated upload can simply be sent again.
+"""
+
+import csv
+import io
+import json
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, time as dt_time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.cache import CUSTOMERS, PRODUCTS, WAREHOUSES, reference_cache
+from app.db.models.customer import Customer
+from app.db.models.invoice import Invoice, InvoiceItem
+from app.db.models.product import Product
+from app.db.models.warehouse import Warehouse
+from app.schemas.invoices import InvoiceCreate
+from app.services import stock_ledger
+from app.services.rollup_service import record_sales
+from app.services.stock_service import (
+    aggregate_demand,
+    allocate,
+    apply_deductions,
+    lock_inventory,
+    refresh_product_status,
+)
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+CHUNK_SIZE = 500
+MAX_ERRORS = 1000
+
+# CSV: one row per invoice item; invoice columns repeat on every row of the same invoice
+CSV_INVOICE_COLUMNS = ("invoice_number", "customer_name", "date", "warehouse_id", "status", "total_amount")
+CSV_ITEM_COLUMNS = ("product_id", "quantity", "price")
+
+
+class ImportFormatError(ValueError):
+    """The upload cannot be parsed at all (bad header, not JSON, ...)."""
+
+
+@dataclass
+class ImportReport:
+    received: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    errors: List[dict] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def invoices_per_second(self) -> float:
+        return round(self.imported / self.elapsed_seconds, 1) if self.elapsed_seconds else 0.0
+
+    def reject(self, invoice_number: Optional[str], line: int, errors: List[str]) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"invoice_number": invoice_number, "line": line, "errors": errors})
+
+    def as_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "invoices_per_second": self.invoices_per_second,
+        }
+
+
+# --- parsing ---------------------------------------------------------------
+
+def parse_ndjson(content: str) -> Iterator[Tuple[int, dict]]:
+    """(line number, invoice dict) for every non-blank line."""
+    for number, line in enumerate(content.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, {"__error__": f"Invalid JSON: {e.msg}"}
+
+
+def parse_csv(content: str) -> Iterator[Tuple[int, dict]]:
+    """Group item rows by invoice_number; the line of an invoice is its first row."""
+    reader = csv.DictReader(io.StringIO(content))
+    missing = [c for c in CSV_INVOICE_COLUMNS[:4] + CSV_ITEM_COLUMNS if c not in (reader.fieldnames or ())]
+    if missing:
+        raise ImportFormatError(f"CSV header is missing columns: {', '.join(missing)}")
+    invoices: Dict[str, Tuple[int, dict]] = {}
+    for row in reader:
+        number = (row.get("invoice_number") or "").strip()
+        line = reader.line_num
+        if number not in invoices:
+            header = {c: row.get(c) for c in CSV_INVOICE_COLUMNS if row.get(c) not in (None, "")}
+            invoices[number] = (line, {**header, "items": []})
+        invoices[number][1]["items"].append({c: row.get(c) for c in CSV_ITEM_COLUMNS})
+    yield from invoices.values()
+
+
+# --- validation ------------------------------------------------------------
+
+def _reference_ids(db: Session) -> Tuple[frozenset, frozenset, Dict[str, int]]:
+    product_ids = reference_cache.get_or_load(
+        PRODUCTS, lambda: frozenset(db.execute(select(Product.id)).scalars()), "ids"
+    )
+    warehouse_ids = reference_cache.get_or_load(
+        WAREHOUSES, lambda: [row[0] for row in db.execute(select(Warehouse.id))], "ids"
+    )
+    customer_ids = reference_cache.get_or_load(CUSTOMERS, lambda: _customer_ids_by_name(db), "ids_by_name")
+    return frozenset(product_ids), frozenset(warehouse_ids), customer_ids
+
+
+def _customer_ids_by_name(db: Session) -> Dict[str, int]:
+    ids: Dict[str, int] = {}
+    for customer_id, name in db.execute(select(Customer.id, Customer.name).order_by(Customer.id.desc())):
+        ids[name] = customer_id  # lowest id wins, as in create_invoice
+    return ids
+
+
+def _validate(raw, product_ids, warehouse_ids, principal) -> Tuple[Optional[InvoiceCreate], List[str]]:
+    if not isinstance(raw, dict):
+        return None, ["Each line must be a JSON object"]
+    if "__error__" in raw:
+        return None, [raw["__error__"]]
+    if raw.get("total_amount") in (None, "") and isinstance(raw.get("items"), list):
+        try:
+            raw = {**raw, "total_amount": sum(float(i["quantity"]) * float(i["price"]) for i in raw["items"])}
+        except (KeyError, TypeError, ValueError):
+            pass  # reported by the schema below
+    raw = {"status": Invoice.status.default.arg, **raw}
+    try:
+        invoice = InvoiceCreate.model_validate(raw)
+    except ValidationError as e:
+        return None, [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+    errors = []
+    if not invoice.items:
+        errors.append("Invoice has no items")
+    if any(item.quantity <= 0 for item in invoice.items):
+        errors.append("Item quantities must be greater than zero")
+    unknown = sorted({item.product_id for item in invoice.items} - product_ids)
+    if unknown:
+        errors.append(f"Unknown product ID {', '.join(map(str, unknown))}")
+    if invoice.warehouse_id not in warehouse_ids:
+        errors.append("Warehouse not found")
+    elif principal is not None and not principal.is_admin and not principal.has_warehouses(invoice.warehouse_id):
+        errors.append("You do not have access to this warehouse.")
+    return (None, errors) if errors else (invoice, [])
+
+
+# --- writing ---------------------------------------------------------------
+
+def _accept_in_date_order(pending: List[Tuple[int, InvoiceCreate]], demand_by_invoice: Dict[str, dict],
+                          locked_rows, report: ImportReport) -> List[Tuple[int, InvoiceCreate]]:
+    """Accept invoices oldest first while the locked stock covers them; reject the rest in the report."""
+    available: Dict[Tuple[int, int], int] = defaultdict(int)
+    for row in locked_rows:
+        available[(row.product_id, row.warehouse_id)] += max(row.quantity or 0, 0)
+    accepted = []
+    for line, invoice in sorted(pending, key=lambda p: (p[1].date, p[0])):
+        demand = demand_by_invoice[invoice.invoice_number]
+        short = sorted(product_id for (product_id, wh), qty in demand.items() if qty > available[(product_id, wh)])
+        if short:
+            report.reject(invoice.invoice_number, line, [
+                f"Insufficient product in selected warehouse: Product ID {', '.join(map(str, short))}"
+            ])
+            continue
+        for pair, qty in demand.items():
+            available[pair] -= qty
+        accepted.append((line, invoice))
+    return accepted
+
+
+def _import_chunk(db: Session, chunk: List[Tuple[int, InvoiceCreate]], customer_ids: Dict[str, int], report: ImportReport) -> None:
+    numbers = [invoice.invoice_number for _, invoice in chunk]
+    existing = set(db.execute(select(Invoice.invoice_number).where(Invoice.invoice_number.in_(numbers))).scalars())
+    pending = []
+    for line, invoice in chunk:
+        if invoice.invoice_number in existing:
+            report.duplicates += 1
+        else:
+            pending.append((line, invoice))
+    if not pending:
+        return
+
+    # Lock every inventory row the chunk touches once, then accept invoices in date order
+    # while the stock they need is still available
+    demand_by_invoice = {
+        invoice.invoice_number: aggregate_demand((i.product_id, invoice.warehouse_id, i.quantity) for i in invoice.items)
+        for _, invoice in pending
+    }
+    locked_rows = lock_inventory(db, {pair for demand in demand_by_invoice.values() for pair in demand})
+    accepted = _accept_in_date_order(pending, demand_by_invoice, locked_rows, report)
+    if not accepted:
+        db.rollback()
+        return
+
+    # Invoices committed concurrently by another upload are skipped by the conflict clause
+    rows = [
+        {
+            "invoice_number": invoice.invoice_number,
+            "customer_name": invoice.customer_name,
+            "customer_id": customer_ids.get(invoice.customer_name),
+            "warehouse_id": invoice.warehouse_id,
+            "date": datetime.combine(invoice.date, dt_time()),
+            "total_amount": invoice.total_amount,
+            "vat": Invoice.vat.default.arg,
+            "status": invoice.status,
+            "logo_url": invoice.logo_url,
+            "pdf_url": invoice.pdf_url,
+            "created_at": datetime.utcnow(),
+        }
+        for _, invoice in accepted
+    ]
+    stmt = pg_insert(Invoice).values(rows).on_conflict_do_nothing(index_elements=[Invoice.invoice_number])
+    inserted = dict(db.execute(stmt.returning(Invoice.invoice_number, Invoice.id)).all())
+    report.duplicates += len(accepted) - len(inserted)
+    invoices = [invoice for _, invoice in accepted if invoice.invoice_number in inserted]
+    if not invoices:
+        db.rollback()
+        return
+
+    demand = aggregate_demand(
+        (item.product_id, invoice.warehouse_id, item.quantity) for invoice in invoices for item in invoice.items
+    )
+    deductions, shortages = allocate(locked_rows, demand)
+    if shortages:
+        # Cannot happen while the rows stay locked; refuse the chunk rather than oversell
+        db.rollback()
+        for line, invoice in accepted:
+            report.reject(invoice.invoice_number, line, ["Stock changed during import, please retry"])
+        return
+    apply_deductions(db, deductions)
+    stock_ledger.apply_stock_deltas(db, stock_ledger.PRODUCT, {pair: -quantity for pair, quantity in demand.items()})
+    refresh_product_status(db, {product_id for product_id, _ in demand})
+
+    db.execute(insert(InvoiceItem), [
+        {
+            "invoice_id": inserted[invoice.invoice_number],
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "price": item.price,
+        }
+        for invoice in invoices
+        for item in invoice.items
+    ])
+    record_sales(db, [
+        (
+            invoice.date,
+            customer_ids.get(invoice.customer_name),
+            invoice.warehouse_id,
+            invoice.total_amount,
+            Invoice.vat.default.arg,
+            [(item.product_id, item.quantity, item.price) for item in invoice.items],
+        )
+        for invoice in invoices
+    ])
+    db.commit()
+    report.imported += len(invoices)
+
+
+def import_invoices(db: Session, content: str, fmt: str, principal=None, chunk_size: int = CHUNK_SIZE) -> ImportReport:
+    """
+    Validate and load every invoice in content. Each chunk of chunk_size invoices is its own
+    transaction; rejected invoices are listed in the report and never block the others.
+    """
+    started = time.perf_counter()
+    report = ImportReport()
+    parser = parse_csv if fmt == FORMAT_CSV else parse_ndjson
+    product_ids, warehouse_ids, customer_ids = _reference_ids(db)
+
+    seen = set()
+    chunk: List[Tuple[int, InvoiceCreate]] = []
+    for line, raw in parser(content):
+        report.received += 1
+        invoice, errors = _validate(raw, product_ids, warehouse_ids, principal)
+        if invoice is not None and invoice.invoice_number in seen:
+            errors = ["Duplicate invoice_number in upload"]
+        if errors:
+            report.reject(raw.get("invoice_number") if isinstance(raw, dict) else None, line, errors)
+            continue
+        seen.add(invoice.invoice_number)
+        chunk.append((line, invoice))
+        if len(chunk) >= chunk_size:
+            _import_chunk(db, chunk, customer_ids, report)
+            chunk = []
+    if chunk:
+        _import_chunk(db, chunk, customer_ids, report)
+
+    report.elapsed_seconds = time.perf_counter() - started
+    return report
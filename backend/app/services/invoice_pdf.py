@@ -0,0 +1,340 @@
+"""
+Invoice PDF Rendering
+Draws invoices with reportlab on a letterhead (company name, address and logo) that each
+process builds once and reuses. Rendered files are stored under INVOICE_PDF_DIR named by a
+hash of everything printed on them, so an unchanged invoice is never drawn twice and an
+edited one (items, totals, logo, letterhead or layout) gets a new file on its next
+request. Batches of invoices render in parallel on a process pool; the workers write
+the files themselves, so only invoice data crosses the process boundary. A date range
+can be streamed as a ZIP one file at a time.
+"""
+
+import base64
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from functools import lru_cache
+from itertools import repeat
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when the drawing code changes so every invoice is rendered again
+LAYOUT_VERSION = 1
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+COPY_CHUNK = 64 * 1024
+LOGO_PIXELS = 240  # enough for a 60pt logo printed at 300 dpi
+
+
+@dataclass(frozen=True)
+class InvoiceDocument:
+    """Everything printed on an invoice; plain data so it pickles to the render workers."""
+    id: int
+    invoice_number: str
+    date: str
+    customer_name: str
+    status: Optional[str]
+    vat: Optional[float]
+    total_amount: float
+    logo_url: Optional[str]
+    items: Tuple[Tuple[str, int, float], ...]  # (product name, quantity, unit price)
+    company_name: str = ""
+    company_address: str = ""
+
+    def content_key(self) -> str:
+        data = json.dumps([LAYOUT_VERSION, asdict(self)], sort_keys=True, default=str)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    @property
+    def filename(self) -> str:
+        return f"invoice_{re.sub(r'[^A-Za-z0-9._-]+', '_', self.invoice_number)}.pdf"
+
+
+def _document(invoice, items: Sequence[Tuple[str, int, float]]) -> InvoiceDocument:
+    return InvoiceDocument(
+        id=invoice.id,
+        invoice_number=invoice.invoice_number,
+        date=invoice.date.strftime("%Y-%m-%d") if invoice.date else "",
+        customer_name=invoice.customer_name,
+        status=invoice.status,
+        vat=invoice.vat,
+        total_amount=float(invoice.total_amount or 0),
+        logo_url=invoice.logo_url or settings.INVOICE_LOGO_URL,
+        items=tuple(items),
+        company_name=settings.INVOICE_COMPANY_NAME,
+        company_address=settings.INVOICE_COMPANY_ADDRESS,
+    )
+
+
+def load_documents(db, invoices) -> List[InvoiceDocument]:
+    """Documents for invoice rows, with every item and product name in one query."""
+    from app.db.models.product import Product
+    from app.db.models.invoice import InvoiceItem
+
+    invoices = list(invoices)
+    items = {invoice.id: [] for invoice in invoices}
+    if invoices:
+        rows = db.query(InvoiceItem.invoice_id, Product.name, InvoiceItem.product_id, InvoiceItem.quantity, InvoiceItem.price) \
+            .outerjoin(Product, Product.id == InvoiceItem.product_id) \
+            .filter(InvoiceItem.invoice_id.in_(list(items))) \
+            .order_by(InvoiceItem.invoice_id, InvoiceItem.id) \
+            .all()
+        for invoice_id, name, product_id, quantity, price in rows:
+            items[invoice_id].append((name or f"Product {product_id}", int(quantity or 0), float(price or 0)))
+    return [_document(invoice, items[invoice.id]) for invoice in invoices]
+
+
+def get_document(db, invoice_id: int) -> Optional[InvoiceDocument]:
+    from app.db.models.invoice import Invoice
+
+    invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+    return load_documents(db, [invoice])[0] if invoice else None
+
+
+def iter_documents(db, date_range, batch_size: Optional[int] = None) -> Iterator[List[InvoiceDocument]]:
+    """Documents for a date range in (date, id) order, batch_size invoices per two queries."""
+    from sqlalchemy import tuple_
+    from app.db.models.invoice import Invoice
+    from app.utils.pagination import apply_date_range
+
+    batch_size = batch_size or settings.INVOICE_PDF_BATCH_SIZE
+    after = None
+    while True:
+        query = apply_date_range(db.query(Invoice), Invoice.date, date_range)
+        if after is not None:
+            query = query.filter(tuple_(Invoice.date, Invoice.id) > after)
+        invoices = query.order_by(Invoice.date, Invoice.id).limit(batch_size).all()
+        if not invoices:
+            return
+        yield load_documents(db, invoices)
+        if len(invoices) < batch_size:
+            return
+        after = (invoices[-1].date, invoices[-1].id)
+
+
+def _downscaled(source) -> ImageReader:
+    # Embedding a full-size upload would make every invoice as large as the logo file
+    from PIL import Image
+
+    with Image.open(source) as image:
+        image.thumbnail((LOGO_PIXELS, LOGO_PIXELS))
+        buffer = io.BytesIO()
+        image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB").save(buffer, "PNG", optimize=True)
+    buffer.seek(0)
+    return ImageReader(buffer)
+
+
+@lru_cache(maxsize=32)
+def _logo(logo_url: Optional[str]) -> Optional[ImageReader]:
+    """The letterhead logo, loaded and downscaled once per process: a data: URI or a file under app/static."""
+    if not logo_url:
+        return None
+    try:
+        if logo_url.startswith("data:"):
+            return _downscaled(io.BytesIO(base64.b64decode(logo_url.split(",", 1)[1])))
+        if "://" in logo_url:
+            # Fetching arbitrary URLs from the server is not allowed; serve logos from app/static
+            logger.warning(f"Invoice logo {logo_url} is not local; rendering without it")
+            return None
+        relative = logo_url.split("?", 1)[0].lstrip("/")
+        relative = relative[len("static/"):] if relative.startswith("static/") else relative
+        path = os.path.realpath(os.path.join(STATIC_DIR, relative))
+        if not path.startswith(os.path.realpath(STATIC_DIR) + os.sep) or not os.path.isfile(path):
+            logger.warning(f"Invoice logo {logo_url} not found under {STATIC_DIR}")
+            return None
+        return _downscaled(path)
+    except Exception as e:
+        logger.warning(f"Invoice logo {logo_url} could not be loaded: {e}")
+        return None
+
+
+def _money(value: float) -> str:
+    return f"{value:,.2f}"
+
+
+def _letterhead(c: canvas.Canvas, doc: InvoiceDocument, width: float, height: float) -> float:
+    """Draw the letterhead and invoice header; returns the y below it."""
+    top = height - 40
+    left = 40
+    logo = _logo(doc.logo_url)
+    if logo is not None:
+        image_width, image_height = logo.getSize()
+        scale = min(60 / image_width, 60 / image_height)
+        c.drawImage(logo, left, top - image_height * scale, image_width * scale, image_height * scale, mask="auto")
+        left += 75
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(left, top - 16, doc.company_name)
+    c.setFont("Helvetica", 9)
+    for number, line in enumerate(doc.company_address.splitlines()[:3]):
+        c.drawString(left, top - 30 - 11 * number, line)
+
+    c.setFont("Helvetica-Bold", 20)
+    c.drawRightString(width - 40, top - 18, "INVOICE")
+    c.setFont("Helvetica", 10)
+    c.drawRightString(width - 40, top - 34, f"No. {doc.invoice_number}")
+    c.drawRightString(width - 40, top - 47, f"Date: {doc.date}")
+    if doc.status:
+        c.drawRightString(width - 40, top - 60, f"Status: {doc.status.upper()}")
+    c.line(40, top - 72, width - 40, top - 72)
+    return top - 90
+
+
+def _table_header(c: canvas.Canvas, y: float, width: float) -> float:
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(40, y, "Item")
+    c.drawRightString(width - 220, y, "Qty")
+    c.drawRightString(width - 130, y, "Unit price")
+    c.drawRightString(width - 40, y, "Amount")
+    c.line(40, y - 4, width - 40, y - 4)
+    c.setFont("Helvetica", 10)
+    return y - 18
+
+
+def render_invoice(doc: InvoiceDocument) -> bytes:
+    buffer = io.BytesIO()
+    width, height = A4
+    c = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+    c.setTitle(f"Invoice {doc.invoice_number}")
+    c.setAuthor(doc.company_name)
+
+    y = _letterhead(c, doc, width, height)
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(40, y, "Bill to")
+    c.setFont("Helvetica", 10)
+    c.drawString(40, y - 14, doc.customer_name)
+    y = _table_header(c, y - 40, width)
+
+    subtotal = 0.0
+    for name, quantity, price in doc.items:
+        if y < 110:
+            c.showPage()
+            y = _table_header(c, _letterhead(c, doc, width, height), width)
+        amount = quantity * price
+        subtotal += amount
+        c.drawString(40, y, name[:60])
+        c.drawRightString(width - 220, y, str(quantity))
+        c.drawRightString(width - 130, y, _money(price))
+        c.drawRightString(width - 40, y, _money(amount))
+        y -= 16
+
+    c.line(width - 260, y + 4, width - 40, y + 4)
+    totals = [("Subtotal", subtotal)]
+    if doc.vat and doc.total_amount > subtotal:
+        totals.append((f"VAT ({doc.vat:g}%)", doc.total_amount - subtotal))
+    totals.append(("Total", doc.total_amount))
+    for label, value in totals:
+        y -= 16
+        c.setFont("Helvetica-Bold" if label == "Total" else "Helvetica", 10)
+        c.drawRightString(width - 130, y, label)
+        c.drawRightString(width - 40, y, _money(value))
+
+    c.setFont("Helvetica-Oblique", 8)
+    c.drawCentredString(width / 2, 30, f"{doc.company_name} - Invoice {doc.invoice_number}")
+    c.save()
+    return buffer.getvalue()
+
+
+def pdf_path(doc: InvoiceDocument, directory: str) -> str:
+    key = doc.content_key()
+    return os.path.join(directory, key[:2], f"{key}.pdf")
+
+
+def render_to_file(doc: InvoiceDocument, directory: str) -> str:
+    """Render unless a file for this exact content exists. Module level so pool workers can unpickle it."""
+    path = pdf_path(doc, directory)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(render_invoice(doc))
+        # Concurrent renders of the same content write identical bytes; the last rename wins
+        os.replace(temporary, path)
+    return path
+
+
+class InvoicePdfRenderer:
+    def __init__(self, directory: str, workers: int):
+        self.directory = directory
+        self.workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a server that holds DB connections and threads is unsafe
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def render(self, doc: InvoiceDocument) -> str:
+        """Path of the invoice's PDF; one invoice is drawn in-process, not worth a pool round trip."""
+        return render_to_file(doc, self.directory)
+
+    def render_many(self, docs: Sequence[InvoiceDocument]) -> List[str]:
+        """Paths of the invoices' PDFs in order, drawing the missing ones in parallel."""
+        missing = {doc.content_key(): doc for doc in docs if not os.path.exists(pdf_path(doc, self.directory))}
+        if len(missing) > 1 and self.workers > 1:
+            chunksize = max(1, len(missing) // (self.workers * 4))
+            list(self._executor().map(render_to_file, missing.values(), repeat(self.directory), chunksize=chunksize))
+        else:
+            for doc in missing.values():
+                render_to_file(doc, self.directory)
+        return [pdf_path(doc, self.directory) for doc in docs]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class _ZipSink:
+    """Write-only file object that hands what the archive wrote so far to the response."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def stream_zip(db, date_range, renderer: Optional[InvoicePdfRenderer] = None) -> Iterator[bytes]:
+    """ZIP of the invoice PDFs in a date range, yielded as each file is added."""
+    renderer = renderer or invoice_pdf_renderer
+    sink = _ZipSink()
+    # PDFs are already compressed; storing them keeps the stream cheap to produce
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for docs in iter_documents(db, date_range):
+            for doc, path in zip(docs, renderer.render_many(docs)):
+                info = zipfile.ZipInfo(doc.filename, date_time=datetime.now().timetuple()[:6])
+                with open(path, "rb") as source, archive.open(info, "w") as target:
+                    while chunk := source.read(COPY_CHUNK):
+                        target.write(chunk)
+                yield sink.take()
+    yield sink.take()
+
+
+invoice_pdf_renderer = InvoicePdfRenderer(settings.INVOICE_PDF_DIR, settings.INVOICE_PDF_WORKERS)
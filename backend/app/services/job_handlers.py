@@ -0,0 +1,102 @@
+"""
+Job Handlers
+The work the job queue knows how to run. Importing this module registers every
+handler; the worker and the /jobs endpoints both import it. Handlers receive their own
+session, the job's JSON payload and a JobContext for progress, and return a
+JSON-serializable result that is stored on the job. Each handler's payload model is
+checked when the job is submitted, so a bad payload is a 400 rather than a failed job.
+"""
+
+from datetime import date
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, model_validator
+from sqlalchemy.orm import Session
+
+from app.services.job_queue import JobContext, job_handler
+
+
+class JobPayload(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+
+class ReportPeriod(JobPayload):
+    start_date: date
+    end_date: date
+
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.start_date > self.end_date:
+            raise ValueError("start_date must not be after end_date")
+        return self
+
+
+class OptionalReportPeriod(JobPayload):
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+
+class InvoiceDateRange(JobPayload):
+    date_from: date
+    date_to: date
+
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.date_from > self.date_to:
+            raise ValueError("date_from must not be after date_to")
+        return self
+
+
+class PayrollRunPayload(JobPayload):
+    run_id: int
+
+
+@job_handler("sales_report", submittable=True, payload=ReportPeriod)
+def sales_report(db: Session, payload: dict, job: JobContext):
+    from app.services.reports_service import ReportsService
+    report = ReportsService.get_sales_report(db, payload["start_date"], payload["end_date"])
+    return report.model_dump(mode="json")
+
+
+@job_handler("staff_performance_report", submittable=True, payload=OptionalReportPeriod)
+def staff_performance_report(db: Session, payload: dict, job: JobContext):
+    from app.services.reports_service import ReportsService
+    report = ReportsService.get_staff_performance_report(db, payload.get("start_date"), payload.get("end_date"))
+    return report.model_dump(mode="json")
+
+
+@job_handler("rebuild_rollups", submittable=True, admin_only=True, payload=JobPayload)
+def rebuild_report_rollups(db: Session, payload: dict, job: JobContext):
+    from app.services.rollup_service import rebuild_rollups
+    rebuild_rollups(db)
+    return {"detail": "Report rollups rebuilt"}
+
+
+@job_handler("invoice_pdfs", submittable=True, payload=InvoiceDateRange)
+def invoice_pdfs(db: Session, payload: dict, job: JobContext):
+    """Render every invoice PDF in a date range ahead of an end-of-day reprint."""
+    from app.services.invoice_pdf import invoice_pdf_renderer, iter_documents
+    from app.utils.pagination import DateRange
+    date_range = DateRange(date.fromisoformat(payload["date_from"]), date.fromisoformat(payload["date_to"]))
+    rendered = 0
+    for docs in iter_documents(db, date_range):
+        invoice_pdf_renderer.render_many(docs)
+        rendered += len(docs)
+        job.progress(rendered, message=f"{rendered} invoices rendered")
+    return {"invoices": rendered}
+
+
+# Enqueued by /payroll/generate with one attempt: a run records its own failure on payroll_runs
+@job_handler("payroll_run", payload=PayrollRunPayload)
+def payroll_run(db: Session, payload: dict, job: JobContext):
+    from app.services import payroll_service
+    payroll_service.execute_run(payload["run_id"], on_progress=job.progress)
+    run = payroll_service.get_run(db, payload["run_id"])
+    return {
+        "run_id": run.id,
+        "status": run.status,
+        "staff": run.processed_staff,
+        "total_hours": run.total_hours,
+        "total_salary": run.total_salary,
+        "error": run.error,
+    } if run else None
@@ -0,0 +1,321 @@
+"""
+Job Queue Service
+A durable background job queue on the jobs table. Web requests enqueue work and return;
+worker processes (python -m app.worker) claim the next due job with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers share the queue without
+blocking each other or running a job twice. Failed jobs are retried with exponential
+backoff up to their max_attempts. While a handler runs, its worker renews the job's
+lease every JOB_HEARTBEAT_SECONDS; a running job whose lease is not renewed for
+JOB_LEASE_SECONDS (its worker died) is put back in the queue.
+
+Handlers register with @job_handler(kind, payload=Model) and are called as
+handler(db, payload, job) with their own session; submitted payloads are validated
+against the handler's model before they are queued. The job is marked done in the
+same transaction as the handler's writes.
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, NamedTuple, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobHandler(NamedTuple):
+    kind: str
+    func: Callable
+    submittable: bool  # may be submitted through POST /jobs
+    admin_only: bool
+    max_attempts: Optional[int]
+    payload_model: Optional[Type[BaseModel]]
+
+
+HANDLERS: Dict[str, JobHandler] = {}
+
+
+class InvalidJobPayload(ValueError):
+    """A submitted payload does not match its job kind's payload model."""
+
+
+def job_handler(kind: str, submittable: bool = False, admin_only: bool = False, max_attempts: Optional[int] = None,
+                payload: Optional[Type[BaseModel]] = None):
+    def register(func):
+        HANDLERS[kind] = JobHandler(kind, func, submittable, admin_only, max_attempts, payload)
+        return func
+    return register
+
+
+def validate_payload(handler: JobHandler, payload: Optional[dict]) -> dict:
+    """The payload as the handler's model parses it, JSON-ready; raises InvalidJobPayload."""
+    if handler.payload_model is None:
+        return payload or {}
+    try:
+        return handler.payload_model.model_validate(payload or {}).model_dump(mode="json")
+    except ValidationError as e:
+        raise InvalidJobPayload("; ".join(
+            f"{'.'.join(str(p) for p in err['loc']) or 'payload'}: {err['msg']}" for err in e.errors()
+        ))
+
+
+class ClaimedJob(NamedTuple):
+    id: int
+    kind: str
+    payload: dict
+    attempts: int
+    max_attempts: int
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _session_factory():
+    from app.db.session import SessionLocal
+    return SessionLocal
+
+
+def enqueue(db: Session, kind: str, payload: Optional[dict] = None, priority: int = 0,
+            max_attempts: Optional[int] = None, delay: float = 0, user_id: Optional[int] = None,
+            commit: bool = True) -> Job:
+    """Queue a job; commit=False only flushes, so the job commits with the caller's own writes."""
+    handler = HANDLERS.get(kind)
+    job = Job(
+        kind=kind,
+        payload=payload or {},
+        status=QUEUED,
+        priority=priority,
+        attempts=0,
+        max_attempts=max_attempts or (handler and handler.max_attempts) or settings.JOB_MAX_ATTEMPTS,
+        run_at=_now() + timedelta(seconds=delay),
+        created_by=user_id,
+    )
+    db.add(job)
+    if not commit:
+        db.flush()
+        return job
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_job(db: Session, job_id: int) -> Optional[Job]:
+    return db.query(Job).filter(Job.id == job_id).first()
+
+
+def claim(db: Session, worker_id: str) -> Optional[ClaimedJob]:
+    """Lock and mark running the highest-priority due job, skipping jobs other workers hold."""
+    now = _now()
+    due = (
+        select(Job.id)
+        .where(Job.status == QUEUED, Job.run_at <= now)
+        .order_by(Job.priority.desc(), Job.run_at, Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    row = db.execute(
+        update(Job)
+        .where(Job.id == due)
+        .execution_options(synchronize_session=False)
+        .values(status=RUNNING, attempts=Job.attempts + 1, locked_by=worker_id, locked_at=now,
+                started_at=now, progress_current=None, progress_total=None, progress_message=None)
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+    ).first()
+    db.commit()
+    return ClaimedJob(*row) if row else None
+
+
+def report_progress(db: Session, job_id: int, worker_id: str, current: int, total: Optional[int] = None,
+                    message: Optional[str] = None) -> None:
+    """Record progress and renew the job's lease; commits."""
+    db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == RUNNING)
+        .execution_options(synchronize_session=False)
+        .values(progress_current=current, progress_total=total, progress_message=message, locked_at=_now())
+    )
+    db.commit()
+
+
+def renew_lease(db: Session, job_id: int, worker_id: str) -> bool:
+    """Extend the lease of a job this worker still holds, leaving its progress alone; commits."""
+    renewed = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == RUNNING)
+        .execution_options(synchronize_session=False)
+        .values(locked_at=_now())
+    ).rowcount == 1
+    db.commit()
+    return renewed
+
+
+def _finish(db: Session, job_id: int, worker_id: str, **values) -> bool:
+    # A job whose lease expired may have been claimed again; only its holder may finish it
+    return db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == RUNNING)
+        .execution_options(synchronize_session=False)
+        .values(**values)
+    ).rowcount == 1
+
+
+def complete(db: Session, job: ClaimedJob, worker_id: str, result: Any = None) -> bool:
+    """Mark the job succeeded; the caller commits, together with the handler's writes."""
+    return _finish(db, job.id, worker_id, status=SUCCEEDED, result=result, error=None, locked_by=None,
+                   finished_at=_now())
+
+
+def fail(db: Session, job: ClaimedJob, worker_id: str, error: str) -> bool:
+    """Requeue the job with exponential backoff, or mark it failed after its last attempt; commits."""
+    if job.attempts < job.max_attempts:
+        delay = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+        done = _finish(db, job.id, worker_id, status=QUEUED, error=error, locked_by=None, locked_at=None,
+                       run_at=_now() + timedelta(seconds=delay))
+    else:
+        done = _finish(db, job.id, worker_id, status=FAILED, error=error, locked_by=None, finished_at=_now())
+    db.commit()
+    return done
+
+
+def requeue_stale(db: Session, lease_seconds: Optional[int] = None) -> int:
+    """Give up on running jobs whose worker stopped renewing the lease; commits."""
+    now = _now()
+    cutoff = now - timedelta(seconds=lease_seconds or settings.JOB_LEASE_SECONDS)
+    out_of_attempts = Job.attempts >= Job.max_attempts
+    count = db.execute(
+        update(Job)
+        .where(Job.status == RUNNING, Job.locked_at < cutoff)
+        .execution_options(synchronize_session=False)
+        .values(
+            status=case((out_of_attempts, FAILED), else_=QUEUED),
+            finished_at=case((out_of_attempts, now), else_=None),
+            error="Worker stopped responding",
+            locked_by=None,
+            locked_at=None,
+            run_at=now,
+        )
+    ).rowcount
+    db.commit()
+    return count
+
+
+class JobContext:
+    """Passed to handlers as `job`: the job's id and attempt, and a progress reporter."""
+
+    def __init__(self, claimed: ClaimedJob, worker_id: str, session_factory):
+        self.id = claimed.id
+        self.attempt = claimed.attempts
+        self._worker_id = worker_id
+        self._session_factory = session_factory
+
+    def progress(self, current: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        # Its own short transaction, so pollers see progress while the handler's is open
+        db = self._session_factory()
+        try:
+            report_progress(db, self.id, self._worker_id, current, total, message)
+        finally:
+            db.close()
+
+
+class _Heartbeat:
+    """Renews a running job's lease on its own session, off the handler's thread, until stopped."""
+
+    def __init__(self, job_id: int, worker_id: str, session_factory, interval: Optional[float] = None):
+        self._job_id = job_id
+        self._worker_id = worker_id
+        self._session_factory = session_factory
+        self._interval = interval or settings.JOB_HEARTBEAT_SECONDS
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-{job_id}-heartbeat", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            db = self._session_factory()
+            try:
+                if not renew_lease(db, self._job_id, self._worker_id):
+                    logger.warning("Job %s lost its lease while running", self._job_id)
+                    return
+            except Exception:
+                logger.exception("Could not renew the lease of job %s", self._job_id)
+            finally:
+                db.close()
+
+
+def _jsonable(result: Any) -> Any:
+    return json.loads(json.dumps(result, default=str)) if result is not None else None
+
+
+def run_one(worker_id: str, session_factory=None) -> bool:
+    """Claim and run one due job; returns False when the queue had nothing due."""
+    session_factory = session_factory or _session_factory()
+    db = session_factory()
+    try:
+        claimed = claim(db, worker_id)
+        if claimed is None:
+            return False
+        handler = HANDLERS.get(claimed.kind)
+        if handler is None:
+            fail(db, claimed._replace(max_attempts=claimed.attempts), worker_id, f"No handler for job kind '{claimed.kind}'")
+            return True
+        logger.info("Job %s (%s) started, attempt %s/%s", claimed.id, claimed.kind, claimed.attempts, claimed.max_attempts)
+        try:
+            with _Heartbeat(claimed.id, worker_id, session_factory):
+                result = handler.func(db, claimed.payload, JobContext(claimed, worker_id, session_factory))
+            if complete(db, claimed, worker_id, _jsonable(result)):
+                db.commit()
+                logger.info("Job %s (%s) succeeded", claimed.id, claimed.kind)
+            else:
+                db.rollback()
+                logger.warning("Job %s (%s) lost its lease; discarding its result", claimed.id, claimed.kind)
+        except Exception as e:
+            db.rollback()
+            logger.exception("Job %s (%s) failed", claimed.id, claimed.kind)
+            fail(db, claimed, worker_id, f"{type(e).__name__}: {e}"[:2000])
+        return True
+    finally:
+        db.close()
+
+
+def work(worker_id: str, stop: threading.Event, session_factory=None, poll_interval: Optional[float] = None) -> None:
+    """Run jobs until stop is set, sleeping poll_interval whenever the queue is empty."""
+    session_factory = session_factory or _session_factory()
+    poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+    last_sweep = None
+    while not stop.is_set():
+        try:
+            if last_sweep is None or time.monotonic() - last_sweep > settings.JOB_LEASE_SECONDS / 4:
+                last_sweep = time.monotonic()
+                db = session_factory()
+                try:
+                    if requeue_stale(db):
+                        logger.warning("Requeued jobs whose worker stopped responding")
+                finally:
+                    db.close()
+            if not run_one(worker_id, session_factory):
+                stop.wait(poll_interval)
+        except Exception:
+            logger.exception("Job worker %s hit an error; retrying", worker_id)
+            stop.wait(poll_interval)
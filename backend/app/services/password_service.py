@@ -0,0 +1,81 @@
+"""
+Password Hashing Service
+All bcrypt work runs on one small dedicated thread pool, so a burst of logins can only
+occupy PASSWORD_HASH_WORKERS cores and never the request threadpool or the event loop.
+Async handlers await the pool; synchronous callers block on it, which still keeps the
+number of concurrent hashes bounded. Hashes made with a different cost factor than
+BCRYPT_ROUNDS are replaced on the next successful login.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, TypeVar
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# min = max = default so hashes of any other cost count as outdated
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+
+def _verify(plain_password: str, hashed_password: Optional[str]) -> bool:
+    if not hashed_password:
+        return False
+    try:
+        return pwd_context.verify(plain_password, hashed_password)
+    except ValueError:
+        # Not a recognised hash, e.g. the empty placeholder of pending profiles
+        return False
+
+
+def _verify_and_update(plain_password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    if not hashed_password:
+        return False, None
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except ValueError:
+        return False, None
+
+
+# --- synchronous API (blocks the calling thread on the bounded pool) ---------
+
+def hash_password(password: str) -> str:
+    return _executor.submit(pwd_context.hash, password).result()
+
+
+def verify_password(plain_password: str, hashed_password: Optional[str]) -> bool:
+    return _executor.submit(_verify, plain_password, hashed_password).result()
+
+
+def verify_and_update(plain_password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """(matches, new_hash); new_hash is set when the stored hash should be replaced."""
+    return _executor.submit(_verify_and_update, plain_password, hashed_password).result()
+
+
+# --- async API ---------------------------------------------------------------
+
+async def _run(fn: Callable[..., T], *args) -> T:
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run(pwd_context.hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: Optional[str]) -> bool:
+    return await _run(_verify, plain_password, hashed_password)
+
+
+async def verify_and_update_async(plain_password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    return await _run(_verify_and_update, plain_password, hashed_password)
@@ -1,17 +1,267 @@
-from sqlalchemy.orm import Session
+"""
+Payroll Service
+Generates payroll for the whole workforce in set-based runs. Hours come from
+attendance_records.hours_worked, summed per staff member in one grouped query and
+multiplied by staff.hourly_rate inside an INSERT ... SELECT, so a run costs a handful
+of statements per batch of staff instead of a request per employee. A run writes its
+rows in one transaction and reports progress on its payroll_runs row as it goes.
+
+A period has at most one pending or running run (a partial unique index enforces it),
+created in the same transaction as the payroll_run job that executes it. A run whose
+job ended without the run finishing, or whose worker stopped renewing the job's lease,
+is marked failed so it no longer blocks the period.
+"""
+
+import calendar
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Optional, Tuple
 
-def list_payrolls(db: Session):
-    return db.query(PayrollModel).all()
+from sqlalchemy import (
+    Column, Float, Integer, MetaData, Numeric, Table, and_, cast, delete, func, insert, literal, or_, select, update,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.schemas.payroll import PayrollCreate, Payroll
-from app.db.models.payroll import Payroll as PayrollModel
 
-def create_payroll(db: Session, payroll: PayrollCreate) -> Payroll:
-    db_payroll = PayrollModel(**payroll.dict())
-    db.add(db_payroll)
+from app.core.config import settings
+from app.db.models.attendance import AttendanceRecord
+from app.db.models.job import Job
+from app.db.models.payroll import Payroll as PayrollModel, PayrollRun
+from app.db.models.staff import Staff
+from app.schemas.payroll import PayrollRunCreate
+from app.services import job_queue
+from app.utils.pagination import PageParams, paginate
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# First key of the pg_advisory_xact_lock(int, int) pair serializing run_payroll per period
+PERIOD_LOCK_NAMESPACE = 4207
+
+# A run's hours per staff member, grouped once and then paged by primary key. Temporary,
+# so it is private to the run's connection; not part of the application schema.
+run_hours = Table(
+    "payroll_run_hours",
+    MetaData(),
+    Column("staff_id", Integer, primary_key=True, autoincrement=False),
+    Column("hours", Float, nullable=False),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+
+class PayrollRunInProgress(Exception):
+    """The period already has a pending or running payroll run."""
+
+    def __init__(self, period: str):
+        super().__init__(f"A payroll run for {period} is already in progress")
+        self.period = period
+
+
+def period_bounds(period: str) -> Tuple[date, date]:
+    """First and last day of a YYYY-MM period."""
+    year, month = (int(part) for part in period.split("-"))
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def hours_by_staff(start: date, end: date):
+    """Subquery of (staff_id, hours) summed from attendance between two dates inclusive."""
+    return (
+        select(AttendanceRecord.staff_id, func.sum(AttendanceRecord.hours_worked).label("hours"))
+        .where(AttendanceRecord.date >= start, AttendanceRecord.date <= end,
+               AttendanceRecord.hours_worked.isnot(None))
+        .group_by(AttendanceRecord.staff_id)
+        .subquery()
+    )
+
+
+def hours_worked(db: Session, staff_id: int, start: date, end: date) -> float:
+    total = db.execute(
+        select(func.coalesce(func.sum(AttendanceRecord.hours_worked), 0.0))
+        .where(AttendanceRecord.staff_id == staff_id, AttendanceRecord.date >= start, AttendanceRecord.date <= end)
+    ).scalar()
+    return round(float(total), 2)
+
+
+def generate_payroll(data: PayrollRunCreate, db: Session, user_id: Optional[int] = None) -> PayrollRun:
+    """
+    Queue a payroll run for a period; execute_run does the work. The run and its job
+    commit together. Raises PayrollRunInProgress when the period already has an active run.
+    """
+    fail_abandoned_runs(db, period=data.period)
+    start, end = period_bounds(data.period)
+    run = PayrollRun(
+        period=data.period,
+        start_date=data.start_date or start,
+        end_date=data.end_date or end,
+        status=PENDING,
+        processed_staff=0,
+        created_by=user_id,
+    )
+    db.add(run)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise PayrollRunInProgress(data.period)
+    # One attempt: a run records its own failure on payroll_runs
+    job = job_queue.enqueue(db, "payroll_run", {"run_id": run.id}, priority=10, max_attempts=1,
+                            user_id=user_id, commit=False)
+    run.job_id = job.id
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def get_run(db: Session, run_id: int) -> Optional[PayrollRun]:
+    return db.query(PayrollRun).filter(PayrollRun.id == run_id).first()
+
+
+def fail_abandoned_runs(db: Session, period: Optional[str] = None, run_id: Optional[int] = None) -> int:
+    """
+    Mark failed the pending or running runs whose job is finished, or running on a
+    lease that expired (its worker died), optionally only for one period or run; commits
+    and returns how many runs were failed.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    job_gone = (
+        select(Job.id)
+        .where(Job.id == PayrollRun.job_id, or_(
+            Job.status.in_([job_queue.SUCCEEDED, job_queue.FAILED]),
+            and_(Job.status == job_queue.RUNNING, Job.locked_at < cutoff),
+        ))
+        .exists()
+    )
+    stmt = update(PayrollRun).where(PayrollRun.status.in_([PENDING, RUNNING]), job_gone)
+    if period is not None:
+        stmt = stmt.where(PayrollRun.period == period)
+    if run_id is not None:
+        stmt = stmt.where(PayrollRun.id == run_id)
+    count = db.execute(
+        stmt.execution_options(synchronize_session=False)
+        .values(status=FAILED, error="Payroll job stopped before the run finished", finished_at=now)
+    ).rowcount
     db.commit()
-    db.refresh(db_payroll)
-    return db_payroll
+    if count:
+        logger.warning("Marked %s abandoned payroll run(s) failed", count)
+    return count
+
+
+def run_payroll(db: Session, run: PayrollRun, batch_size: Optional[int] = None,
+                report: Optional[Callable[[int, int], None]] = None) -> Tuple[int, float, float]:
+    """
+    Replace the period's generated payroll rows with one row per staff member who worked
+    in the run's date range; returns (staff, hours, salary). Attendance is grouped once into
+    a temporary table, then staff are written in id order, batch_size at a time, calling
+    report(processed, total) after each batch. The caller commits.
+    """
+    batch_size = batch_size or settings.PAYROLL_RUN_BATCH_SIZE
+    if db.get_bind().dialect.name == "postgresql":
+        # A run failed as abandoned may still be executing; never let two replace a period at once
+        db.execute(select(func.pg_advisory_xact_lock(PERIOD_LOCK_NAMESPACE, func.hashtext(run.period))))
+    connection = db.connection()
+    run_hours.create(connection)
+    grouped = hours_by_staff(run.start_date, run.end_date)
+    total = db.execute(
+        insert(run_hours).from_select(["staff_id", "hours"], select(grouped.c.staff_id, grouped.c.hours))
+    ).rowcount
+    if report:
+        report(0, total)
+
+    # Rows from earlier runs of the period are superseded; hand-entered rows are kept
+    db.execute(delete(PayrollModel).where(PayrollModel.period == run.period, PayrollModel.run_id.isnot(None)))
+
+    salary = cast(func.round(cast(run_hours.c.hours * func.coalesce(Staff.hourly_rate, 0.0), Numeric), 2), Numeric(10, 2))
+    now = datetime.utcnow()
+    processed, total_hours, total_salary, last_id = 0, 0.0, 0.0, 0
+    while True:
+        batch = (
+            select(Staff.id, literal(run.period), cast(run_hours.c.hours, Numeric(10, 2)), salary, literal(now), literal(run.id))
+            .join(run_hours, run_hours.c.staff_id == Staff.id)
+            .where(run_hours.c.staff_id > last_id)
+            .order_by(run_hours.c.staff_id)
+            .limit(batch_size)
+        )
+        written = db.execute(
+            insert(PayrollModel)
+            .from_select(["staff_id", "period", "hours_worked", "salary", "created_at", "run_id"], batch)
+            .returning(PayrollModel.staff_id, PayrollModel.hours_worked, PayrollModel.salary)
+        ).all()
+        if not written:
+            break
+        last_id = max(staff_id for staff_id, _, _ in written)
+        processed += len(written)
+        total_hours += sum(float(h) for _, h, _ in written)
+        total_salary += sum(float(s) for _, _, s in written)
+        if report:
+            report(processed, total)
+        if len(written) < batch_size:
+            break
+    run_hours.drop(connection)
+    return processed, round(total_hours, 2), round(total_salary, 2)
+
+
+def execute_run(run_id: int, on_progress: Optional[Callable[[int, int, str], None]] = None) -> None:
+    """Job: run a queued payroll run in its own sessions and record the outcome."""
+    from app.db.session import SessionLocal
+
+    db, progress_db = SessionLocal(), SessionLocal()
+    try:
+        run = get_run(db, run_id)
+        if run is None or run.status != PENDING:
+            return
+        status = get_run(progress_db, run_id)
+        started_at = datetime.now(timezone.utc)
+
+        def report(processed: int, total: int) -> None:
+            # Progress commits on its own session so pollers see it before the run commits
+            status.status, status.processed_staff, status.total_staff = RUNNING, processed, total
+            status.started_at = started_at
+            progress_db.commit()
+            if on_progress:
+                on_progress(processed, total, f"{processed} of {total} staff")
+
+        try:
+            staff, hours, salary = run_payroll(db, run, report=report)
+            run.status, run.processed_staff, run.total_staff = COMPLETED, staff, staff
+            run.total_hours, run.total_salary = hours, salary
+            run.started_at, run.finished_at = started_at, datetime.now(timezone.utc)
+            db.commit()
+            logger.info("Payroll run %s for %s: %s staff, %s hours, %s salary", run_id, run.period, staff, hours, salary)
+        except Exception as e:
+            db.rollback()
+            progress_db.rollback()
+            logger.exception("Payroll run %s failed", run_id)
+            status.status, status.error = FAILED, str(e)[:2000]
+            status.started_at, status.finished_at = started_at, datetime.now(timezone.utc)
+            progress_db.commit()
+    finally:
+        db.close()
+        progress_db.close()
+
+
+def get_payroll_by_staff_id(staff_id: int, db: Session) -> Optional[PayrollModel]:
+    """The staff member's most recent payroll row."""
+    return db.query(PayrollModel).filter(PayrollModel.staff_id == staff_id) \
+        .order_by(PayrollModel.created_at.desc(), PayrollModel.id.desc()).first()
+
+
+def delete_payroll(payroll_id: int, db: Session) -> bool:
+    deleted = db.query(PayrollModel).filter(PayrollModel.id == payroll_id).delete()
+    db.commit()
+    return bool(deleted)
+
 
-def get_payroll(db: Session, payroll_id: int) -> Payroll:
-    return db.query(PayrollModel).filter(PayrollModel.id == payroll_id).first()
\ No newline at end of file
+def list_payrolls(db: Session, page: PageParams, staff_id: Optional[int] = None, period: Optional[str] = None):
+    """Return one keyset page of payrolls, newest first, as (payrolls, next_cursor)."""
+    query = db.query(PayrollModel)
+    if staff_id is not None:
+        query = query.filter(PayrollModel.staff_id == staff_id)
+    if period:
+        query = query.filter(PayrollModel.period == period)
+    return paginate(query, page, PayrollModel.id, PayrollModel.created_at)
@@ -0,0 +1,187 @@
+"""
+Production Planning Service
+Explodes the bills of materials (ProductionRequirement) of a whole production plan in one
+query, totals the raw-material demand and checks it against the stock ledger in one more,
+so planning a weekly schedule costs the same few queries as planning a single product.
+Approval locks the raw material rows, re-reads their ledger balances and deducts every
+material with one UPDATE and one ledger upsert.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from sqlalchemy import Integer, column, func, select, update, values
+from sqlalchemy.orm import Session
+
+from app.db.models.production_requirement import ProductionRequirement, ProductionRequirementItem
+from app.db.models.raw_material import RawMaterial
+from app.db.models.stock_balance import StockBalance
+from app.services import stock_ledger
+
+
+class PlanLine(NamedTuple):
+    product_id: int
+    quantity: int
+
+
+@dataclass
+class MaterialNeed:
+    raw_material_id: int
+    raw_material_name: str
+    quantity_needed: int
+    available: int = 0
+
+    @property
+    def shortage(self) -> int:
+        return max(self.quantity_needed - self.available, 0)
+
+
+@dataclass
+class ProductionPlan:
+    lines: List[PlanLine]
+    # product_id -> [(raw_material_id, quantity for the planned quantity)]
+    product_materials: Dict[int, List[Tuple[int, int]]] = field(default_factory=dict)
+    materials: Dict[int, MaterialNeed] = field(default_factory=dict)
+    missing_requirements: List[int] = field(default_factory=list)
+
+    @property
+    def shortages(self) -> List[MaterialNeed]:
+        return [need for need in self.materials.values() if need.shortage]
+
+    @property
+    def feasible(self) -> bool:
+        return not self.missing_requirements and not self.shortages
+
+
+class ProductionPlanError(Exception):
+    """Raised by approve_plan when a product has no BOM or materials fall short."""
+
+    def __init__(self, plan: ProductionPlan):
+        self.plan = plan
+        if plan.missing_requirements:
+            message = f"Production requirement not found for product IDs {plan.missing_requirements}"
+        else:
+            message = f"Insufficient stock for {', '.join(need.raw_material_name for need in plan.shortages)}"
+        super().__init__(message)
+
+
+def explode_boms(db: Session, product_ids: Iterable[int]) -> Dict[int, List[Tuple[int, int]]]:
+    """
+    Per-unit raw material lines of each product's production requirement, in one query.
+    A product with several requirements uses the oldest one.
+    """
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return {}
+    rows = db.execute(
+        select(
+            ProductionRequirement.product_id,
+            ProductionRequirement.id,
+            ProductionRequirementItem.raw_material_id,
+            ProductionRequirementItem.quantity,
+        )
+        .outerjoin(ProductionRequirementItem, ProductionRequirementItem.production_requirement_id == ProductionRequirement.id)
+        .where(ProductionRequirement.product_id.in_(product_ids))
+        .order_by(ProductionRequirement.id, ProductionRequirementItem.id)
+    ).all()
+    requirement_of: Dict[int, int] = {}
+    boms: Dict[int, List[Tuple[int, int]]] = {}
+    for product_id, requirement_id, raw_material_id, quantity in rows:
+        if requirement_of.setdefault(product_id, requirement_id) != requirement_id:
+            continue
+        lines = boms.setdefault(product_id, [])
+        if raw_material_id is not None:
+            lines.append((raw_material_id, quantity))
+    return boms
+
+
+def _material_stock(db: Session, raw_material_ids: List[int], lock: bool):
+    """
+    Name and ledger balance of each raw material. lock=True locks the raw material rows in id
+    order first and only then reads (and locks) their ledger rows in a second statement, so a
+    caller that waited on another approval sees the balance that approval committed.
+    """
+    balance = (
+        (StockBalance.item_type == stock_ledger.RAW_MATERIAL)
+        & (StockBalance.item_id == RawMaterial.id)
+        & (StockBalance.warehouse_id == stock_ledger.NO_WAREHOUSE)
+    )
+    if not lock:
+        return db.execute(
+            select(RawMaterial.id, RawMaterial.name, func.coalesce(StockBalance.quantity, 0).label("available"))
+            .outerjoin(StockBalance, balance)
+            .where(RawMaterial.id.in_(raw_material_ids))
+            .order_by(RawMaterial.id)
+        ).all()
+
+    names = db.execute(
+        select(RawMaterial.id, RawMaterial.name)
+        .where(RawMaterial.id.in_(raw_material_ids))
+        .order_by(RawMaterial.id)
+        .with_for_update()
+    ).all()
+    # A new statement takes a new snapshot: it sees what committed while we waited for the lock
+    available = dict(db.execute(
+        select(StockBalance.item_id, StockBalance.quantity)
+        .where(
+            StockBalance.item_type == stock_ledger.RAW_MATERIAL,
+            StockBalance.item_id.in_(raw_material_ids),
+            StockBalance.warehouse_id == stock_ledger.NO_WAREHOUSE,
+        )
+        .order_by(StockBalance.item_id)
+        .with_for_update()
+    ).all())
+    return [(raw_material_id, name, available.get(raw_material_id) or 0) for raw_material_id, name in names]
+
+
+def plan_production(db: Session, lines: Iterable[PlanLine], lock: bool = False) -> ProductionPlan:
+    """Total raw material demand of a plan and how much of it current stock covers."""
+    plan = ProductionPlan(lines=list(lines))
+    boms = explode_boms(db, (line.product_id for line in plan.lines))
+    plan.missing_requirements = sorted({line.product_id for line in plan.lines} - set(boms))
+
+    demand: Dict[int, int] = defaultdict(int)
+    for line in plan.lines:
+        materials = [(raw_material_id, per_unit * line.quantity) for raw_material_id, per_unit in boms.get(line.product_id, [])]
+        plan.product_materials[line.product_id] = _merge(plan.product_materials.get(line.product_id, []) + materials)
+        for raw_material_id, quantity in materials:
+            demand[raw_material_id] += quantity
+    if not demand:
+        return plan
+
+    for raw_material_id, name, available in _material_stock(db, sorted(demand), lock):
+        plan.materials[raw_material_id] = MaterialNeed(raw_material_id, name, demand[raw_material_id], int(available))
+    return plan
+
+
+def approve_plan(db: Session, lines: Iterable[PlanLine]) -> ProductionPlan:
+    """
+    Deduct the raw materials of a whole plan, or nothing. Raises ProductionPlanError when a
+    product has no production requirement or any material falls short; the caller commits.
+    """
+    plan = plan_production(db, lines, lock=True)
+    if not plan.feasible:
+        raise ProductionPlanError(plan)
+    consumed = {raw_material_id: need.quantity_needed for raw_material_id, need in plan.materials.items() if need.quantity_needed}
+    if not consumed:
+        return plan
+    # opening_stock absorbs consumption so the ledger still reconciles to opening + intakes
+    moves = values(column("id", Integer), column("qty", Integer), name="moves").data(sorted(consumed.items()))
+    db.execute(
+        update(RawMaterial)
+        .where(RawMaterial.id == moves.c.id)
+        .values(opening_stock=func.coalesce(RawMaterial.opening_stock, 0) - moves.c.qty)
+        .execution_options(synchronize_session=False)
+    )
+    stock_ledger.apply_stock_deltas(db, stock_ledger.RAW_MATERIAL, {
+        (raw_material_id, stock_ledger.NO_WAREHOUSE): -quantity for raw_material_id, quantity in consumed.items()
+    })
+    return plan
+
+
+def _merge(materials: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    totals: Dict[int, int] = {}
+    for raw_material_id, quantity in materials:
+        totals[raw_material_id] = totals.get(raw_material_id, 0) + quantity
+    return list(totals.items())
@@ -1,16 +1,27 @@
 # Placeholder for reports_service.py
 # Implement the necessary service functions for handling reports here.
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 from app.db.models.payroll import Payroll
 from app.db.models.staff import Staff
-from app.db.models.invoice import Invoice
+from app.db.models.invoice import Invoice, InvoiceItem
 from app.db.models.user import User
 from app.db.models.user_activity import UserActivity
 from app.schemas.reports import SalaryReportResponse, StaffPerformanceReport, StaffPerformanceItem, SalesReport
 from app.schemas.invoices import InvoiceOut
 from app.schemas.user_activity_report import UserActivityReport, UserActivityItem
-from sqlalchemy import func
+from sqlalchemy import func, select
+from app.db.models.product import Product
+from app.db.models.sales_summary import SalesSummary
+import csv
+import io
+import json
+
+EXPORT_BATCH_SIZE = 1000
+SALES_EXPORT_COLUMNS = [
+    "invoice_id", "invoice_number", "date", "customer_name", "status", "total_amount", "vat",
+    "item_id", "product_id", "product_name", "quantity", "price",
+]
 
 class ReportsService:
     def generate_sales_report(self):
@@ -64,20 +75,35 @@ class ReportsService:
             ))
         return UserActivityReport(users=user_items)
 
+    @staticmethod
+    def sales_report_query(start_date: str, end_date: str):
+        """Invoices of the period; items and their products load in one extra statement, not one per invoice and item."""
+        from datetime import datetime
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+        return (
+            select(Invoice)
+            .options(selectinload(Invoice.items).joinedload(InvoiceItem.product))
+            .where(Invoice.date >= start, Invoice.date <= end)
+        )
+
     @staticmethod
     def get_sales_report(db: Session, start_date: str, end_date: str) -> SalesReport:
+        invoices = db.execute(ReportsService.sales_report_query(start_date, end_date)).scalars().all()
+        return ReportsService.build_sales_report(invoices, start_date, end_date)
+
+    @staticmethod
+    def build_sales_report(invoices, start_date: str, end_date: str) -> SalesReport:
         from datetime import datetime
         from app.schemas.invoices import InvoiceOut, InvoiceItemOut
         start = datetime.strptime(start_date, "%Y-%m-%d")
         end = datetime.strptime(end_date, "%Y-%m-%d")
-        invoices = db.query(Invoice).filter(Invoice.date >= start, Invoice.date <= end).all()
         total_sales = sum(inv.total_amount for inv in invoices)
         total_vat = sum(getattr(inv, 'vat', 0) or 0 for inv in invoices)
         transactions = []
         for inv in invoices:
             items = []
             for item in inv.items:
-                # Try to get product name if relationship is loaded
                 product_name = getattr(item.product, 'name', None)
                 items.append(InvoiceItemOut(
                     id=item.id,
@@ -104,4 +130,110 @@ class ReportsService:
             start_date=start.date(),
             end_date=end.date(),
             transactions=transactions
-        )
\ No newline at end of file
+        )
+
+    @staticmethod
+    def sales_export_query(start_date: str, end_date: str):
+        """One row per invoice line, ordered so rows of an invoice are contiguous."""
+        from datetime import datetime
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+        return (
+            select(
+                Invoice.id.label("invoice_id"),
+                Invoice.invoice_number,
+                Invoice.date,
+                Invoice.customer_name,
+                Invoice.status,
+                Invoice.total_amount,
+                Invoice.vat,
+                InvoiceItem.id.label("item_id"),
+                InvoiceItem.product_id,
+                Product.name.label("product_name"),
+                InvoiceItem.quantity,
+                InvoiceItem.price,
+            )
+            .outerjoin(InvoiceItem, InvoiceItem.invoice_id == Invoice.id)
+            .outerjoin(Product, Product.id == InvoiceItem.product_id)
+            .filter(Invoice.date >= start, Invoice.date <= end)
+            .order_by(Invoice.date, Invoice.id, InvoiceItem.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+
+    @staticmethod
+    def stream_sales_export(db: Session, start_date: str, end_date: str, export_format: str = "csv"):
+        """
+        Yield the sales report as CSV (one line per invoice item) or NDJSON (one invoice per line).
+        yield_per makes the driver use a server-side cursor, so memory stays bounded by the batch size.
+        """
+        rows = db.execute(ReportsService.sales_export_query(start_date, end_date))
+        if export_format == "ndjson":
+            yield from ReportsService._ndjson_invoices(rows)
+            return
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(SALES_EXPORT_COLUMNS)
+        for count, row in enumerate(rows, start=1):
+            writer.writerow([
+                row.date.isoformat() if column == "date" and row.date else getattr(row, column)
+                for column in SALES_EXPORT_COLUMNS
+            ])
+            if count % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        yield buffer.getvalue()
+
+    @staticmethod
+    def _ndjson_invoices(rows):
+        invoice = None
+        for row in rows:
+            if invoice is None or invoice["id"] != row.invoice_id:
+                if invoice is not None:
+                    yield json.dumps(invoice) + "\n"
+                invoice = {
+                    "id": row.invoice_id,
+                    "invoice_number": row.invoice_number,
+                    "customer_name": row.customer_name,
+                    "date": row.date.isoformat() if row.date else None,
+                    "total_amount": row.total_amount,
+                    "vat": row.vat,
+                    "status": row.status,
+                    "items": [],
+                }
+            if row.item_id is not None:
+                invoice["items"].append({
+                    "id": row.item_id,
+                    "product_id": row.product_id,
+                    "product_name": row.product_name,
+                    "quantity": row.quantity,
+                    "price": row.price,
+                })
+        if invoice is not None:
+            yield json.dumps(invoice) + "\n"
+
+    @staticmethod
+    def get_daily_sales(db: Session, start_date: str, end_date: str, dimension: str = "total", key_id=None):
+        """Read pre-aggregated daily rows instead of scanning invoices."""
+        from datetime import datetime
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        query = db.query(SalesSummary).filter(
+            SalesSummary.dimension == dimension,
+            SalesSummary.start_date >= start,
+            SalesSummary.start_date <= end
+        )
+        if key_id is not None:
+            query = query.filter(SalesSummary.key_id == key_id)
+        return [
+            {
+                "day": row.start_date,
+                "dimension": row.dimension,
+                "key_id": row.key_id,
+                "transactions": row.transactions,
+                "quantity": row.quantity,
+                "total_sales": row.total_sales,
+                "total_vat": row.total_vat,
+            }
+            for row in query.order_by(SalesSummary.start_date, SalesSummary.key_id).all()
+        ]
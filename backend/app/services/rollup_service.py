@@ -0,0 +1,307 @@
+"""
+Sales and Production Rollup Service
+Keeps the daily aggregate tables current as documents are written: sales_summary
+(per day, per customer / product / warehouse), customer_performance (running totals per
+customer) and production_analysis (per product and day). Dashboards read these rows
+instead of scanning invoices and production output.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Float, cast, func, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.models.customer_performance import CustomerPerformance
+from app.db.models.invoice import Invoice, InvoiceItem
+from app.db.models.product import Product
+from app.db.models.production_analysis import ProductionAnalysis
+from app.db.models.production_output import ProductionOutput
+from app.db.models.sales_summary import (
+    DIMENSION_CUSTOMER,
+    DIMENSION_PRODUCT,
+    DIMENSION_TOTAL,
+    DIMENSION_WAREHOUSE,
+    SalesSummary,
+)
+
+
+def _day(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+# (invoice_date, customer_id, warehouse_id, total_amount, vat, [(product_id, quantity, price), ...])
+InvoiceSale = Tuple[object, Optional[int], Optional[int], float, Optional[float], Iterable[Tuple[int, int, float]]]
+
+
+def record_invoice_sales(
+    db: Session,
+    invoice_date,
+    customer_id: Optional[int],
+    warehouse_id: Optional[int],
+    total_amount: float,
+    vat: Optional[float],
+    lines: Iterable[Tuple[int, int, float]],
+) -> None:
+    """
+    Add one invoice to the daily rollups. lines are (product_id, quantity, price).
+    Runs inside the caller's transaction, so the rollup commits or rolls back with the invoice.
+    """
+    record_sales(db, [(invoice_date, customer_id, warehouse_id, total_amount, vat, lines)])
+
+
+async def record_invoice_sales_async(
+    db: AsyncSession,
+    invoice_date,
+    customer_id: Optional[int],
+    warehouse_id: Optional[int],
+    total_amount: float,
+    vat: Optional[float],
+    lines: Iterable[Tuple[int, int, float]],
+) -> None:
+    """record_invoice_sales on an AsyncSession."""
+    for stmt in sales_upserts([(invoice_date, customer_id, warehouse_id, total_amount, vat, lines)]):
+        await db.execute(stmt)
+
+
+def record_sales(db: Session, sales: Iterable[InvoiceSale]) -> None:
+    """
+    Add any number of invoices to the rollups: totals are summed per (day, dimension, key)
+    first, so a batch costs one sales_summary upsert and one customer_performance upsert.
+    """
+    for stmt in sales_upserts(sales):
+        db.execute(stmt)
+
+
+def sales_upserts(sales: Iterable[InvoiceSale]) -> list:
+    """The sales_summary and customer_performance upserts that add the given invoices to the rollups."""
+    summary: Dict[Tuple[date, str, int], list] = defaultdict(lambda: [0.0, 0.0, 0, 0])
+    customers: Dict[int, list] = {}
+
+    def add(key, amount, vat, quantity):
+        totals = summary[key]
+        totals[0] += amount
+        totals[1] += vat
+        totals[2] += 1
+        totals[3] += quantity
+
+    for invoice_date, customer_id, warehouse_id, total_amount, vat, lines in sales:
+        day = _day(invoice_date)
+        product_totals: Dict[int, list] = defaultdict(lambda: [0, 0.0])
+        for product_id, quantity, price in lines:
+            product_totals[product_id][0] += quantity
+            product_totals[product_id][1] += quantity * price
+        total_quantity = sum(quantity for quantity, _ in product_totals.values())
+
+        add((day, DIMENSION_TOTAL, 0), total_amount, vat or 0, total_quantity)
+        if customer_id:
+            add((day, DIMENSION_CUSTOMER, customer_id), total_amount, vat or 0, total_quantity)
+            totals = customers.setdefault(customer_id, [0, 0.0, day])
+            totals[0] += 1
+            totals[1] += total_amount
+            totals[2] = max(totals[2], day)
+        if warehouse_id:
+            add((day, DIMENSION_WAREHOUSE, warehouse_id), total_amount, vat or 0, total_quantity)
+        for product_id, (quantity, amount) in product_totals.items():
+            add((day, DIMENSION_PRODUCT, product_id), amount, 0, quantity)
+
+    if not summary:
+        return []
+    rows = [
+        _summary_row(day, dimension, key_id, amount, vat, transactions, quantity)
+        for (day, dimension, key_id), (amount, vat, transactions, quantity) in sorted(summary.items())
+    ]
+    statements = [_sales_summary_upsert(rows)]
+    if customers:
+        statements.append(_customer_performance_upsert(customers))
+    return statements
+
+
+def _sales_summary_upsert(rows: list):
+    stmt = pg_insert(SalesSummary).values(rows)
+    return stmt.on_conflict_do_update(
+        constraint="uq_sales_summary_day_dimension_key",
+        set_={
+            "total_sales": SalesSummary.total_sales + stmt.excluded.total_sales,
+            "total_vat": SalesSummary.total_vat + stmt.excluded.total_vat,
+            "transactions": SalesSummary.transactions + stmt.excluded.transactions,
+            "quantity": SalesSummary.quantity + stmt.excluded.quantity,
+            "updated_at": func.now(),
+        },
+    )
+
+
+def _customer_performance_upsert(customers: Dict[int, list]):
+    """customers maps customer_id -> [transactions, amount, last invoice day]."""
+    stmt = pg_insert(CustomerPerformance).values([
+        {"customer_id": customer_id, "total_transactions": count, "total_amount": amount, "last_invoice_date": day}
+        for customer_id, (count, amount, day) in sorted(customers.items())
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=[CustomerPerformance.customer_id],
+        set_={
+            "total_transactions": CustomerPerformance.total_transactions + stmt.excluded.total_transactions,
+            "total_amount": CustomerPerformance.total_amount + stmt.excluded.total_amount,
+            "last_invoice_date": func.greatest(CustomerPerformance.last_invoice_date, stmt.excluded.last_invoice_date),
+        },
+    )
+
+
+def link_customer_invoices(db: Session, customer_id: int, name: str) -> int:
+    """
+    Attach the invoices issued under name before any customer had it to customer_id, and
+    add them to that customer's rollups; returns how many invoices were linked. Call it
+    whenever a customer takes a name (registration). The invoices are already in the total,
+    product and warehouse rollups, so only the customer dimension changes. Runs inside the
+    caller's transaction.
+    """
+    linked = db.execute(
+        update(Invoice)
+        .where(Invoice.customer_name == name, Invoice.customer_id.is_(None))
+        .values(customer_id=customer_id)
+        .returning(Invoice.id, Invoice.date, Invoice.total_amount, Invoice.vat)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not linked:
+        return 0
+    quantities = dict(db.execute(
+        select(InvoiceItem.invoice_id, func.coalesce(func.sum(InvoiceItem.quantity), 0))
+        .where(InvoiceItem.invoice_id.in_([invoice.id for invoice in linked]))
+        .group_by(InvoiceItem.invoice_id)
+    ).all())
+
+    summary: Dict[date, list] = defaultdict(lambda: [0.0, 0.0, 0, 0])
+    for invoice in linked:
+        totals = summary[_day(invoice.date)]
+        totals[0] += invoice.total_amount or 0
+        totals[1] += invoice.vat or 0
+        totals[2] += 1
+        totals[3] += quantities.get(invoice.id, 0)
+    db.execute(_sales_summary_upsert([
+        _summary_row(day, DIMENSION_CUSTOMER, customer_id, amount, vat, transactions, quantity)
+        for day, (amount, vat, transactions, quantity) in sorted(summary.items())
+    ]))
+    db.execute(_customer_performance_upsert({
+        customer_id: [len(linked), sum(invoice.total_amount or 0 for invoice in linked), max(summary)]
+    }))
+    return len(linked)
+
+
+def _summary_row(day: date, dimension: str, key_id: int, amount: float, vat: float, transactions: int, quantity: int) -> dict:
+    return {
+        "start_date": day,
+        "end_date": day,
+        "dimension": dimension,
+        "key_id": key_id,
+        "total_sales": amount,
+        "total_vat": vat,
+        "transactions": transactions,
+        "quantity": quantity,
+    }
+
+
+def refresh_production_analysis(db: Session, keys: Iterable[Tuple[int, date]]) -> None:
+    """
+    Recompute the production_analysis rows of the given (product_id, production_date) keys
+    from production_output with one INSERT ... SELECT ... ON CONFLICT DO UPDATE.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    good = func.sum(ProductionOutput.good_products)
+    damaged = func.sum(ProductionOutput.damaged_products)
+    source = (
+        select(
+            ProductionOutput.product_id,
+            Product.name,
+            ProductionOutput.production_date,
+            good,
+            good,
+            damaged,
+            func.coalesce(cast(good, Float) * 100 / cast(func.nullif(good + damaged, 0), Float), 0),
+        )
+        .join(Product, Product.id == ProductionOutput.product_id)
+        .where(tuple_(ProductionOutput.product_id, ProductionOutput.production_date).in_(keys))
+        .group_by(ProductionOutput.product_id, Product.name, ProductionOutput.production_date)
+    )
+    stmt = pg_insert(ProductionAnalysis).from_select(
+        ["product_id", "product_name", "production_date", "quantity_produced", "good_products", "damaged_products", "efficiency"],
+        source,
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_production_analysis_product_date",
+        set_={
+            "product_name": stmt.excluded.product_name,
+            "quantity_produced": stmt.excluded.quantity_produced,
+            "good_products": stmt.excluded.good_products,
+            "damaged_products": stmt.excluded.damaged_products,
+            "efficiency": stmt.excluded.efficiency,
+        },
+    )
+    db.execute(stmt)
+
+
+# Full rebuilds from the source tables, used by the migration backfill and for repairs.
+# Invoices issued under a name before its customer was registered are linked first.
+REBUILD_SALES_SQL = """
+    UPDATE invoices SET customer_id = (SELECT MIN(c.id) FROM customers c WHERE c.name = invoices.customer_name)
+    WHERE customer_id IS NULL AND EXISTS (SELECT 1 FROM customers c WHERE c.name = invoices.customer_name);
+    DELETE FROM sales_summary;
+    INSERT INTO sales_summary (start_date, end_date, dimension, key_id, total_sales, total_vat, transactions, quantity)
+    SELECT d, d, 'total', 0, SUM(total_amount), SUM(COALESCE(vat, 0)), COUNT(*), SUM(qty)
+    FROM (SELECT i.date::date AS d, i.total_amount, i.vat,
+                 (SELECT COALESCE(SUM(quantity), 0) FROM invoice_items WHERE invoice_id = i.id) AS qty
+          FROM invoices i) t
+    GROUP BY d;
+    INSERT INTO sales_summary (start_date, end_date, dimension, key_id, total_sales, total_vat, transactions, quantity)
+    SELECT d, d, 'customer', customer_id, SUM(total_amount), SUM(COALESCE(vat, 0)), COUNT(*), SUM(qty)
+    FROM (SELECT i.date::date AS d, i.customer_id, i.total_amount, i.vat,
+                 (SELECT COALESCE(SUM(quantity), 0) FROM invoice_items WHERE invoice_id = i.id) AS qty
+          FROM invoices i WHERE i.customer_id IS NOT NULL) t
+    GROUP BY d, customer_id;
+    INSERT INTO sales_summary (start_date, end_date, dimension, key_id, total_sales, total_vat, transactions, quantity)
+    SELECT d, d, 'warehouse', warehouse_id, SUM(total_amount), SUM(COALESCE(vat, 0)), COUNT(*), SUM(qty)
+    FROM (SELECT i.date::date AS d, i.warehouse_id, i.total_amount, i.vat,
+                 (SELECT COALESCE(SUM(quantity), 0) FROM invoice_items WHERE invoice_id = i.id) AS qty
+          FROM invoices i WHERE i.warehouse_id IS NOT NULL) t
+    GROUP BY d, warehouse_id;
+    INSERT INTO sales_summary (start_date, end_date, dimension, key_id, total_sales, total_vat, transactions, quantity)
+    SELECT i.date::date, i.date::date, 'product', ii.product_id, SUM(ii.quantity * ii.price), 0,
+           COUNT(DISTINCT i.id), SUM(ii.quantity)
+    FROM invoices i JOIN invoice_items ii ON ii.invoice_id = i.id
+    WHERE ii.product_id IS NOT NULL
+    GROUP BY i.date::date, ii.product_id;
+    DELETE FROM customer_performance;
+    INSERT INTO customer_performance (customer_id, total_transactions, total_amount, last_invoice_date)
+    SELECT customer_id, COUNT(*), SUM(total_amount), MAX(date)::date
+    FROM invoices WHERE customer_id IS NOT NULL
+    GROUP BY customer_id;
+"""
+
+REBUILD_PRODUCTION_SQL = """
+    DELETE FROM production_analysis;
+    INSERT INTO production_analysis (product_id, product_name, production_date, quantity_produced,
+                                     good_products, damaged_products, efficiency)
+    SELECT po.product_id, p.name, po.production_date, SUM(po.good_products), SUM(po.good_products),
+           SUM(po.damaged_products),
+           COALESCE(SUM(po.good_products)::float * 100 / NULLIF(SUM(po.good_products + po.damaged_products), 0), 0)
+    FROM production_output po JOIN products p ON p.id = po.product_id
+    GROUP BY po.product_id, p.name, po.production_date;
+"""
+
+
+def rebuild_rollups(db: Session) -> None:
+    """
+    Recompute every rollup row from invoices and production output, then commit.
+    Writers are blocked until the rebuild commits: an invoice committed before the lock is
+    counted by the rebuild, one still open applies its delta after it, never both.
+    """
+    # Same order the invoice path upserts in, so a waiting writer cannot deadlock with us
+    db.execute(text("LOCK TABLE sales_summary, customer_performance, production_analysis IN SHARE ROW EXCLUSIVE MODE"))
+    for sql in (REBUILD_SALES_SQL, REBUILD_PRODUCTION_SQL):
+        for statement in filter(None, (s.strip() for s in sql.split(";"))):
+            db.execute(text(statement))
+    db.commit()
@@ -3,15 +3,16 @@ Simulation Authentication Service for SKIP_DATABASE mode
 Provides mock authentication without database access
 """
 import os
+import threading
 from typing import Optional, Dict, Any
 from app.core.security import create_access_token, verify_password, get_password_hash
 
-# Mock users for simulation mode
+# Mock users for simulation mode; seed passwords are hashed on first use, not at import
 MOCK_USERS = {
     "admin": {
         "id": 1,
         "username": "admin",
-        "password_hash": get_password_hash("admin123"),
+        "password": "admin123",
         "role": "Admin",
         "status": "active",
         "email": "admin@astrobsm.com"
@@ -19,7 +20,7 @@ MOCK_USERS = {
     "manager": {
         "id": 2,
         "username": "manager",
-        "password_hash": get_password_hash("manager123"),
+        "password": "manager123",
         "role": "Manager",
         "status": "active",
         "email": "manager@astrobsm.com"
@@ -27,19 +28,30 @@ MOCK_USERS = {
     "employee": {
         "id": 3,
         "username": "employee",
-        "password_hash": get_password_hash("employee123"),
+        "password": "employee123",
         "role": "Employee",
         "status": "active",
         "email": "employee@astrobsm.com"
     }
 }
 
+_seed_hash_lock = threading.Lock()
+
+def _password_hash(user_data: Dict[str, Any]) -> str:
+    # Concurrent first logins for a seed user must hash its password once, not race on it
+    if "password_hash" not in user_data:
+        with _seed_hash_lock:
+            if "password_hash" not in user_data:
+                user_data["password_hash"] = get_password_hash(user_data["password"])
+                user_data.pop("password", None)
+    return user_data["password_hash"]
+
 class MockUser:
     """Mock user object that mimics SQLAlchemy User model"""
     def __init__(self, user_data: Dict[str, Any]):
         self.id = user_data["id"]
         self.username = user_data["username"]
-        self.password_hash = user_data["password_hash"]
+        self.password_hash = user_data.get("password_hash")
         self.role = user_data["role"]
         self.status = user_data["status"]
         self.email = user_data.get("email", f"{user_data['username']}@astrobsm.com")
@@ -59,7 +71,7 @@ def simulate_authenticate_user(username: str, password: str, role: str = None) -
         return None
     
     # Verify password
-    if not verify_password(password, user_data["password_hash"]):
+    if not verify_password(password, _password_hash(user_data)):
         print(f"[SIMULATION] Invalid password for user: {username}")
         return None
     
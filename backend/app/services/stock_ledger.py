@@ -0,0 +1,189 @@
+"""
+Stock Ledger Service
+Maintains the stock_balance summary table: one row per (item, warehouse) updated
+incrementally by every stock write, so stock-level reads never aggregate history.
+"""
+
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models.inventory import Inventory
+from app.db.models.product import Product
+from app.db.models.raw_material import RawMaterial, RawMaterialStockIntake
+from app.db.models.stock_balance import StockBalance
+from app.db.models.warehouse import Warehouse
+
+PRODUCT = "product"
+RAW_MATERIAL = "raw_material"
+NO_WAREHOUSE = 0
+
+# (item_id, warehouse_id) -> signed quantity change
+StockDeltas = Dict[Tuple[int, int], int]
+
+
+def stock_deltas_upsert(item_type: str, deltas: StockDeltas):
+    """
+    One INSERT ... ON CONFLICT DO UPDATE adding signed quantity changes to the ledger, or None
+    when nothing changes. Keys are written in sorted order so concurrent writers lock ledger rows consistently.
+    """
+    rows = [
+        {"item_type": item_type, "item_id": item_id, "warehouse_id": warehouse_id or NO_WAREHOUSE, "quantity": delta}
+        for (item_id, warehouse_id), delta in sorted(deltas.items(), key=lambda kv: (kv[0][0], kv[0][1] or NO_WAREHOUSE))
+        if delta
+    ]
+    if not rows:
+        return None
+    stmt = pg_insert(StockBalance).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[StockBalance.item_type, StockBalance.item_id, StockBalance.warehouse_id],
+        set_={
+            "quantity": StockBalance.quantity + stmt.excluded.quantity,
+            "updated_at": func.now(),
+        },
+    )
+
+
+def apply_stock_deltas(db: Session, item_type: str, deltas: StockDeltas) -> None:
+    """Add signed quantity changes to the ledger with a single INSERT ... ON CONFLICT DO UPDATE."""
+    stmt = stock_deltas_upsert(item_type, deltas)
+    if stmt is not None:
+        db.execute(stmt)
+
+
+def get_balances(db: Session, item_type: str, item_ids) -> Dict[Tuple[int, int], int]:
+    """Primary-key lookup of current balances for the given items."""
+    item_ids = sorted(set(item_ids))
+    if not item_ids:
+        return {}
+    rows = db.execute(
+        select(StockBalance.item_id, StockBalance.warehouse_id, StockBalance.quantity)
+        .where(StockBalance.item_type == item_type, StockBalance.item_id.in_(item_ids))
+    ).all()
+    return {(row.item_id, row.warehouse_id): row.quantity for row in rows}
+
+
+def product_balances_query():
+    """Per (product, warehouse) balances with product and warehouse details."""
+    return (
+        select(
+            StockBalance.item_id.label("product_id"),
+            Product.name,
+            Product.reorder_point,
+            StockBalance.warehouse_id,
+            Warehouse.name.label("warehouse_name"),
+            StockBalance.quantity.label("available_quantity"),
+        )
+        .join(Product, Product.id == StockBalance.item_id)
+        .join(Warehouse, Warehouse.id == StockBalance.warehouse_id)
+        .where(StockBalance.item_type == PRODUCT)
+        .order_by(StockBalance.item_id, StockBalance.warehouse_id)
+    )
+
+
+def product_balances(db: Session):
+    """Per (product, warehouse) balances with product and warehouse details."""
+    return db.execute(product_balances_query()).all()
+
+
+def raw_material_balances(db: Session):
+    """Balance of every raw material; materials without a ledger row report zero."""
+    return (
+        db.query(
+            RawMaterial.id,
+            RawMaterial.name,
+            func.coalesce(StockBalance.quantity, 0).label("quantity"),
+            RawMaterial.reorder_point,
+        )
+        .outerjoin(
+            StockBalance,
+            (StockBalance.item_type == RAW_MATERIAL)
+            & (StockBalance.item_id == RawMaterial.id)
+            & (StockBalance.warehouse_id == NO_WAREHOUSE),
+        )
+        .order_by(RawMaterial.id)
+        .all()
+    )
+
+
+def _expected_balances(db: Session) -> Dict[Tuple[str, int, int], int]:
+    """Recompute every balance from the source tables (inventory, raw materials, intakes)."""
+    expected = {}
+    product_rows = db.execute(
+        select(
+            Inventory.product_id,
+            func.coalesce(Inventory.warehouse_id, NO_WAREHOUSE).label("warehouse_id"),
+            func.coalesce(func.sum(Inventory.quantity), 0).label("quantity"),
+        )
+        .where(Inventory.product_id.isnot(None))
+        .group_by(Inventory.product_id, func.coalesce(Inventory.warehouse_id, NO_WAREHOUSE))
+    ).all()
+    for row in product_rows:
+        expected[(PRODUCT, row.product_id, row.warehouse_id)] = int(row.quantity)
+
+    intake_totals = (
+        select(
+            RawMaterialStockIntake.raw_material_id,
+            func.sum(RawMaterialStockIntake.quantity).label("received"),
+        )
+        .group_by(RawMaterialStockIntake.raw_material_id)
+        .subquery()
+    )
+    raw_rows = db.execute(
+        select(
+            RawMaterial.id,
+            (func.coalesce(RawMaterial.opening_stock, 0) + func.coalesce(intake_totals.c.received, 0)).label("quantity"),
+        )
+        .outerjoin(intake_totals, intake_totals.c.raw_material_id == RawMaterial.id)
+    ).all()
+    for row in raw_rows:
+        expected[(RAW_MATERIAL, row.id, NO_WAREHOUSE)] = int(row.quantity)
+    return expected
+
+
+def reconcile_stock_balances(db: Session, apply: bool = True) -> List[dict]:
+    """
+    Rebuild the ledger from the source tables and report drift.
+    Writers are blocked for the duration of the rebuild so no delta is lost in between.
+    Returns one entry per (item, warehouse) whose ledger value differed from the source.
+    """
+    if apply:
+        db.execute(text("LOCK TABLE stock_balance IN SHARE ROW EXCLUSIVE MODE"))
+    expected = _expected_balances(db)
+    actual = {
+        (row.item_type, row.item_id, row.warehouse_id): row.quantity
+        for row in db.execute(
+            select(StockBalance.item_type, StockBalance.item_id, StockBalance.warehouse_id, StockBalance.quantity)
+        ).all()
+    }
+    drift = []
+    for key in sorted(set(expected) | set(actual)):
+        expected_qty = expected.get(key, 0)
+        actual_qty = actual.get(key)
+        if actual_qty is None and expected_qty == 0:
+            continue
+        if actual_qty != expected_qty:
+            item_type, item_id, warehouse_id = key
+            drift.append({
+                "item_type": item_type,
+                "item_id": item_id,
+                "warehouse_id": warehouse_id,
+                "expected": expected_qty,
+                "actual": actual_qty,
+            })
+    if apply and drift:
+        rows = [
+            {"item_type": d["item_type"], "item_id": d["item_id"], "warehouse_id": d["warehouse_id"], "quantity": d["expected"]}
+            for d in drift
+        ]
+        stmt = pg_insert(StockBalance).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StockBalance.item_type, StockBalance.item_id, StockBalance.warehouse_id],
+            set_={"quantity": stmt.excluded.quantity, "updated_at": func.now()},
+        )
+        db.execute(stmt)
+    if apply:
+        db.commit()
+    return drift
@@ -0,0 +1,207 @@
+"""
+Stock Deduction Service
+Set-based inventory movements: a whole document (invoice, import batch, transfer)
+is locked, allocated and deducted in a fixed number of statements, whatever its line count.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import Integer, case, column, func, select, tuple_, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.models.inventory import Inventory
+from app.db.models.product import Product
+from app.db.models.stock_balance import StockBalance
+from app.services.stock_ledger import PRODUCT, stock_deltas_upsert
+
+# (product_id, warehouse_id) -> quantity
+StockDemand = Dict[Tuple[int, int], int]
+
+
+class InsufficientStockError(Exception):
+    """Raised when one or more (product, warehouse) pairs cannot cover the requested quantity."""
+
+    def __init__(self, shortages: Dict[Tuple[int, int], Tuple[int, int]]):
+        # (product_id, warehouse_id) -> (requested, available)
+        self.shortages = shortages
+        product_ids = sorted({product_id for product_id, _ in shortages})
+        super().__init__(f"Insufficient stock for product IDs {product_ids}")
+
+    @property
+    def product_ids(self) -> List[int]:
+        return sorted({product_id for product_id, _ in self.shortages})
+
+
+def aggregate_demand(lines: Iterable[Tuple[int, int, int]]) -> StockDemand:
+    """Sum (product_id, warehouse_id, quantity) lines into one demand entry per pair."""
+    demand: StockDemand = defaultdict(int)
+    for product_id, warehouse_id, quantity in lines:
+        demand[(product_id, warehouse_id)] += quantity
+    return dict(demand)
+
+
+def lock_inventory_query(pairs: Iterable[Tuple[int, int]]):
+    """
+    SELECT ... FOR UPDATE of every inventory row of the given (product_id, warehouse_id) pairs,
+    or None when there are none. Rows come back in a fixed global order (product, warehouse,
+    earliest expiry first) so concurrent documents always lock in the same sequence.
+    """
+    pairs = sorted(set(pairs))
+    if not pairs:
+        return None
+    return (
+        select(
+            Inventory.id,
+            Inventory.product_id,
+            Inventory.warehouse_id,
+            Inventory.quantity,
+            Inventory.batch_no,
+            Inventory.expiry_date,
+        )
+        .where(tuple_(Inventory.product_id, Inventory.warehouse_id).in_(pairs))
+        .order_by(
+            Inventory.product_id,
+            Inventory.warehouse_id,
+            Inventory.expiry_date.asc().nulls_last(),
+            Inventory.id,
+        )
+        .with_for_update()
+    )
+
+
+def lock_inventory(db: Session, pairs: Iterable[Tuple[int, int]]):
+    """Lock every inventory row of the given pairs with a single SELECT ... FOR UPDATE (see lock_inventory_query)."""
+    stmt = lock_inventory_query(pairs)
+    return db.execute(stmt).all() if stmt is not None else []
+
+
+def allocate(locked_rows, demand: StockDemand):
+    """
+    Allocate demand against locked rows, first-expiring batch first.
+    Returns ({inventory_id: quantity}, shortages) without touching the database.
+    """
+    available: Dict[Tuple[int, int], int] = defaultdict(int)
+    rows_by_pair = defaultdict(list)
+    for row in locked_rows:
+        pair = (row.product_id, row.warehouse_id)
+        available[pair] += max(row.quantity or 0, 0)
+        rows_by_pair[pair].append(row)
+
+    shortages = {
+        pair: (requested, available.get(pair, 0))
+        for pair, requested in demand.items()
+        if requested > available.get(pair, 0)
+    }
+    if shortages:
+        return {}, shortages
+
+    deductions: Dict[int, int] = {}
+    for pair, requested in demand.items():
+        remaining = requested
+        for row in rows_by_pair[pair]:
+            if remaining <= 0:
+                break
+            take = min(max(row.quantity or 0, 0), remaining)
+            if take:
+                deductions[row.id] = take
+                remaining -= take
+    return deductions, {}
+
+
+def deductions_update(deductions: Dict[int, int]):
+    """One UPDATE ... FROM (VALUES ...) applying all per-row deductions, or None when there are none."""
+    if not deductions:
+        return None
+    moves = values(
+        column("id", Integer), column("qty", Integer), name="moves"
+    ).data(list(deductions.items()))
+    return (
+        update(Inventory)
+        .where(Inventory.id == moves.c.id)
+        .values(quantity=Inventory.quantity - moves.c.qty)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def apply_deductions(db: Session, deductions: Dict[int, int]) -> None:
+    """Apply all per-row deductions with one UPDATE ... FROM (VALUES ...)."""
+    stmt = deductions_update(deductions)
+    if stmt is not None:
+        db.execute(stmt)
+
+
+def product_status_update(product_ids: Iterable[int]):
+    """One UPDATE recomputing the Green/Amber/Red status of the given products from the stock ledger."""
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return None
+    totals = (
+        select(
+            StockBalance.item_id.label("product_id"),
+            func.coalesce(func.sum(StockBalance.quantity), 0).label("total"),
+        )
+        .where(StockBalance.item_type == PRODUCT, StockBalance.item_id.in_(product_ids))
+        .group_by(StockBalance.item_id)
+        .subquery()
+    )
+    return (
+        update(Product)
+        .where(Product.id == totals.c.product_id)
+        .values(
+            status=case(
+                (totals.c.total > Product.reorder_point, "Green"),
+                (totals.c.total == Product.reorder_point, "Amber"),
+                else_="Red",
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def refresh_product_status(db: Session, product_ids: Iterable[int]) -> None:
+    """Recompute the Green/Amber/Red status of the given products from the stock ledger in one UPDATE."""
+    stmt = product_status_update(product_ids)
+    if stmt is not None:
+        db.execute(stmt)
+
+
+def deduction_statements(deductions: Dict[int, int], demand: StockDemand) -> list:
+    """The writes of an allocated deduction, in order: inventory rows, stock ledger, product status."""
+    statements = [
+        deductions_update(deductions),
+        stock_deltas_upsert(PRODUCT, {pair: -quantity for pair, quantity in demand.items()}),
+        product_status_update({product_id for product_id, _ in demand}),
+    ]
+    return [stmt for stmt in statements if stmt is not None]
+
+
+def deduct_stock(db: Session, demand: StockDemand) -> Dict[int, int]:
+    """
+    Lock, check and deduct a whole demand, update the stock ledger, then refresh product status.
+    Raises InsufficientStockError without modifying anything if any pair falls short.
+    The caller owns the transaction and commits once.
+    """
+    if not demand:
+        return {}
+    locked_rows = lock_inventory(db, demand.keys())
+    deductions, shortages = allocate(locked_rows, demand)
+    if shortages:
+        raise InsufficientStockError(shortages)
+    for stmt in deduction_statements(deductions, demand):
+        db.execute(stmt)
+    return deductions
+
+
+async def deduct_stock_async(db: AsyncSession, demand: StockDemand) -> Dict[int, int]:
+    """deduct_stock on an AsyncSession: the same statements, awaited."""
+    if not demand:
+        return {}
+    locked_rows = (await db.execute(lock_inventory_query(demand.keys()))).all()
+    deductions, shortages = allocate(locked_rows, demand)
+    if shortages:
+        raise InsufficientStockError(shortages)
+    for stmt in deduction_statements(deductions, demand):
+        await db.execute(stmt)
+    return deductions
@@ -0,0 +1,117 @@
+"""
+Warehouse Transfer Service
+Moves any number of product lines between warehouses in one transaction. Source and
+destination inventory rows are locked together by lock_inventory, which always locks in
+(product_id, warehouse_id) order, so two transfer orders touching the same rows cannot
+deadlock. Stock leaves the source first-expiring batch first and arrives at the
+destination under the same batch and expiry. All quantity changes are one UPDATE, new
+destination rows one INSERT, and the transfer log one bulk INSERT.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.db.models.inventory import Inventory
+from app.db.models.product import Product
+from app.db.models.warehouse import Warehouse
+from app.db.models.warehouse_transfer import WarehouseTransfer
+from app.services import stock_ledger
+from app.services.stock_service import InsufficientStockError, aggregate_demand, allocate, apply_deductions, lock_inventory
+
+
+class TransferLine(NamedTuple):
+    product_id: int
+    from_warehouse_id: int
+    to_warehouse_id: int
+    quantity: int
+
+
+def missing_references(db: Session, lines: Iterable[TransferLine]) -> Tuple[List[int], List[int]]:
+    """(unknown product ids, unknown warehouse ids) with one query per table."""
+    lines = list(lines)
+    product_ids = {line.product_id for line in lines}
+    warehouse_ids = {wh for line in lines for wh in (line.from_warehouse_id, line.to_warehouse_id)}
+    found_products = set(db.execute(select(Product.id).where(Product.id.in_(product_ids))).scalars())
+    found_warehouses = set(db.execute(select(Warehouse.id).where(Warehouse.id.in_(warehouse_ids))).scalars())
+    return sorted(product_ids - found_products), sorted(warehouse_ids - found_warehouses)
+
+
+def transfer_stock(db: Session, lines: List[TransferLine]) -> List[int]:
+    """
+    Move every line or nothing. Raises InsufficientStockError, leaving the database untouched,
+    when a source warehouse cannot cover its lines. Returns the WarehouseTransfer ids in line
+    order; the caller commits.
+    """
+    if not lines:
+        return []
+    pairs = {(l.product_id, warehouse_id) for l in lines for warehouse_id in (l.from_warehouse_id, l.to_warehouse_id)}
+    changes, new_rows = plan_transfer(lock_inventory(db, pairs), lines)
+
+    apply_deductions(db, {row_id: qty for row_id, qty in changes.items() if qty})
+    if new_rows:
+        db.execute(insert(Inventory), [
+            {"product_id": product_id, "warehouse_id": warehouse_id, "batch_no": batch_no,
+             "expiry_date": expiry_date, "quantity": quantity}
+            for (product_id, warehouse_id, batch_no, expiry_date), quantity in sorted(new_rows.items(), key=lambda kv: kv[0][:2])
+        ])
+
+    deltas: Dict[Tuple[int, int], int] = defaultdict(int)
+    for line in lines:
+        deltas[(line.product_id, line.from_warehouse_id)] -= line.quantity
+        deltas[(line.product_id, line.to_warehouse_id)] += line.quantity
+    stock_ledger.apply_stock_deltas(db, stock_ledger.PRODUCT, deltas)
+
+    result = db.execute(
+        insert(WarehouseTransfer).returning(WarehouseTransfer.id, sort_by_parameter_order=True),
+        [line._asdict() for line in lines],
+    )
+    return list(result.scalars())
+
+
+def plan_transfer(locked_rows, lines: List[TransferLine]) -> Tuple[Dict[int, int], Dict[tuple, int]]:
+    """
+    Work out a transfer against the locked source and destination rows without touching the
+    database: ({inventory_id: net quantity leaving the row}, {(product_id, warehouse_id,
+    batch_no, expiry_date): quantity for new destination rows}). Raises InsufficientStockError.
+    """
+    source_demand = aggregate_demand((l.product_id, l.from_warehouse_id, l.quantity) for l in lines)
+    deductions, shortages = allocate(locked_rows, source_demand)
+    if shortages:
+        raise InsufficientStockError(shortages)
+
+    # Net change per inventory row: positive = leaves the row
+    changes: Dict[int, int] = defaultdict(int)
+    for row_id, quantity in deductions.items():
+        changes[row_id] += quantity
+
+    # Send each allocated batch to its destinations, in line order, keeping batch and expiry
+    rows_by_id = {row.id: row for row in locked_rows}
+    destination_rows = {
+        (row.product_id, row.warehouse_id, row.batch_no, row.expiry_date): row.id for row in locked_rows
+    }
+    remaining = dict(deductions)
+    new_rows: Dict[Tuple[int, int, Optional[str], object], int] = defaultdict(int)
+    for line in lines:
+        needed = line.quantity
+        for row_id in sorted(remaining, key=lambda i: _fefo_key(rows_by_id[i])):
+            source = rows_by_id[row_id]
+            if needed <= 0:
+                break
+            if (source.product_id, source.warehouse_id) != (line.product_id, line.from_warehouse_id) or not remaining[row_id]:
+                continue
+            take = min(remaining[row_id], needed)
+            remaining[row_id] -= take
+            needed -= take
+            key = (line.product_id, line.to_warehouse_id, source.batch_no, source.expiry_date)
+            if key in destination_rows:
+                changes[destination_rows[key]] -= take
+            else:
+                new_rows[key] += take
+    return dict(changes), dict(new_rows)
+
+
+def _fefo_key(row):
+    return (row.expiry_date is None, row.expiry_date, row.id)
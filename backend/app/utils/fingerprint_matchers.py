@@ -0,0 +1,154 @@
+"""
+Fingerprint Matchers
+Template matchers and the shard scoring that runs on matching workers. This module only
+imports the standard library (the SDK is imported on the worker that uses it), so a
+spawned matching process starts without loading the app, its database or the SDK.
+
+Process workers keep the gallery resident: the parent publishes each gallery version
+once as a snapshot file of shards, and a worker loads it the first time a search names
+that version. A search then sends only the sample and a shard number.
+"""
+
+import logging
+import pickle
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (template_id, staff_id, template bytes)
+Entry = Tuple[int, int, bytes]
+
+
+class TemplateMatcher:
+    """
+    Matcher interface. score() returns a 0-100 similarity. process_safe matchers can be
+    pickled into worker processes; max_workers caps the worker threads a matcher may be
+    scored on, and init_worker() runs once on every worker thread or process before it scores.
+    """
+
+    process_safe = True
+    max_workers: Optional[int] = None
+
+    def init_worker(self) -> None:
+        pass
+
+    def score(self, sample: bytes, template: bytes) -> int:
+        raise NotImplementedError
+
+
+class SimulationMatcher(TemplateMatcher):
+    """Matcher used without the SDK: every template matches, like _compare_fingerprint in simulation."""
+
+    def score(self, sample: bytes, template: bytes) -> int:
+        return 95
+
+
+class DigitalPersonaMatcher(TemplateMatcher):
+    """
+    Scores with the SDK verification component; DigitalPersona only reports match / no match.
+    The COM object is apartment threaded, so it is created on the thread that calls Verify,
+    after that thread initialises COM, and the matcher is given a single worker thread.
+    """
+
+    process_safe = False
+    max_workers = 1
+    PROG_ID = "DPFPVerification.DPFPVerification"
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def init_worker(self) -> None:
+        import pythoncom
+        import win32com.client
+        pythoncom.CoInitialize()
+        self._local.verification = win32com.client.Dispatch(self.PROG_ID)
+
+    def score(self, sample: bytes, template: bytes) -> int:
+        verification = getattr(self._local, "verification", None)
+        if verification is None:
+            self.init_worker()
+            verification = self._local.verification
+        try:
+            return 95 if verification.Verify(sample, template) else 0
+        except Exception as e:
+            logger.error(f"Error comparing fingerprint: {e}")
+            return 0
+
+
+@dataclass(frozen=True)
+class ShardResult:
+    shard: int
+    candidates: int
+    scanned: int
+    template_id: Optional[int]
+    staff_id: Optional[int]
+    confidence: int
+    elapsed_ms: float
+
+
+def score_shard(
+    matcher: TemplateMatcher,
+    sample: bytes,
+    shard: int,
+    entries: Sequence[Entry],
+    threshold: int,
+    accept_confidence: int,
+    stop: Optional[threading.Event] = None,
+) -> ShardResult:
+    """Score one shard of entries; stop is shared between the threads of one search."""
+    started = time.perf_counter()
+    best_id = best_staff = None
+    best_confidence = 0
+    scanned = 0
+    for template_id, staff_id, data in entries:
+        if stop is not None and stop.is_set():
+            break
+        scanned += 1
+        confidence = matcher.score(sample, data)
+        if confidence >= threshold and confidence > best_confidence:
+            best_id, best_staff, best_confidence = template_id, staff_id, confidence
+            if confidence >= accept_confidence:
+                if stop is not None:
+                    stop.set()
+                break
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+    return ShardResult(shard, len(entries), scanned, best_id, best_staff, best_confidence, elapsed_ms)
+
+
+def write_snapshot(path: str, shards: List[Sequence[Entry]]) -> None:
+    with open(path, "wb") as f:
+        pickle.dump([list(shard) for shard in shards], f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+# --- process pool workers ----------------------------------------------------
+
+_worker_matcher: Optional[TemplateMatcher] = None
+_worker_snapshot: Tuple[Optional[str], List[Sequence[Entry]]] = (None, [])
+
+
+def init_process(matcher: TemplateMatcher) -> None:
+    """Process pool initializer: keep the matcher for every search this worker runs."""
+    global _worker_matcher
+    _worker_matcher = matcher
+    matcher.init_worker()
+
+
+def ping() -> None:
+    """No-op task that makes the pool start a worker ahead of the first search."""
+
+
+def score_resident_shard(snapshot: str, shard: int, sample: bytes, threshold: int,
+                         accept_confidence: int) -> ShardResult:
+    """
+    Process pool task: score one shard of this worker's copy of the gallery, loading the
+    snapshot file first when the gallery has moved to a new version since its last search.
+    """
+    global _worker_snapshot
+    if _worker_snapshot[0] != snapshot:
+        # Written by the parent into its private snapshot directory
+        with open(snapshot, "rb") as f:
+            _worker_snapshot = (snapshot, pickle.load(f))
+    return score_shard(_worker_matcher, sample, shard, _worker_snapshot[1][shard], threshold, accept_confidence)
@@ -0,0 +1,135 @@
+"""
+Keyset Pagination
+Shared limit/cursor handling for list endpoints. Pages are ordered by (sort key, id) and
+the cursor carries the last row's pair, so each page is an index range scan instead of
+an OFFSET over the whole table. The next cursor is returned in the X-Next-Cursor header,
+keeping list response bodies unchanged for existing clients.
+
+Paging is opt-in: a request without limit or cursor gets the whole (filtered) list, as
+before, so clients that do not follow X-Next-Cursor never lose rows. A cursor without a
+limit pages by DEFAULT_PAGE_SIZE.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+@dataclass
+class PageParams:
+    limit: Optional[int]  # None: no paging, every row
+    cursor: Optional[str]
+
+
+@dataclass
+class DateRange:
+    date_from: Optional[date]
+    date_to: Optional[date]
+
+
+def page_params(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit (with cursor) for the full list"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+) -> PageParams:
+    if cursor and limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    return PageParams(limit=limit, cursor=cursor)
+
+
+def date_range_params(
+    date_from: Optional[date] = Query(None, description="Inclusive start date (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Inclusive end date (YYYY-MM-DD)"),
+) -> DateRange:
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+    return DateRange(date_from=date_from, date_to=date_to)
+
+
+def apply_date_range(query, column, date_range: DateRange):
+    """Filter a Query or Select on an inclusive date range; DateTime columns include the whole end day."""
+    if date_range.date_from:
+        query = query.filter(column >= date_range.date_from)
+    if date_range.date_to:
+        if _python_type(column) is datetime:
+            query = query.filter(column < datetime.combine(date_range.date_to, datetime.max.time()))
+        else:
+            query = query.filter(column <= date_range.date_to)
+    return query
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    if isinstance(sort_value, (date, datetime)):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_column=None) -> Tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        if sort_column is not None and sort_value is not None:
+            python_type = _python_type(sort_column)
+            if python_type is datetime:
+                sort_value = datetime.fromisoformat(sort_value)
+            elif python_type is date:
+                sort_value = date.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def _python_type(column):
+    try:
+        return column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return None
+
+
+def keyset_page(query, params: PageParams, id_column, sort_column=None, descending: bool = True):
+    """
+    Order a Query or Select by (sort_column, id_column), skip past the cursor and fetch limit + 1
+    rows so the caller can tell whether another page exists (every row when paging was not
+    asked for). sort_column must be NOT NULL; pass None to page by id alone.
+    """
+    keys = (sort_column, id_column) if sort_column is not None else (id_column,)
+    if params.cursor:
+        sort_value, last_id = decode_cursor(params.cursor, sort_column)
+        if sort_column is not None:
+            position = tuple_(sort_column, id_column)
+            bound = tuple_(sort_value, last_id)
+        else:
+            position, bound = id_column, last_id
+        query = query.filter(position < bound if descending else position > bound)
+    query = query.order_by(*[key.desc() if descending else key.asc() for key in keys])
+    return query.limit(params.limit + 1) if params.limit is not None else query
+
+
+def split_page(rows: List[Any], params: PageParams, id_attr: str = "id", sort_attr: Optional[str] = None):
+    """Trim the look-ahead row and build the cursor of the last row kept; returns (rows, next_cursor)."""
+    if params.limit is None or len(rows) <= params.limit:
+        return rows, None
+    rows = rows[:params.limit]
+    last = rows[-1]
+    sort_value = getattr(last, sort_attr) if sort_attr else None
+    return rows, encode_cursor(sort_value, getattr(last, id_attr))
+
+
+def paginate(query, params: PageParams, id_column, sort_column=None, descending: bool = True):
+    """Run a keyset-paged ORM Query and return (rows, next_cursor)."""
+    rows = keyset_page(query, params, id_column, sort_column, descending).all()
+    return split_page(rows, params, id_column.key, sort_column.key if sort_column is not None else None)
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,39 @@
+"""
+SQL Statement Counter
+Counts the statements an engine executes inside a block, so tests can pin the number
+of queries a request issues and catch regressions back to per-row (N+1) loading.
+"""
+
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine):
+    """
+    Usage:
+        with count_queries(engine) as counter:
+            ...
+        assert counter.count <= 2, counter.statements
+    """
+    counter = QueryCounter()
+    target = getattr(engine, "sync_engine", engine)
+    event.listen(target, "before_cursor_execute", counter._before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(target, "before_cursor_execute", counter._before_cursor_execute)
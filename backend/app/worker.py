@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Job Worker
+Runs queued background jobs (reports, rollup rebuilds, payroll runs) off the request
+path. Starts JOB_WORKERS processes that each claim jobs from the jobs table until they
+receive SIGTERM or SIGINT; a job in progress is finished before the process exits.
+
+    python -m app.worker                 (JOB_WORKERS processes)
+    python -m app.worker --workers 4
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.worker")
+
+
+def _run_worker(index: int) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    from app.services import job_queue
+    import app.services.job_handlers  # noqa: F401  registers the job kinds
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    logger.info("Job worker %s started (%s)", worker_id, ", ".join(sorted(job_queue.HANDLERS)))
+    job_queue.work(worker_id, stop)
+    logger.info("Job worker %s stopped", worker_id)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run background jobs from the jobs table")
+    parser.add_argument("--workers", type=int, default=settings.JOB_WORKERS, help="worker processes (default JOB_WORKERS)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if os.getenv("SKIP_DATABASE", "false").lower() == "true":
+        logger.error("SKIP_DATABASE is set; there is no job queue to work on")
+        return 2
+    if args.workers <= 1:
+        _run_worker(0)
+        return 0
+
+    # Spawned, not forked, so no process inherits another's database connections
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_run_worker, args=(index,), name=f"job-worker-{index}")
+                 for index in range(args.workers)]
+    for process in processes:
+        process.start()
+
+    def shutdown(*_):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    for process in processes:
+        process.join()
+    return 0 if all(process.exitcode == 0 for process in processes) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
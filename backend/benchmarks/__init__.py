@@ -0,0 +1 @@
+"""Load-testing benchmarks for the hot API endpoints; see benchmarks/README.md."""
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Benchmark Runner
+Drives the hot endpoints of a running server under concurrency and records p50/p95/p99
+latency and throughput per scenario into a JSON file. Given a baseline from an earlier
+run, it prints the change per scenario and exits non-zero when p95 latency or throughput
+regresses by more than the tolerance.
+
+    python -m benchmarks.run --base-url http://localhost:8000 --out benchmarks/results/latest.json \\
+        --baseline benchmarks/results/baseline.json
+
+Seed the server's database with benchmarks.seed first so the numbers reflect real volumes.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.seed import BENCH_PASSWORD, BENCH_ROLE, BENCH_USERNAME, volumes
+
+API = "/api/v1"
+
+
+class Scenario:
+    def __init__(self, name: str, method: str, path: str, body: Optional[Callable[[random.Random], dict]] = None,
+                 params: Optional[Callable[[], dict]] = None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.params = params
+
+
+def _invoice(rng: random.Random, products: int, warehouses: int) -> dict:
+    items = [{"product_id": rng.randint(1, products), "quantity": 1, "price": 100.0} for _ in range(2)]
+    return {
+        "invoice_number": f"BENCH-RUN-{uuid.uuid4().hex[:16]}",
+        "customer_name": f"Bench customer {rng.randint(1, 1000)}",
+        "date": date.today().isoformat(),
+        "total_amount": sum(i["quantity"] * i["price"] for i in items),
+        "status": "unpaid",
+        "warehouse_id": rng.randint(1, warehouses),
+        "items": items,
+    }
+
+
+def scenarios(scale: float) -> Dict[str, Scenario]:
+    sizes = volumes(scale)
+    week_ago = (date.today() - timedelta(days=7)).isoformat()
+    return {s.name: s for s in [
+        Scenario("login", "POST", f"{API}/auth/login",
+                 body=lambda rng: {"username": BENCH_USERNAME, "password": BENCH_PASSWORD, "role": BENCH_ROLE}),
+        Scenario("create_invoice", "POST", f"{API}/invoices/",
+                 body=lambda rng: _invoice(rng, sizes["products"], sizes["warehouses"])),
+        Scenario("stock_level", "GET", f"{API}/inventory/stock-level"),
+        Scenario("sales_report", "GET", f"{API}/reports/sales",
+                 params=lambda: {"start_date": week_ago, "end_date": date.today().isoformat()}),
+        Scenario("attendance", "GET", f"{API}/attendance/attendance-with-names", params=lambda: {"limit": 100}),
+        Scenario("fingerprint_verify", "POST", f"{API}/fingerprint/verify", body=lambda rng: {"action": "IN"}),
+    ]}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+async def _login(client: httpx.AsyncClient) -> str:
+    response = await client.post(f"{API}/auth/login", json={
+        "username": BENCH_USERNAME, "password": BENCH_PASSWORD, "role": BENCH_ROLE,
+    })
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int,
+                       warmup: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for index in range(warmup + requests):
+        queue.put_nowait(index)
+
+    async def worker():
+        while True:
+            try:
+                index = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            kwargs = {}
+            if scenario.body:
+                kwargs["json"] = scenario.body(rng)
+            if scenario.params:
+                kwargs["params"] = scenario.params()
+            started = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, scenario.path, **kwargs)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            if index >= warmup:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(base_url: str, names: List[str], requests: int, concurrency: int, warmup: int, scale: float) -> dict:
+    available = scenarios(scale)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        client.headers["Authorization"] = f"Bearer {await _login(client)}"
+        results = {}
+        for number, name in enumerate(names):
+            print(f"▶ {name}: {requests} requests, concurrency {concurrency}")
+            results[name] = await run_scenario(client, available[name], requests, concurrency, warmup, seed=number)
+    return {
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "git_commit": _git_commit(),
+        "base_url": base_url,
+        "concurrency": concurrency,
+        "requests_per_scenario": requests,
+        "scale": scale,
+        "scenarios": results,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> List[str]:
+    """Print the change per scenario; return the names of scenarios that regressed."""
+    regressions = []
+    print(f"\n{'scenario':<20}{'p95 ms':>22}{'p99 ms':>22}{'req/s':>22}")
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            print(f"{name:<20}{'(new)':>22}")
+            continue
+
+        def cell(key):
+            old, new = before[key], result[key]
+            change = (new - old) / old * 100 if old else 0.0
+            return f"{old:>8.1f} → {new:>8.1f} {change:+5.0f}%"
+
+        slower = before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + tolerance)
+        fewer = before["throughput_rps"] and result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance)
+        flag = "  ❌" if slower or fewer else ""
+        print(f"{name:<20}{cell('p95_ms'):>22}{cell('p99_ms'):>22}{cell('throughput_rps'):>22}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the hot endpoints and compare against a baseline")
+    parser.add_argument("--base-url", default=os.environ.get("BENCH_BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--scenario", action="append", dest="scenarios",
+                        help=f"run only these scenarios (repeatable); default: all of {', '.join(scenarios(1))}")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    parser.add_argument("--scale", type=float, default=1.0, help="the --scale the database was seeded with")
+    parser.add_argument("--out", default="benchmarks/results/latest.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p95/throughput change (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    names = args.scenarios or list(scenarios(args.scale))
+    unknown = [name for name in names if name not in scenarios(args.scale)]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    result = asyncio.run(run(args.base_url, names, args.requests, args.concurrency, args.warmup, args.scale))
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=2)
+    for name, stats in result["scenarios"].items():
+        print(f"{name:<20} p50 {stats['p50_ms']:>8.1f} ms  p95 {stats['p95_ms']:>8.1f} ms  "
+              f"p99 {stats['p99_ms']:>8.1f} ms  {stats['throughput_rps']:>8.1f} req/s  errors {stats['errors']}")
+    print(f"Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), result, args.tolerance)
+        if regressions:
+            print(f"\n❌ Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"\n✅ No regression beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,5 +17,17 @@ cmd = [
     '--log-level', 'info'
 ]
 
+# Background jobs run in their own processes next to the web server unless a separate
+# worker service runs them (RUN_JOB_WORKER=false)
+worker = None
+if os.environ.get('RUN_JOB_WORKER', 'true').lower() == 'true' and os.environ.get('SKIP_DATABASE', 'false').lower() != 'true':
+    print("🧵 Starting background job worker")
+    worker = subprocess.Popen([sys.executable, '-m', 'app.worker'])
+
 print(f"🔧 Command: {' '.join(cmd)}")
-subprocess.run(cmd)
+try:
+    subprocess.run(cmd)
+finally:
+    if worker:
+        worker.terminate()
+        worker.wait()
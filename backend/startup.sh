@@ -55,9 +55,10 @@ done
 echo "🔧 Fixing alembic_version column if needed..."
 python fix_alembic_version_column.py || echo "⚠️  Alembic version column fix completed (table may not exist yet)"
 
-# Run database migrations with better error handling
+# Run database migrations once, before the app starts (the release step holds an advisory
+# lock, so replicas starting together migrate once; the app then only checks the version)
 echo "📊 Running database migrations..."
-if python -m alembic upgrade head; then
+if python -m app.release; then
     echo "✅ Migrations completed successfully"
 else
     echo "❌ Migration failed - checking if we need to create initial schema"
@@ -67,7 +68,7 @@ else
     python -m alembic stamp head || echo "⚠️  Could not stamp head, will try migration again"
     
     # Try migrations one more time
-    if python -m alembic upgrade head; then
+    if python -m app.release; then
         echo "✅ Migrations completed on second attempt"
     else
         echo "❌ Migrations failed - starting app anyway (may work if database is already set up)"
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Warehouse access tests: a non-admin may only write to granted warehouses, whichever way
+the request names them (JSON body with or without a Content-Type header, query string).
+Runs through the FastAPI app with the principal stubbed; no database needed:
+
+    python test_access_control.py      (or: pytest test_access_control.py)
+"""
+import os
+
+os.environ.setdefault("SKIP_DATABASE", "true")
+
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints.auth import get_current_user
+from app.db.session import get_async_db, get_db
+from app.main import app
+from app.services.access_control import warehouse_mask
+from app.services.auth_service import Principal
+
+CLERK = Principal(id=7, username="clerk", role="staff", status="approved", warehouse_mask=warehouse_mask([1]))
+
+
+def make_client():
+    app.dependency_overrides[get_current_user] = lambda: CLERK
+    # Every request below must be refused before the session is used
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[get_async_db] = lambda: None
+    return TestClient(app)
+
+
+def test_body_warehouse_is_checked_with_or_without_content_type():
+    client = make_client()
+    try:
+        invoice = b'{"invoice_number": "A1", "customer_name": "Walk-in", "date": "2024-01-01", "total_amount": 10, ' \
+                  b'"status": "Pending", "warehouse_id": 2, "items": [{"product_id": 1, "quantity": 1, "price": 10}]}'
+        intake = b'{"product_id": 1, "warehouse_id": 2, "quantity": 5, "status": "Green"}'
+        stock_intake = b'{"productId": 1, "quantity": 5, "intakeDate": "2024-01-01", "staffId": 1, "warehouseId": 2}'
+        for path, body in [("/api/v1/invoices/", invoice), ("/api/v1/inventory/intake", intake),
+                           ("/api/v1/product-stock-intake/", stock_intake)]:
+            for headers in ({"Content-Type": "application/json"}, {}):
+                response = client.post(path, content=body, headers=headers)
+                assert response.status_code == 403, (path, headers, response.status_code, response.text)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_query_warehouses_are_required_and_checked():
+    client = make_client()
+    try:
+        url = "/api/v1/transfer?product_id=1&quantity=1"
+        assert client.post(f"{url}&source_warehouse_id=1&dest_warehouse_id=2").status_code == 403
+        # A missing warehouse is refused, not skipped
+        assert client.post(f"{url}&source_warehouse_id=1").status_code == 400
+        assert client.post(f"{url}&source_warehouse_id=1&dest_warehouse_id=-1").status_code == 400
+    finally:
+        app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    tests = [
+        test_body_warehouse_is_checked_with_or_without_content_type,
+        test_query_warehouses_are_required_and_checked,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Attendance sync tests: terminal batches need an authenticated caller, and events outside
+the replay window (too old, or in the future) are rejected before anything is merged.
+Runs against an in-memory SQLite database; the merge itself needs PostgreSQL:
+
+    python test_attendance_sync.py      (or: pytest test_attendance_sync.py)
+"""
+import os
+from datetime import date, datetime, timedelta
+
+os.environ.setdefault("SKIP_DATABASE", "true")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models.attendance import AttendanceEvent, AttendanceRecord
+from app.db.models.staff import Staff
+from app.db.models.user import User
+from app.main import app
+from app.schemas.attendance import AttendanceEventBatch
+from app.services.attendance_sync import REJECTED, ingest_events
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, Staff.__table__, AttendanceRecord.__table__,
+                                             AttendanceEvent.__table__])
+    db = Session(engine)
+    db.add(Staff(name="Ada", staff_id="S1", date_of_birth=date(1990, 1, 1), age=30, gender="F", marital_status="",
+                 phone_number="0", next_of_kin_name="", next_of_kin_phone="", bank_name="", account_number=""))
+    db.commit()
+    return db
+
+
+def test_events_outside_the_replay_window_are_rejected():
+    db = make_session()
+    now = datetime.now()
+    window = timedelta(hours=settings.ATTENDANCE_REPLAY_WINDOW_HOURS)
+    batch = AttendanceEventBatch(device_id="gate-1", events=[
+        {"staff_id": 1, "action": "IN", "occurred_at": now - window - timedelta(hours=1)},
+        {"staff_id": 1, "action": "OUT", "occurred_at": now + timedelta(hours=1)},
+        {"staff_id": 99, "action": "IN", "occurred_at": now},
+    ])
+    result = ingest_events(db, batch)
+    assert result.rejected == 3 and result.accepted == 0
+    assert [o.error for o in result.outcomes] == [
+        "Event is older than the replay window", "Event time is in the future", "User/Staff not found"]
+    assert all(o.status == REJECTED for o in result.outcomes)
+    assert db.query(AttendanceRecord).count() == 0
+
+
+def test_batch_requires_an_authenticated_caller():
+    client = TestClient(app)
+    body = {"events": [{"staff_id": 1, "action": "IN", "occurred_at": datetime.now().isoformat()}]}
+    assert client.post("/api/v1/attendance/events/batch", json=body).status_code == 401
+
+
+if __name__ == "__main__":
+    tests = [
+        test_events_outside_the_replay_window_are_rejected,
+        test_batch_requires_an_authenticated_caller,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    raise SystemExit(1 if failed else 0)
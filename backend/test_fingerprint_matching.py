@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Fingerprint matching tests: process workers keep the gallery resident and reload it only
+when its version changes, and matchers bound to one thread (the SDK's COM object) are
+scored on a single worker thread they initialised. No reader, SDK or database needed:
+
+    python test_fingerprint_matching.py      (or: pytest test_fingerprint_matching.py)
+"""
+import asyncio
+import base64
+import os
+import threading
+from types import SimpleNamespace
+
+os.environ.setdefault("SKIP_DATABASE", "true")
+
+from app.services.fingerprint_gallery import FingerprintGallery
+from app.services.fingerprint_matching import MatchingExecutor
+from app.utils.fingerprint_matchers import TemplateMatcher
+
+
+class ExactMatcher(TemplateMatcher):
+    """Matches a sample to the identical template; module level so workers can unpickle it."""
+
+    def score(self, sample: bytes, template: bytes) -> int:
+        return 100 if sample == template else 0
+
+
+class ThreadBoundMatcher(TemplateMatcher):
+    """Like the SDK matcher: refuses to score on a thread it did not initialise."""
+
+    process_safe = False
+    max_workers = 1
+
+    def __init__(self):
+        self.local = threading.local()
+        self.threads = set()
+
+    def init_worker(self) -> None:
+        self.local.ready = True
+        self.threads.add(threading.current_thread().name)
+
+    def score(self, sample: bytes, template: bytes) -> int:
+        assert getattr(self.local, "ready", False), "scored on an uninitialised thread"
+        return 100 if sample == template else 0
+
+
+def template(template_id: int, data: bytes):
+    return SimpleNamespace(id=template_id, staff_id=template_id * 10, finger_position=1, quality_score=80,
+                           is_active=True, template_data=base64.b64encode(data).decode())
+
+
+def make_gallery(matcher: TemplateMatcher, count: int) -> FingerprintGallery:
+    gallery = FingerprintGallery(matcher)
+    for i in range(1, count + 1):
+        gallery.upsert(template(i, b"finger-%d" % i))
+    return gallery
+
+
+def test_process_workers_search_a_resident_gallery():
+    gallery = make_gallery(ExactMatcher(), 40)
+    executor = MatchingExecutor(workers=2, shard_size=10, pool="process", threshold=70, accept_confidence=90)
+    try:
+        outcome = asyncio.run(executor.identify(gallery, b"finger-33"))
+        assert outcome.match.template_id == 33 and outcome.match.staff_id == 330, outcome
+        first = executor.publish(gallery.version, [])
+        assert first.shards == 2 and first.candidates == 40
+        # Unchanged gallery: the same snapshot is searched again, nothing is republished
+        version = gallery.version
+        gallery.upsert(template(5, b"finger-5"))
+        assert gallery.version == version
+        assert asyncio.run(executor.identify(gallery, b"finger-2")).match.template_id == 2
+        assert executor.publish(gallery.version, []) is first
+        # A new enrolment is a new version that the workers load before searching
+        gallery.upsert(template(41, b"finger-41"))
+        assert asyncio.run(executor.identify(gallery, b"finger-41")).match.template_id == 41
+        assert executor.publish(gallery.version, []).path != first.path
+        gallery.remove(41)
+        assert asyncio.run(executor.identify(gallery, b"finger-41")).match is None
+    finally:
+        executor.shutdown()
+
+
+def test_thread_bound_matcher_runs_on_one_initialised_thread():
+    matcher = ThreadBoundMatcher()
+    gallery = make_gallery(matcher, 40)
+    executor = MatchingExecutor(workers=4, shard_size=5, pool="process", threshold=70, accept_confidence=90)
+    try:
+        assert not executor.uses_processes(matcher)
+        outcome = asyncio.run(executor.identify(gallery, b"finger-17"))
+        assert outcome.match.template_id == 17 and len(outcome.shards) == 1
+        assert asyncio.run(executor.identify(gallery, b"finger-40")).match.template_id == 40
+        assert len(matcher.threads) == 1, matcher.threads
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    tests = [
+        test_process_workers_search_a_resident_gallery,
+        test_thread_bound_matcher_runs_on_one_initialised_thread,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Invoice import tests: CSV/NDJSON parsing, per-invoice validation and rejection reporting,
+duplicate invoice_number handling and date-order stock acceptance. Runs against an
+in-memory SQLite database; the set-based write path itself needs PostgreSQL:
+
+    python test_invoice_import.py      (or: pytest test_invoice_import.py)
+"""
+import os
+from collections import namedtuple
+from datetime import date, datetime
+
+os.environ.setdefault("SKIP_DATABASE", "true")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.cache import reference_cache
+from app.db.base import Base
+from app.db.models.customer import Customer
+from app.db.models.inventory import Inventory
+from app.db.models.invoice import Invoice, InvoiceItem
+from app.db.models.product import Product
+from app.db.models.raw_material import RawMaterial
+from app.db.models.warehouse import Warehouse
+from app.schemas.invoices import InvoiceCreate
+from app.services import invoice_import
+from app.services.invoice_import import (
+    FORMAT_CSV,
+    FORMAT_NDJSON,
+    ImportFormatError,
+    ImportReport,
+    import_invoices,
+    parse_csv,
+    parse_ndjson,
+)
+from app.services.stock_service import aggregate_demand
+
+CSV_HEADER = "invoice_number,customer_name,date,warehouse_id,product_id,quantity,price\n"
+
+Row = namedtuple("Row", "id product_id warehouse_id quantity")
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        Product.__table__, RawMaterial.__table__, Warehouse.__table__, Customer.__table__,
+        Inventory.__table__, Invoice.__table__, InvoiceItem.__table__,
+    ])
+    db = Session(engine)
+    db.add_all([
+        Product(name=f"Product {i}", product_id=f"P{i}", description="", unit_of_measure="pcs",
+                unit_price=10.0, reorder_point=5, opening_stock_quantity=0, average_production_time=0)
+        for i in range(2)
+    ])
+    db.add(Warehouse(name="Main", location="", manager_phone="0"))
+    db.add(Invoice(invoice_number="INV-OLD", customer_name="Walk-in", total_amount=10.0, date=datetime(2024, 1, 1)))
+    db.commit()
+    reference_cache.clear()
+    return db
+
+
+def invoice(number: str, day: int, quantity: int = 1, product_id: int = 1) -> InvoiceCreate:
+    return InvoiceCreate(invoice_number=number, customer_name="Walk-in", date=date(2024, 1, day), total_amount=10.0,
+                         status="Pending", warehouse_id=1, items=[{"product_id": product_id, "quantity": quantity, "price": 10.0}])
+
+
+def test_parsers_group_items_and_report_bad_lines():
+    csv_rows = list(parse_csv(CSV_HEADER + "A,Walk-in,2024-01-02,1,1,2,10\nB,Walk-in,2024-01-01,1,2,1,5\nA,Walk-in,2024-01-02,1,2,3,5\n"))
+    assert [(line, raw["invoice_number"], len(raw["items"])) for line, raw in csv_rows] == [(2, "A", 2), (3, "B", 1)]
+    try:
+        list(parse_csv("invoice_number,customer_name\nA,Walk-in\n"))
+        assert False, "a CSV without item columns must be refused as a whole"
+    except ImportFormatError as e:
+        assert "product_id" in str(e)
+
+    ndjson_rows = list(parse_ndjson('{"invoice_number": "A"}\n\n{not json\n'))
+    assert [line for line, _ in ndjson_rows] == [1, 3]
+    assert ndjson_rows[1][1]["__error__"].startswith("Invalid JSON")
+
+
+def test_validation_rejects_each_bad_invoice_with_its_reasons():
+    validate = invoice_import._validate
+    good = {"invoice_number": "A", "customer_name": "Walk-in", "date": "2024-01-02", "warehouse_id": 1,
+            "items": [{"product_id": 1, "quantity": 2, "price": 10}]}
+    parsed, errors = validate(good, frozenset({1}), frozenset({1}), None)
+    assert errors == [] and parsed.total_amount == 20 and parsed.status
+
+    _, errors = validate({**good, "warehouse_id": 9, "items": [{"product_id": 7, "quantity": 0, "price": 1}]},
+                         frozenset({1}), frozenset({1}), None)
+    assert errors == ["Item quantities must be greater than zero", "Unknown product ID 7", "Warehouse not found"], errors
+    _, errors = validate({**good, "date": "yesterday"}, frozenset({1}), frozenset({1}), None)
+    assert errors and errors[0].startswith("date:"), errors
+    assert validate(["not", "an", "object"], frozenset(), frozenset(), None)[1] == ["Each line must be a JSON object"]
+
+    report = ImportReport()
+    for number in range(invoice_import.MAX_ERRORS + 5):
+        report.reject(str(number), number, ["bad"])
+    assert report.rejected == invoice_import.MAX_ERRORS + 5 and len(report.errors) == invoice_import.MAX_ERRORS
+    assert report.as_dict()["invoices_per_second"] == 0.0
+
+
+def test_stock_goes_to_the_oldest_invoices_first():
+    pending = [(2, invoice("LATE", 20, quantity=4)), (3, invoice("EARLY", 5, quantity=4)), (4, invoice("MID", 10, quantity=2))]
+    demand = {inv.invoice_number: aggregate_demand((i.product_id, inv.warehouse_id, i.quantity) for i in inv.items)
+              for _, inv in pending}
+    locked = [Row(1, 1, 1, 5), Row(2, 1, 1, 2)]
+    report = ImportReport()
+    accepted = invoice_import._accept_in_date_order(pending, demand, locked, report)
+    # 7 in stock: EARLY (4) and MID (2) fit in date order, LATE (4) no longer does
+    assert [inv.invoice_number for _, inv in accepted] == ["EARLY", "MID"]
+    assert report.rejected == 1 and report.errors[0]["invoice_number"] == "LATE" and report.errors[0]["line"] == 2
+    assert "Product ID 1" in report.errors[0]["errors"][0]
+
+
+def test_import_reports_duplicates_and_rejections_per_invoice():
+    db = make_session()
+    content = "\n".join([
+        '{"invoice_number": "INV-OLD", "customer_name": "Walk-in", "date": "2024-01-03", "warehouse_id": 1, "items": [{"product_id": 1, "quantity": 1, "price": 10}]}',
+        '{"invoice_number": "NEW-1", "customer_name": "Walk-in", "date": "2024-01-03", "warehouse_id": 1, "items": [{"product_id": 1, "quantity": 1, "price": 10}]}',
+        '{"invoice_number": "NEW-1", "customer_name": "Walk-in", "date": "2024-01-04", "warehouse_id": 1, "items": [{"product_id": 2, "quantity": 1, "price": 10}]}',
+        '{"invoice_number": "BAD", "customer_name": "Walk-in", "date": "2024-01-03", "warehouse_id": 1, "items": [{"product_id": 99, "quantity": 1, "price": 10}]}',
+    ])
+    report = import_invoices(db, content, FORMAT_NDJSON)
+    assert report.received == 4 and report.imported == 0
+    # Already in the database: skipped, not an error
+    assert report.duplicates == 1
+    by_number = {(e["invoice_number"], e["line"]): e["errors"] for e in report.errors}
+    assert by_number[("NEW-1", 3)] == ["Duplicate invoice_number in upload"]
+    assert by_number[("BAD", 4)] == ["Unknown product ID 99"]
+    # No stock anywhere, so the one new invoice is refused rather than oversold
+    assert by_number[("NEW-1", 2)][0].startswith("Insufficient product")
+    assert report.rejected == 3
+    assert db.query(Invoice).count() == 1
+
+    report = import_invoices(db, CSV_HEADER + "C,Walk-in,2024-01-05,1,1,1,10\n", FORMAT_CSV)
+    assert report.received == 1 and report.rejected == 1
+
+
+if __name__ == "__main__":
+    tests = [
+        test_parsers_group_items_and_report_bad_lines,
+        test_validation_rejects_each_bad_invoice_with_its_reasons,
+        test_stock_goes_to_the_oldest_invoices_first,
+        test_import_reports_duplicates_and_rejections_per_invoice,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Invoice PDF tests: content-addressed caching, re-rendering on change, the process pool
+and the streamed ZIP export. Runs against an in-memory SQLite database and a scratch
+directory; no server or PostgreSQL needed:
+
+    python test_invoice_pdfs.py      (or: pytest test_invoice_pdfs.py)
+"""
+import io
+import os
+import tempfile
+import zipfile
+from datetime import date, datetime
+
+os.environ.setdefault("SKIP_DATABASE", "true")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.db.models.invoice import Invoice, InvoiceItem
+from app.db.models.product import Product
+from app.services import invoice_pdf
+from app.utils.pagination import DateRange
+
+INVOICES = 12
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Product.__table__, Invoice.__table__, InvoiceItem.__table__])
+    db = Session(engine)
+    products = [
+        Product(name=f"Product {i}", product_id=f"P{i}", description="", unit_of_measure="pcs",
+                unit_price=10.0, reorder_point=5, opening_stock_quantity=0, average_production_time=0)
+        for i in range(3)
+    ]
+    db.add_all(products)
+    db.flush()
+    for i in range(INVOICES):
+        invoice = Invoice(invoice_number=f"INV/{i}", customer_name=f"Customer {i}", total_amount=32.25,
+                          date=datetime(2024, 1, 1 + i % 3, 9, i))
+        invoice.items = [InvoiceItem(product_id=products[j].id, quantity=j + 1, price=5.0) for j in range(3)]
+        db.add(invoice)
+    db.commit()
+    return db
+
+
+def test_render_is_cached_until_the_invoice_changes():
+    db = make_session()
+    with tempfile.TemporaryDirectory() as directory:
+        renderer = invoice_pdf.InvoicePdfRenderer(directory, workers=1)
+        doc = invoice_pdf.get_document(db, 1)
+        assert doc.items == (("Product 0", 1, 5.0), ("Product 1", 2, 5.0), ("Product 2", 3, 5.0))
+        path = renderer.render(doc)
+        with open(path, "rb") as f:
+            assert f.read(5) == b"%PDF-"
+        modified = os.path.getmtime(path)
+        assert renderer.render(invoice_pdf.get_document(db, 1)) == path and os.path.getmtime(path) == modified
+        db.query(Invoice).filter(Invoice.id == 1).update({"status": "paid"})
+        db.commit()
+        assert renderer.render(invoice_pdf.get_document(db, 1)) != path
+
+
+def test_zip_export_streams_every_invoice_in_range():
+    db = make_session()
+    with tempfile.TemporaryDirectory() as directory:
+        renderer = invoice_pdf.InvoicePdfRenderer(directory, workers=2)
+        try:
+            chunks = list(invoice_pdf.stream_zip(db, DateRange(date(2024, 1, 1), date(2024, 1, 2)), renderer))
+        finally:
+            renderer.shutdown()
+        # One chunk per file plus the central directory, not the whole archive at once
+        assert len(chunks) == INVOICES * 2 // 3 + 1
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+        names = archive.namelist()
+        assert len(names) == INVOICES * 2 // 3 and "invoice_INV_0.pdf" in names and "invoice_INV_2.pdf" not in names
+        assert all(archive.read(name).startswith(b"%PDF-") for name in names)
+
+
+if __name__ == "__main__":
+    tests = [
+        test_render_is_cached_until_the_invoice_changes,
+        test_zip_export_streams_every_invoice_in_range,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Job queue tests: claiming order, retries with backoff, progress, results, lease expiry
+and heartbeats, payload validation, and payroll runs queued together with their job. Runs against an in-memory SQLite database; no worker process or PostgreSQL needed:
+
+    python test_job_queue.py      (or: pytest test_job_queue.py)
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("SKIP_DATABASE", "true")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.db.models.job import Job
+from app.db.models.payroll import PayrollRun
+from app.db.models.user import User
+from app.schemas.payroll import PayrollRunCreate
+from app.services import job_handlers, job_queue, payroll_service
+
+ran = []
+
+
+@job_queue.job_handler("test_echo")
+def _echo(db, payload, job):
+    job.progress(1, 2, "halfway")
+    ran.append(payload["n"])
+    return {"n": payload["n"], "at": datetime(2024, 1, 1)}
+
+
+@job_queue.job_handler("test_slow")
+def _slow(db, payload, job):
+    # Never reports progress; only the worker's heartbeat keeps the lease alive
+    time.sleep(payload["seconds"])
+    row = db.get(Job, job.id)
+    ran.append(row.locked_at > row.started_at)
+
+
+@job_queue.job_handler("test_broken", max_attempts=2)
+def _broken(db, payload, job):
+    raise RuntimeError("report query timed out")
+
+
+def make_sessions():
+    # Shared by the worker and its heartbeat thread
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[User.__table__, Job.__table__, PayrollRun.__table__])
+    return sessionmaker(bind=engine)
+
+
+def test_claims_by_priority_and_stores_results():
+    factory = make_sessions()
+    db = factory()
+    ran.clear()
+    low = job_queue.enqueue(db, "test_echo", {"n": 1})
+    high = job_queue.enqueue(db, "test_echo", {"n": 2}, priority=5)
+    later = job_queue.enqueue(db, "test_echo", {"n": 3}, priority=9, delay=3600)
+    while job_queue.run_one("w1", factory):
+        pass
+    assert ran == [2, 1], ran
+    db.expire_all()
+    done = job_queue.get_job(db, high.id)
+    assert done.status == job_queue.SUCCEEDED and done.attempts == 1
+    assert done.result == {"n": 2, "at": "2024-01-01 00:00:00"}
+    assert (done.progress_current, done.progress_total, done.progress_message) == (1, 2, "halfway")
+    assert job_queue.get_job(db, low.id).status == job_queue.SUCCEEDED
+    assert job_queue.get_job(db, later.id).status == job_queue.QUEUED
+
+
+def test_retries_with_backoff_then_fails():
+    factory = make_sessions()
+    db = factory()
+    job = job_queue.enqueue(db, "test_broken")
+    assert job.max_attempts == 2
+    before = datetime.utcnow()
+    assert job_queue.run_one("w1", factory)
+    db.expire_all()
+    job = job_queue.get_job(db, job.id)
+    assert job.status == job_queue.QUEUED and job.attempts == 1 and "timed out" in job.error
+    assert job.run_at.replace(tzinfo=None) >= before + timedelta(seconds=job_queue.settings.JOB_RETRY_BACKOFF_SECONDS - 1)
+    # Not due again until the backoff has passed
+    assert not job_queue.run_one("w1", factory)
+    job.run_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert job_queue.run_one("w1", factory)
+    db.expire_all()
+    job = job_queue.get_job(db, job.id)
+    assert job.status == job_queue.FAILED and job.attempts == 2 and job.finished_at is not None
+
+
+def test_expired_lease_is_requeued_and_fenced():
+    factory = make_sessions()
+    db = factory()
+    job = job_queue.enqueue(db, "test_echo", {"n": 4})
+    claimed = job_queue.claim(db, "dead-worker")
+    assert claimed.id == job.id and claimed.attempts == 1
+    assert job_queue.requeue_stale(db) == 0
+    job = job_queue.get_job(db, job.id)
+    job.locked_at = datetime.utcnow() - timedelta(seconds=job_queue.settings.JOB_LEASE_SECONDS + 60)
+    db.commit()
+    assert job_queue.requeue_stale(db) == 1
+    db.expire_all()
+    assert job_queue.get_job(db, job.id).status == job_queue.QUEUED
+    # The worker that lost the lease can no longer finish the job
+    assert not job_queue.complete(db, claimed, "dead-worker", {"n": 4})
+    db.rollback()
+    ran.clear()
+    assert job_queue.run_one("w2", factory) and ran == [4]
+
+
+def test_worker_heartbeat_renews_the_lease_of_a_silent_handler():
+    factory = make_sessions()
+    db = factory()
+    job = job_queue.enqueue(db, "test_slow", {"seconds": 0.3})
+    interval = job_queue.settings.JOB_HEARTBEAT_SECONDS
+    job_queue.settings.JOB_HEARTBEAT_SECONDS = 0.05
+    try:
+        ran.clear()
+        assert job_queue.run_one("w1", factory)
+    finally:
+        job_queue.settings.JOB_HEARTBEAT_SECONDS = interval
+    assert ran == [True], ran
+    db.expire_all()
+    job = job_queue.get_job(db, job.id)
+    assert job.status == job_queue.SUCCEEDED and job.progress_current is None
+    # A worker that no longer holds the lease cannot renew it
+    assert not job_queue.renew_lease(db, job.id, "w1")
+
+
+def test_submitted_payloads_are_validated_per_kind():
+    handlers = job_queue.HANDLERS
+    payload = job_queue.validate_payload(handlers["sales_report"], {"start_date": "2024-01-01", "end_date": "2024-01-31"})
+    assert payload == {"start_date": "2024-01-01", "end_date": "2024-01-31"}
+    assert job_queue.validate_payload(handlers["staff_performance_report"], {}) == {"start_date": None, "end_date": None}
+    assert job_queue.validate_payload(handlers["rebuild_rollups"], {}) == {}
+    for kind, bad in [
+        ("sales_report", {"start_date": "2024-01-01"}),
+        ("sales_report", {"start_date": "2024-02-01", "end_date": "2024-01-01"}),
+        ("invoice_pdfs", {"date_from": "yesterday", "date_to": "2024-01-01"}),
+        ("rebuild_rollups", {"force": True}),
+    ]:
+        try:
+            job_queue.validate_payload(handlers[kind], bad)
+            assert False, f"{kind} accepted {bad}"
+        except job_queue.InvalidJobPayload as e:
+            assert str(e), kind
+    assert handlers["payroll_run"].payload_model is job_handlers.PayrollRunPayload
+
+
+def test_payroll_run_is_queued_with_its_job_once_per_period():
+    factory = make_sessions()
+    db = factory()
+    run = payroll_service.generate_payroll(PayrollRunCreate(period="2024-03"), db)
+    job = job_queue.get_job(db, run.job_id)
+    assert job.kind == "payroll_run" and job.payload == {"run_id": run.id} and job.max_attempts == 1
+    try:
+        payroll_service.generate_payroll(PayrollRunCreate(period="2024-03"), db)
+        assert False, "a second active run for the period must be refused"
+    except payroll_service.PayrollRunInProgress:
+        pass
+    assert db.query(PayrollRun).count() == 1 and db.query(Job).count() == 1
+    assert payroll_service.generate_payroll(PayrollRunCreate(period="2024-04"), db).job_id != job.id
+
+
+def test_abandoned_payroll_run_no_longer_blocks_its_period():
+    factory = make_sessions()
+    db = factory()
+    run = payroll_service.generate_payroll(PayrollRunCreate(period="2024-03"), db)
+    # The worker claims the job and dies; the job keeps running until its lease expires
+    job_queue.claim(db, "dead-worker")
+    assert payroll_service.fail_abandoned_runs(db) == 0
+    job = job_queue.get_job(db, run.job_id)
+    job.locked_at = datetime.utcnow() - timedelta(seconds=job_queue.settings.JOB_LEASE_SECONDS + 60)
+    db.commit()
+    assert payroll_service.fail_abandoned_runs(db, run_id=run.id) == 1
+    db.refresh(run)
+    assert run.status == payroll_service.FAILED and run.error and run.finished_at is not None
+    # Once the sweep has failed the job for good, a new run of the period can start
+    assert job_queue.requeue_stale(db) == 1
+    assert job_queue.get_job(db, run.job_id).status == job_queue.FAILED
+    retry = payroll_service.generate_payroll(PayrollRunCreate(period="2024-03"), db)
+    assert retry.status == payroll_service.PENDING and retry.job_id != run.job_id
+
+
+if __name__ == "__main__":
+    tests = [
+        test_claims_by_priority_and_stores_results,
+        test_retries_with_backoff_then_fails,
+        test_expired_lease_is_requeued_and_fenced,
+        test_worker_heartbeat_renews_the_lease_of_a_silent_handler,
+        test_submitted_payloads_are_validated_per_kind,
+        test_payroll_run_is_queued_with_its_job_once_per_period,
+        test_abandoned_payroll_run_no_longer_blocks_its_period,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Query count regression tests for report and listing paths that used to load rows one by one.
+Runs against an in-memory SQLite database; no server or PostgreSQL needed:
+
+    python test_query_counts.py      (or: pytest test_query_counts.py)
+"""
+import os
+from datetime import date, datetime
+
+os.environ.setdefault("SKIP_DATABASE", "true")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.db.models.attendance import AttendanceRecord
+from app.db.models.invoice import Invoice, InvoiceItem
+from app.db.models.payroll import Payroll, PayrollRun
+from app.db.models.product import Product
+from app.db.models.production_requirement import ProductionRequirement, ProductionRequirementItem
+from app.db.models.raw_material import RawMaterial
+from app.db.models.staff import Staff
+from app.db.models.stock_balance import StockBalance
+from app.db.models.user import User
+from app.db.models.user_access import UserSectionAccess, UserWarehouseAccess
+from app.db.models.warehouse import Warehouse
+from app.utils.query_counter import count_queries
+from app.utils.pagination import DateRange, PageParams
+
+ROWS = 20
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        Product.__table__,
+        Invoice.__table__,
+        InvoiceItem.__table__,
+        Staff.__table__,
+        AttendanceRecord.__table__,
+        RawMaterial.__table__,
+        StockBalance.__table__,
+        ProductionRequirement.__table__,
+        ProductionRequirementItem.__table__,
+        User.__table__,
+        Warehouse.__table__,
+        UserWarehouseAccess.__table__,
+        UserSectionAccess.__table__,
+        PayrollRun.__table__,
+        Payroll.__table__,
+    ])
+    db = Session(engine)
+    products = [
+        Product(name=f"Product {i}", product_id=f"P{i}", description="", unit_of_measure="pcs",
+                unit_price=10.0, reorder_point=5, opening_stock_quantity=0, average_production_time=0)
+        for i in range(ROWS)
+    ]
+    staff = [
+        Staff(name=f"Staff {i}", staff_id=f"S{i}", date_of_birth=date(1990, 1, 1), age=30, gender="F",
+              marital_status="", phone_number="0", next_of_kin_name="", next_of_kin_phone="",
+              bank_name="", account_number="")
+        for i in range(ROWS)
+    ]
+    raw_materials = [
+        RawMaterial(name=f"RM {i}", rm_id=f"RM{i}", category="General", source="local", uom="kg",
+                    reorder_point=1, unit_cost=1.0, opening_stock=1000)
+        for i in range(ROWS)
+    ]
+    db.add_all(products + staff + raw_materials)
+    db.flush()
+    for i in range(ROWS):
+        invoice = Invoice(invoice_number=f"INV-{i}", customer_name="Walk-in", total_amount=20.0,
+                          date=datetime(2024, 1, 1 + i % 28))
+        invoice.items = [InvoiceItem(product_id=products[(i + j) % ROWS].id, quantity=1, price=10.0) for j in range(2)]
+        db.add(invoice)
+        db.add(AttendanceRecord(staff_id=staff[i].id, date=date(2024, 1, 1 + i % 28)))
+        requirement = ProductionRequirement(product_id=products[i].id)
+        requirement.items = [
+            ProductionRequirementItem(raw_material_id=raw_materials[(i + j) % ROWS].id, quantity=2) for j in range(3)
+        ]
+        db.add(requirement)
+    db.commit()
+    db.expunge_all()
+    return engine, db
+
+
+def test_sales_report_query_count():
+    from app.services.reports_service import ReportsService
+    engine, db = make_session()
+    with count_queries(engine) as counter:
+        report = ReportsService.get_sales_report(db, "2024-01-01", "2024-12-31")
+    assert len(report.transactions) == ROWS
+    assert all(t.items[0].product_name for t in report.transactions)
+    # invoices + items joined to products
+    assert counter.count <= 2, counter.statements
+
+
+def test_attendance_with_names_query_count():
+    from app.api.v1.endpoints.attendance import attendance_with_names_query
+    engine, db = make_session()
+    with count_queries(engine) as counter:
+        records = db.execute(attendance_with_names_query(PageParams(limit=100, cursor=None), DateRange(None, None))).scalars().all()
+        names = [r.staff.name for r in records]
+    assert len(names) == ROWS and all(names)
+    # records + staff
+    assert counter.count <= 2, counter.statements
+
+
+def test_attendance_listing_pages_only_on_request():
+    from app.api.v1.endpoints.attendance import attendance_with_names_query
+    from app.utils.pagination import page_params, split_page
+    engine, db = make_session()
+
+    def fetch(page):
+        rows = db.execute(attendance_with_names_query(page, DateRange(None, None))).scalars().all()
+        return split_page(rows, page, sort_attr="date")
+
+    # Clients that never send limit or cursor still get every row
+    records, next_cursor = fetch(page_params(limit=None, cursor=None))
+    assert len(records) == ROWS and next_cursor is None
+    first, next_cursor = fetch(page_params(limit=15, cursor=None))
+    assert len(first) == 15 and next_cursor
+    rest, last_cursor = fetch(page_params(limit=15, cursor=next_cursor))
+    assert len(rest) == ROWS - 15 and last_cursor is None
+    assert {r.id for r in first + rest} == {r.id for r in records}
+
+
+def test_list_production_requirements_query_count():
+    from app.api.v1.endpoints.production_requirements import list_production_requirements
+    engine, db = make_session()
+    with count_queries(engine) as counter:
+        result = list_production_requirements(db)
+    assert len(result) == ROWS and all(len(r.requirements) == 3 for r in result)
+    # requirements + items
+    assert counter.count <= 2, counter.statements
+
+
+def test_calculate_materials_query_count():
+    from app.api.v1.endpoints.production_console import calculate_materials
+    from app.schemas.inventory import ProductionCalculationRequest
+    engine, db = make_session()
+    product_id = db.query(ProductionRequirement.product_id).first()[0]
+    with count_queries(engine) as counter:
+        result = calculate_materials(ProductionCalculationRequest(product_id=product_id, quantity=5), db)
+    assert len(result.materials) == 3
+    assert all(m.quantity_needed == 10 for m in result.materials)
+    # requirement + items joined to raw materials
+    assert counter.count <= 2, counter.statements
+
+
+def test_plan_production_query_count():
+    from app.services.production_planning import PlanLine, plan_production
+    engine, db = make_session()
+    raw_material_ids = [row[0] for row in db.query(RawMaterial.id).order_by(RawMaterial.id)]
+    db.add_all([
+        StockBalance(item_type="raw_material", item_id=rm_id, warehouse_id=0, quantity=100 if i else 5)
+        for i, rm_id in enumerate(raw_material_ids)
+    ])
+    db.commit()
+    product_ids = [row[0] for row in db.query(ProductionRequirement.product_id).order_by(ProductionRequirement.id)]
+    lines = [PlanLine(product_id, 4) for product_id in product_ids] + [PlanLine(product_ids[0], 1), PlanLine(-1, 1)]
+    with count_queries(engine) as counter:
+        plan = plan_production(db, lines)
+    # every material is used by 3 products at 2 per unit, 4 units each (+1 unit of the first product)
+    assert len(plan.materials) == ROWS
+    assert sum(need.quantity_needed for need in plan.materials.values()) == ROWS * 3 * 2 * 4 + 3 * 2
+    assert [need.raw_material_id for need in plan.shortages] == [raw_material_ids[0]]
+    assert plan.missing_requirements == [-1] and not plan.feasible
+    assert all(quantity == 10 for _, quantity in plan.product_materials[product_ids[0]])
+    # requirements joined to items + raw materials joined to the ledger
+    assert counter.count <= 2, counter.statements
+
+
+def test_cached_principal_query_count():
+    from app.services.auth_service import create_access_token, get_principal, invalidate_principal
+    engine, db = make_session()
+    user = User(username="clerk", hashed_password="x", role="Sales", status="active")
+    warehouses = [Warehouse(name=f"WH {i}", location="", manager_phone="0") for i in range(3)]
+    db.add_all([user] + warehouses)
+    db.flush()
+    db.add_all([UserWarehouseAccess(user_id=user.id, warehouse_id=w.id) for w in warehouses[:2]])
+    db.commit()
+    token = create_access_token({"sub": user.username, "user_id": user.id, "role": user.role})
+    invalidate_principal(user.id)
+    with count_queries(engine) as counter:
+        first = get_principal(db, token)
+        second = get_principal(db, token)
+    assert first == second and first.warehouse_ids == {warehouses[0].id, warehouses[1].id}
+    assert first.has_warehouses(warehouses[0].id, warehouses[1].id) and not first.has_warehouses(warehouses[2].id)
+    # user, warehouse grants and section grants once, then served from the cache
+    assert counter.count <= 3, counter.statements
+    db.add(UserWarehouseAccess(user_id=user.id, warehouse_id=warehouses[2].id))
+    db.commit()
+    invalidate_principal(user.id)
+    assert len(get_principal(db, token).warehouse_ids) == 3
+
+
+def test_payroll_run_query_count():
+    from app.services.payroll_service import run_payroll
+    engine, db = make_session()
+    for i, staff in enumerate(db.query(Staff).order_by(Staff.id)):
+        staff.hourly_rate = 10.0 if i % 2 else None
+    for record in db.query(AttendanceRecord):
+        record.hours_worked = 8.0
+    run = PayrollRun(period="2024-01", start_date=date(2024, 1, 1), end_date=date(2024, 1, 31), status="running")
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    progress = []
+    with count_queries(engine) as counter:
+        staff, hours, salary = run_payroll(db, run, batch_size=8, report=lambda done, total: progress.append((done, total)))
+    db.commit()
+    assert (staff, hours, salary) == (ROWS, ROWS * 8.0, ROWS // 2 * 80.0)
+    assert progress == [(0, ROWS), (8, ROWS), (16, ROWS), (ROWS, ROWS)]
+    assert db.query(Payroll).filter(Payroll.run_id == run.id).count() == ROWS
+    # grouped hours (create, fill, drop) + delete + one INSERT ... SELECT per batch of staff,
+    # whatever the workforce size; attendance is aggregated by the fill only
+    assert counter.count <= 4 + 3, counter.statements
+    assert sum("attendance_records" in statement for statement in counter.statements) == 1, counter.statements
+    # A rerun replaces the period's generated rows
+    run_payroll(db, run)
+    assert db.query(Payroll).count() == ROWS
+
+
+if __name__ == "__main__":
+    tests = [
+        test_sales_report_query_count,
+        test_attendance_with_names_query_count,
+        test_attendance_listing_pages_only_on_request,
+        test_list_production_requirements_query_count,
+        test_calculate_materials_query_count,
+        test_plan_production_query_count,
+        test_cached_principal_query_count,
+        test_payroll_run_query_count,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Startup schema check tests: alembic_version is compared with the bundled head revision
+in one query, and a database that was never migrated is reported as such. Runs against
+an in-memory SQLite database:
+
+    python test_schema_version.py      (or: pytest test_schema_version.py)
+"""
+import os
+
+os.environ.setdefault("SKIP_DATABASE", "true")
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+from app.db import migrations
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_bundled_head_is_the_single_migration_head():
+    heads = migrations.bundled_heads()
+    assert len(heads) == 1, f"migrations have diverged into several heads: {sorted(heads)}"
+
+
+def test_check_schema_compares_version_in_one_query():
+    engine = create_engine("sqlite://")
+    statements = count_statements(engine)
+    status = migrations.check_schema(engine)
+    assert not status.up_to_date and status.current == frozenset()
+    assert "database at none" in status.describe()
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+        connection.execute(text("INSERT INTO alembic_version VALUES ('0000000000aa')"))
+    status = migrations.check_schema(engine)
+    assert not status.up_to_date and status.current == {"0000000000aa"}
+
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE alembic_version SET version_num = :head"), {"head": next(iter(migrations.bundled_heads()))})
+    del statements[:]
+    assert migrations.check_schema(engine).up_to_date
+    assert len(statements) == 1, statements
+
+
+def test_release_refuses_the_mock_engine():
+    from app import release
+    from app.db import session
+    assert not isinstance(session.engine, Engine)
+    # SKIP_DATABASE unset but no usable engine: the release step must not try to migrate
+    os.environ["SKIP_DATABASE"] = "false"
+    try:
+        assert release.main([]) == 2
+    finally:
+        os.environ["SKIP_DATABASE"] = "true"
+
+
+if __name__ == "__main__":
+    tests = [
+        test_bundled_head_is_the_single_migration_head,
+        test_check_schema_compares_version_in_one_query,
+        test_release_refuses_the_mock_engine,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Stock movement tests: demand aggregation, first-expiring-first allocation against locked
+inventory rows, the all-or-nothing shortage rule, multi-line transfer planning and stock-level
+row ids. Runs
+against an in-memory SQLite database; the UPDATE ... FROM (VALUES ...) write path itself
+needs PostgreSQL:
+
+    python test_stock_movements.py      (or: pytest test_stock_movements.py)
+"""
+import os
+from collections import namedtuple
+from datetime import date
+
+os.environ.setdefault("SKIP_DATABASE", "true")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.db.models.inventory import Inventory
+from app.db.models.product import Product
+from app.db.models.raw_material import RawMaterial
+from app.db.models.warehouse import Warehouse
+from app.services.stock_service import InsufficientStockError, aggregate_demand, allocate, lock_inventory
+from app.services.transfer_service import TransferLine, plan_transfer
+
+Row = namedtuple("Row", "id product_id warehouse_id quantity batch_no expiry_date")
+
+
+def test_aggregate_demand_sums_lines_per_product_and_warehouse():
+    demand = aggregate_demand([(1, 1, 2), (2, 1, 1), (1, 1, 3), (1, 2, 4)])
+    assert demand == {(1, 1): 5, (2, 1): 1, (1, 2): 4}
+    assert aggregate_demand([]) == {}
+
+
+def test_allocate_takes_first_expiring_batches_first():
+    # Rows arrive in lock_inventory order: earliest expiry first, undated batches last
+    rows = [
+        Row(10, 1, 1, 3, "A", date(2024, 1, 1)),
+        Row(11, 1, 1, 5, "B", date(2024, 6, 1)),
+        Row(12, 1, 1, 9, "C", None),
+        Row(20, 2, 1, -2, "D", None),
+        Row(21, 2, 1, 4, "E", None),
+    ]
+    deductions, shortages = allocate(rows, {(1, 1): 7, (2, 1): 4})
+    assert shortages == {}
+    assert deductions == {10: 3, 11: 4, 21: 4}, deductions
+
+
+def test_allocate_refuses_the_whole_document_on_any_shortage():
+    rows = [Row(10, 1, 1, 3, None, None), Row(20, 2, 1, 1, None, None), Row(21, 2, 1, -5, None, None)]
+    deductions, shortages = allocate(rows, {(1, 1): 2, (2, 1): 2, (3, 1): 1})
+    # Negative rows never count as stock; nothing is deducted when one pair is short
+    assert deductions == {}
+    assert shortages == {(2, 1): (2, 1), (3, 1): (1, 0)}, shortages
+
+
+def test_lock_inventory_returns_rows_in_a_fixed_order():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Product.__table__, RawMaterial.__table__, Warehouse.__table__, Inventory.__table__])
+    db = Session(engine)
+    db.add_all([
+        Inventory(product_id=2, warehouse_id=1, quantity=1, expiry_date=None),
+        Inventory(product_id=1, warehouse_id=2, quantity=1, expiry_date=date(2024, 1, 1)),
+        Inventory(product_id=1, warehouse_id=1, quantity=1, expiry_date=None),
+        Inventory(product_id=1, warehouse_id=1, quantity=1, expiry_date=date(2024, 3, 1)),
+        Inventory(product_id=1, warehouse_id=1, quantity=1, expiry_date=date(2024, 2, 1)),
+        Inventory(product_id=3, warehouse_id=1, quantity=1, expiry_date=None),
+    ])
+    db.commit()
+    rows = lock_inventory(db, [(2, 1), (1, 1), (1, 2), (1, 1)])
+    assert [(r.product_id, r.warehouse_id, r.expiry_date) for r in rows] == [
+        (1, 1, date(2024, 2, 1)),
+        (1, 1, date(2024, 3, 1)),
+        (1, 1, None),
+        (1, 2, date(2024, 1, 1)),
+        (2, 1, None),
+    ]
+    assert lock_inventory(db, []) == []
+
+
+def test_transfer_plan_keeps_batches_and_merges_into_matching_rows():
+    rows = [
+        Row(10, 1, 1, 2, "A", date(2024, 1, 1)),
+        Row(11, 1, 1, 6, "B", date(2024, 5, 1)),
+        Row(30, 1, 2, 1, "B", date(2024, 5, 1)),  # destination already holds batch B
+    ]
+    # Two lines from warehouse 1: to warehouse 2, then to warehouse 3
+    changes, new_rows = plan_transfer(rows, [TransferLine(1, 1, 2, 3), TransferLine(1, 1, 3, 4)])
+    # Batch A (2) and 1 of batch B go to warehouse 2; the next 4 of batch B go to warehouse 3
+    assert changes == {10: 2, 11: 5, 30: -1}, changes
+    assert new_rows == {(1, 2, "A", date(2024, 1, 1)): 2, (1, 3, "B", date(2024, 5, 1)): 4}, new_rows
+    moved_out = sum(qty for qty in changes.values() if qty > 0)
+    moved_in = -sum(qty for qty in changes.values() if qty < 0) + sum(new_rows.values())
+    assert moved_out == moved_in == 7
+
+
+def test_transfer_plan_moves_nothing_when_a_source_is_short():
+    rows = [Row(10, 1, 1, 5, None, None), Row(20, 2, 1, 1, None, None)]
+    try:
+        plan_transfer(rows, [TransferLine(1, 1, 2, 5), TransferLine(2, 1, 2, 1), TransferLine(2, 1, 3, 1)])
+        assert False, "a transfer order short on any line must not be planned"
+    except InsufficientStockError as e:
+        assert e.shortages == {(2, 1): (2, 1)} and e.product_ids == [2]
+
+
+def test_stock_level_rows_have_one_id_per_product_and_warehouse():
+    from app.services.inventory_service import product_stock_level_rows, stock_level_rows
+    Balance = namedtuple("Balance", "product_id name reorder_point warehouse_id warehouse_name available_quantity")
+    balances = [Balance(1, "Cream", 5, 1, "Main", 10), Balance(1, "Cream", 5, 2, "Annex", 3), Balance(2, "Soap", 5, 1, "Main", 0)]
+    for rows in (stock_level_rows(balances), product_stock_level_rows(balances)):
+        assert [row["id"] for row in rows] == ["1:1", "1:2", "2:1"]
+        assert [row["product_id"] for row in rows] == [1, 1, 2]
+
+
+if __name__ == "__main__":
+    tests = [
+        test_aggregate_demand_sums_lines_per_product_and_warehouse,
+        test_allocate_takes_first_expiring_batches_first,
+        test_allocate_refuses_the_whole_document_on_any_shortage,
+        test_lock_inventory_returns_rows_in_a_fixed_order,
+        test_transfer_plan_keeps_batches_and_merges_into_matching_rows,
+        test_transfer_plan_moves_nothing_when_a_source_is_short,
+        test_stock_level_rows_have_one_id_per_product_and_warehouse,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    raise SystemExit(1 if failed else 0)